@@ -1,17 +1,18 @@
-import google.generativeai as genai
 import os
 import json
 import re
-from dotenv import load_dotenv
 from difflib import SequenceMatcher
-
-load_dotenv()
+from utils.llm_gateway import get_gateway
+from utils.clause_index import ClauseIndex
 
 class BenchmarkAnalyzerAgent:
+    # Bump when prompts change so cached analyses are invalidated
+    PROMPT_VERSION = '1'
+    AGENT_NAME = 'benchmark'
+    
     def __init__(self):
-        api_key = os.getenv('GEMINI_API_KEY', 'your-gemini-api-key')
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        # All model calls go through the shared, concurrency-limited gateway
+        self.llm = get_gateway()
         
         # Industry standard clause library for comparison
         self.industry_standards = {
@@ -37,8 +38,38 @@ class BenchmarkAnalyzerAgent:
             ]
         }
         
+        # Optional larger standards library (JSON {category: [clauses]} or a list of {text, category})
+        library_path = os.getenv('BENCHMARK_STANDARDS_PATH')
+        if library_path:
+            self.load_standards_library(library_path)
+        
         # Similarity threshold for matches
         self.similarity_threshold = 0.6
+        
+        # Only this many TF-IDF candidates are reranked with the exact similarity
+        self.candidate_pool_size = int(os.getenv('BENCHMARK_CANDIDATE_POOL', 50))
+        self.standards_index = ClauseIndex.from_library(self.industry_standards)
+    
+    def load_standards_library(self, path):
+        """Merge an external standards library into the built-in one"""
+        with open(path, 'r', encoding='utf-8') as f:
+            library = json.load(f)
+        
+        if isinstance(library, list):
+            entries = library
+        else:
+            entries = [
+                {'text': text, 'category': category}
+                for category, texts in library.items()
+                for text in texts
+            ]
+        
+        for entry in entries:
+            self.industry_standards.setdefault(entry['category'], []).append(entry['text'])
+        
+        # Rebuild the retrieval index if it already exists
+        if hasattr(self, 'standards_index'):
+            self.standards_index = ClauseIndex.from_library(self.industry_standards)
     
     def analyze_similarity(self, clause_text):
         """Analyze similarity with industry standards and provide benchmarking"""
@@ -57,7 +88,7 @@ class BenchmarkAnalyzerAgent:
                 clause_text, similarity_score, similar_clauses, industry_comparison
             )
             
-            return {
+            result = {
                 'similarity_score': similarity_score,
                 'similar_clauses': similar_clauses[:5],  # Top 5 matches
                 'industry_comparison': industry_comparison,
@@ -65,37 +96,55 @@ class BenchmarkAnalyzerAgent:
                 'benchmark_grade': self._get_benchmark_grade(similarity_score),
                 'recommendations': self._generate_recommendations(similarity_score, industry_comparison)
             }
+            if industry_comparison.pop('fallback_analysis', False):
+                result['fallback_analysis'] = True
+            return result
             
         except Exception as e:
-            return {
-                'error': f'Benchmark analysis failed: {str(e)}',
-                'similarity_score': 75,
-                'analysis_summary': 'No analysis summary available.',
-                'similar_clauses': [],
-                'industry_comparison': {
-                    'standard': 'Not available',
-                    'rating': 'Not rated',
-                    'recommendation': 'No specific recommendation'
-                }
+            return self.create_fallback_result(clause_text, str(e))
+    
+    def create_local_result(self, clause_text):
+        """String similarity against the standards library; the industry comparison needs the LLM"""
+        similar_clauses = self._find_similar_clauses(clause_text)
+        similarity_score = self._calculate_similarity_score(clause_text, similar_clauses)
+        
+        return {
+            'similarity_score': similarity_score,
+            'similar_clauses': similar_clauses[:5],
+            'benchmark_grade': self._get_benchmark_grade(similarity_score),
+            'recommendations': self._generate_recommendations(similarity_score, {}),
+            'local_analysis': True
+        }
+    
+    def create_fallback_result(self, clause_text, error_msg):
+        """Fallback benchmark output when analysis cannot be completed"""
+        return {
+            'error': f'Benchmark analysis failed: {error_msg}',
+            'similarity_score': 75,
+            'analysis_summary': 'No analysis summary available.',
+            'similar_clauses': [],
+            'industry_comparison': {
+                'standard': 'Not available',
+                'rating': 'Not rated',
+                'recommendation': 'No specific recommendation'
             }
+        }
     
     def _find_similar_clauses(self, clause_text):
         """Find clauses similar to the input from industry standards"""
         similar_clauses = []
-        clause_lower = clause_text.lower()
-        
-        # Search through all industry standard categories
-        for category, standards in self.industry_standards.items():
-            for standard_clause in standards:
-                similarity = self._calculate_text_similarity(clause_text, standard_clause)
-                
-                if similarity >= self.similarity_threshold:
-                    similar_clauses.append({
-                        'text': standard_clause,
-                        'similarity': round(similarity * 100, 1),
-                        'category': category,
-                        'match_type': 'exact' if similarity > 0.9 else 'similar'
-                    })
+        
+        # Retrieve top-k candidates from the index, then rerank them exactly
+        for entry, _ in self.standards_index.search(clause_text, self.candidate_pool_size):
+            similarity = self._calculate_text_similarity(clause_text, entry['text'])
+            
+            if similarity >= self.similarity_threshold:
+                similar_clauses.append({
+                    'text': entry['text'],
+                    'similarity': round(similarity * 100, 1),
+                    'category': entry['category'],
+                    'match_type': 'exact' if similarity > 0.9 else 'similar'
+                })
         
         # Sort by similarity score
         similar_clauses.sort(key=lambda x: x['similarity'], reverse=True)
@@ -193,12 +242,13 @@ class BenchmarkAnalyzerAgent:
         """
         
         try:
-            response = self.model.generate_content(
+            response = self.llm.generate(
                 prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=200,
-                    temperature=0.3
-                )
+                agent=self.AGENT_NAME,
+                generation_config={
+                    'max_output_tokens': 200,
+                    'temperature': 0.3
+                }
             )
             
             response_text = response.text.strip()
@@ -215,7 +265,8 @@ class BenchmarkAnalyzerAgent:
             return {
                 'standard': f'{complexity} language structure typical for insurance',
                 'rating': 'Average',
-                'recommendation': 'Consider simplifying for better customer understanding'
+                'recommendation': 'Consider simplifying for better customer understanding',
+                'fallback_analysis': True
             }
     
     def _generate_analysis_summary(self, clause_text, similarity_score, similar_clauses, industry_comparison):
@@ -1,61 +1,103 @@
-import google.generativeai as genai
 import re
 import os
 import json
-from dotenv import load_dotenv
-
-load_dotenv()
+from typing import Dict, List
+from utils.circuit_breaker import CircuitOpenError
+from utils.llm_gateway import get_gateway
+from utils.phrase_matcher import RULE_PACKS, phrase_matcher
+from utils.prompt_packing import generate_packed
 
 class ComplianceCheckerAgent:
+    # Bump when prompts change so cached analyses are invalidated
+    PROMPT_VERSION = '2'
+    AGENT_NAME = 'compliance'
+    
     def __init__(self):
-        api_key = os.getenv('GEMINI_API_KEY', 'your-gemini-api-key')
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        self.vague_phrases = [
-            "notwithstanding", "reasonable effort", "as appropriate", 
-            "from time to time", "subject to", "at our discretion"
-        ]
+        # All model calls go through the shared, concurrency-limited gateway
+        self.llm = get_gateway()
+        self.vague_phrases = RULE_PACKS['vague_language']
     
     def check_compliance(self, clause_text):
         """Check clause for regulatory compliance issues"""
         try:
-            # Detect vague language
-            vague_issues = self._detect_vague_language(clause_text)
-            
             # Get Gemini compliance analysis
             llm_analysis = self._get_llm_compliance_check(clause_text)
-            
-            # Calculate overall compliance score
-            total_issues = len(vague_issues) + len(llm_analysis.get('issues', []))
-            compliance_score = max(0, 100 - (total_issues * 10))
-            
-            return {
-                'compliance_score': compliance_score,
-                'status': self._get_status(compliance_score),
-                'vague_language_detected': vague_issues,
-                'regulatory_issues': llm_analysis.get('issues', []),
-                'recommendations': llm_analysis.get('recommendations', []),
-                'irdai_compliant': compliance_score >= 80
-            }
+            return self._build_result(clause_text, llm_analysis)
             
         except Exception as e:
-            return {'error': f'Compliance check failed: {str(e)}'}
+            return self.create_fallback_result(clause_text, str(e))
+    
+    def check_compliance_batch(self, clause_texts: List[str]) -> List[Dict]:
+        """Check several clauses with packed prompts; clauses with no usable packed answer get the fallback"""
+        items = generate_packed(
+            self.llm, self.AGENT_NAME,
+            "Analyze each insurance clause below for regulatory compliance issues. Check for vague or ambiguous "
+            "language, potential consumer disputes, non-compliance with the IRDAI plain language mandate, "
+            "misleading or contradictory terms, and hidden exclusions.",
+            clause_texts,
+            {'issues': ['list of specific issues found'], 'recommendations': ['specific suggestions to fix each issue']},
+            lambda item: isinstance(item.get('issues'), list) and isinstance(item.get('recommendations'), list),
+            max_output_tokens_per_item=400,
+            temperature=0.2,
+            single=self._get_llm_compliance_check
+        )
+        
+        results = []
+        for clause_text, item in zip(clause_texts, items):
+            if item is None:
+                results.append(self.create_fallback_result(clause_text, 'No usable packed answer'))
+                continue
+            try:
+                results.append(self._build_result(clause_text, item))
+            except Exception as e:
+                results.append(self.create_fallback_result(clause_text, str(e)))
+        return results
+    
+    def _build_result(self, clause_text, llm_analysis):
+        """Combine rule-based vague language detection with the LLM analysis"""
+        # Detect vague language
+        vague_issues = self._detect_vague_language(clause_text)
+        
+        # Calculate overall compliance score
+        total_issues = len(vague_issues) + len(llm_analysis.get('issues', []))
+        compliance_score = max(0, 100 - (total_issues * 10))
+        
+        result = {
+            'compliance_score': compliance_score,
+            'status': self._get_status(compliance_score),
+            'vague_language_detected': vague_issues,
+            'regulatory_issues': llm_analysis.get('issues', []),
+            'recommendations': llm_analysis.get('recommendations', []),
+            'irdai_compliant': compliance_score >= 80
+        }
+        if llm_analysis.get('fallback_analysis'):
+            result['fallback_analysis'] = True
+        return result
+    
+    def create_local_result(self, clause_text):
+        """Rule-only compliance check (vague language and structural issues), computed without the LLM"""
+        return dict(self._build_result(clause_text, self._get_structural_analysis(clause_text)), local_analysis=True)
+    
+    def create_fallback_result(self, clause_text, error_msg):
+        """Fallback output when the compliance check cannot be completed"""
+        return {'error': f'Compliance check failed: {error_msg}'}
     
     def _detect_vague_language(self, text):
-        """Detect predefined vague phrases"""
-        detected = []
-        text_lower = text.lower()
+        """Detect predefined vague phrases, with character offsets for highlighting"""
+        detected = {}
         
-        for phrase in self.vague_phrases:
-            if phrase in text_lower:
-                detected.append({
-                    'phrase': phrase,
-                    'recommendation': f'Replace "{phrase}" with specific terms or timelines'
-                })
+        for match in phrase_matcher.scan(text, ['vague_language']):
+            if match.phrase not in detected:
+                detected[match.phrase] = {
+                    'phrase': match.phrase,
+                    'recommendation': f'Replace "{match.phrase}" with specific terms or timelines',
+                    'offsets': []
+                }
+            detected[match.phrase]['offsets'].append([match.start, match.end])
         
-        return detected
+        return list(detected.values())
     
-    def _get_llm_compliance_check(self, clause_text):
+    def _get_llm_compliance_check(self, clause_text, timeout=None):
         """Use Gemini for detailed compliance analysis"""
         prompt = f"""
         Analyze this insurance clause for regulatory compliance issues:
@@ -76,13 +118,19 @@ class ComplianceCheckerAgent:
         }}
         """
         
-        response = self.model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=400,
-                temperature=0.2
+        try:
+            response = self.llm.generate(
+                prompt,
+                agent=self.AGENT_NAME,
+                generation_config={
+                    'max_output_tokens': 400,
+                    'temperature': 0.2
+                },
+                timeout=timeout
             )
-        )
+        except CircuitOpenError:
+            # The model is known to be degraded: answer from the structural checks right away
+            return dict(self._get_structural_analysis(clause_text), fallback_analysis=True)
         
         try:
             # Extract JSON from response
@@ -93,32 +141,36 @@ class ComplianceCheckerAgent:
             return json.loads(response_text)
         except:
             # Return more meaningful fallback analysis
-            word_count = len(clause_text.split())
-            sentence_count = len([s for s in clause_text.split('.') if s.strip()])
-            avg_sentence_length = word_count / max(sentence_count, 1)
-            
-            issues = []
-            recommendations = []
-            
-            if avg_sentence_length > 25:
-                issues.append("Sentences are too long for easy comprehension")
-                recommendations.append("Break down long sentences into shorter ones")
-            
-            if word_count > 100:
-                issues.append("Clause is lengthy and may be difficult to understand")
-                recommendations.append("Consider splitting into multiple shorter clauses")
-            
-            # Check for common jargon
-            jargon_terms = ['notwithstanding', 'heretofore', 'wherefore', 'pursuant to']
-            found_jargon = [term for term in jargon_terms if term.lower() in clause_text.lower()]
-            if found_jargon:
-                issues.append(f"Contains legal jargon: {', '.join(found_jargon)}")
-                recommendations.append("Replace legal jargon with plain English terms")
-            
-            return {
-                'issues': issues if issues else ['No major structural issues detected'],
-                'recommendations': recommendations if recommendations else ['Consider review for plain language compliance']
-            }
+            return dict(self._get_structural_analysis(clause_text), fallback_analysis=True)
+    
+    def _get_structural_analysis(self, clause_text):
+        """Rule-based issues from sentence length, clause length and legal jargon"""
+        word_count = len(clause_text.split())
+        sentence_count = len([s for s in clause_text.split('.') if s.strip()])
+        avg_sentence_length = word_count / max(sentence_count, 1)
+        
+        issues = []
+        recommendations = []
+        
+        if avg_sentence_length > 25:
+            issues.append("Sentences are too long for easy comprehension")
+            recommendations.append("Break down long sentences into shorter ones")
+        
+        if word_count > 100:
+            issues.append("Clause is lengthy and may be difficult to understand")
+            recommendations.append("Consider splitting into multiple shorter clauses")
+        
+        # Check for common jargon
+        found_jargon = phrase_matcher.find(clause_text, 'legal_jargon')
+        if found_jargon:
+            issues.append(f"Contains legal jargon: {', '.join(found_jargon)}")
+            recommendations.append("Replace legal jargon with plain English terms")
+        
+        # No placeholder issue when the clause is clean: every entry counts against the score
+        return {
+            'issues': issues,
+            'recommendations': recommendations if recommendations else ['Consider review for plain language compliance']
+        }
     
     def _get_status(self, score):
         """Get compliance status based on score"""
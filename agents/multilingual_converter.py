@@ -1,14 +1,23 @@
-import google.generativeai as genai
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
+import json
+from concurrent.futures import ThreadPoolExecutor
+from utils.llm_gateway import get_gateway
 
 class MultilingualConverterAgent:
-    def __init__(self):
-        api_key = os.getenv('GEMINI_API_KEY', 'your-gemini-api-key')
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+    # Bump when prompts change so cached analyses are invalidated
+    PROMPT_VERSION = '2'
+    AGENT_NAME = 'multilingual'
+    
+    # 'batched' requests every target language in one structured call;
+    # 'per_language' sends one translation prompt per language in parallel
+    TRANSLATION_MODES = ('batched', 'per_language')
+    
+    def __init__(self, mode=None):
+        # All model calls go through the shared, concurrency-limited gateway
+        self.llm = get_gateway()
+        self.mode = mode or os.getenv('TRANSLATION_MODE', 'batched')
+        if self.mode not in self.TRANSLATION_MODES:
+            raise ValueError(f"Unknown translation mode: {self.mode}")
         self.supported_languages = {
             'hindi': 'Hindi (हिंदी)',
             'marathi': 'Marathi (मराठी)',
@@ -17,28 +26,124 @@ class MultilingualConverterAgent:
             'kannada': 'Kannada (ಕನ್ನಡ)'
         }
     
-    def convert_languages(self, clause_text):
-        """Convert clause to multiple Indian languages"""
+    def resolve_languages(self, languages=None):
+        """Validate requested language codes; defaults to every supported language"""
+        if not languages:
+            return list(self.supported_languages)
+        
+        requested = {str(lang).strip().lower() for lang in languages}
+        unknown = requested - set(self.supported_languages)
+        if unknown:
+            raise ValueError(f"Unsupported languages: {', '.join(sorted(unknown))}")
+        
+        # Keep a stable order so results (and cache keys) don't depend on request order
+        return [code for code in self.supported_languages if code in requested]
+    
+    def convert_languages(self, clause_text, languages=None, mode=None):
+        """Convert clause to the requested Indian languages (all supported by default)"""
         try:
-            translations = {}
+            lang_codes = self.resolve_languages(languages)
+            mode = mode or self.mode
+            
+            if mode == 'batched':
+                translated = self._translate_batched(clause_text, lang_codes)
+            elif mode == 'per_language':
+                translated = {}
+            else:
+                raise ValueError(f"Unknown translation mode: {mode}")
             
-            for lang_code, lang_name in self.supported_languages.items():
-                translation = self._translate_to_language(clause_text, lang_code, lang_name)
+            # Languages missing from the batched response are translated individually in parallel
+            missing = [code for code in lang_codes if code not in translated]
+            translated.update(self._translate_parallel(clause_text, missing))
+            
+            translations = {}
+            for lang_code in lang_codes:
                 translations[lang_code] = {
-                    'language_name': lang_name,
-                    'translated_text': translation,
+                    'language_name': self.supported_languages[lang_code],
+                    'translated_text': translated[lang_code],
                     'ready_for_distribution': True
                 }
             
-            return {
+            result = {
                 'source_language': 'English',
                 'translations': translations,
                 'total_languages': len(translations),
-                'rural_customer_ready': True
+                'rural_customer_ready': True,
+                'translation_mode': mode
             }
+            if mode == 'batched' and missing:
+                result['per_language_retries'] = missing
+            
+            return result
             
         except Exception as e:
-            return {'error': f'Translation failed: {str(e)}'}
+            return self.create_fallback_result(clause_text, str(e))
+    
+    def create_fallback_result(self, clause_text, error_msg):
+        """Fallback output when translation cannot be completed"""
+        return {'error': f'Translation failed: {error_msg}'}
+    
+    def _translate_batched(self, text, lang_codes):
+        """Translate into every requested language with one structured model call"""
+        if not lang_codes:
+            return {}
+        
+        language_list = '\n'.join(
+            f'- "{code}": {self.supported_languages[code]}' for code in lang_codes
+        )
+        prompt = f"""
+        Translate this simple English insurance clause for rural customers into each of these languages:
+        {language_list}
+        
+        English text: {text}
+        
+        Requirements:
+        - Use simple, everyday words in each language
+        - Avoid complex insurance jargon
+        - Keep the meaning clear and accurate
+        - Make it suitable for customers with basic education
+        
+        Return ONLY a JSON object mapping each language key above to its translation, e.g.
+        {{"{lang_codes[0]}": "translation"}}
+        """
+        
+        response = self.llm.generate(
+            prompt,
+            agent=self.AGENT_NAME,
+            generation_config={
+                'max_output_tokens': 300 * len(lang_codes),
+                'temperature': 0.3
+            }
+        )
+        
+        try:
+            response_text = response.text.strip()
+            if response_text.startswith('```'):
+                response_text = response_text.replace('```json', '').replace('```', '').strip()
+            payload = json.loads(response_text)
+        except (ValueError, AttributeError):
+            return {}
+        
+        if not isinstance(payload, dict):
+            return {}
+        
+        return {
+            code: payload[code].strip()
+            for code in lang_codes
+            if isinstance(payload.get(code), str) and payload[code].strip()
+        }
+    
+    def _translate_parallel(self, text, lang_codes):
+        """Translate into each language with its own prompt, concurrently"""
+        if not lang_codes:
+            return {}
+        
+        with ThreadPoolExecutor(max_workers=len(lang_codes)) as executor:
+            futures = {
+                code: executor.submit(self._translate_to_language, text, code, self.supported_languages[code])
+                for code in lang_codes
+            }
+            return {code: future.result() for code, future in futures.items()}
     
     def _translate_to_language(self, text, lang_code, lang_name):
         """Translate text to specific language"""
@@ -56,12 +161,13 @@ class MultilingualConverterAgent:
         {lang_name} translation:
         """
         
-        response = self.model.generate_content(
+        response = self.llm.generate(
             prompt,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=300,
-                temperature=0.3
-            )
+            agent=self.AGENT_NAME,
+            generation_config={
+                'max_output_tokens': 300,
+                'temperature': 0.3
+            }
         )
         
         return response.text.strip()
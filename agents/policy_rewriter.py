@@ -1,57 +1,155 @@
-import google.generativeai as genai
 import re
 import os
-from textstat import flesch_reading_ease, flesch_kincaid_grade
-from dotenv import load_dotenv
-
-load_dotenv()
+from typing import Dict, Iterator, List
+from utils.llm_gateway import get_gateway
+from utils.prompt_packing import generate_packed
 
 class PolicyRewriterAgent:
+    # Bump when prompts change so cached analyses are invalidated
+    PROMPT_VERSION = '1'
+    AGENT_NAME = 'rewriter'
+    
     def __init__(self):
-        # Initialize Gemini client with environment variable
-        api_key = os.getenv('GEMINI_API_KEY', 'your-gemini-api-key')
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        # All model calls go through the shared, concurrency-limited gateway
+        self.llm = get_gateway()
     
     def rewrite(self, clause_text):
         """Rewrite policy clause in plain English"""
         try:
-            # Calculate original readability metrics
-            original_flesch = flesch_reading_ease(clause_text)
-            original_grade = flesch_kincaid_grade(clause_text)
-            original_word_count = len(clause_text.split())
-            
             # Generate plain English version
             plain_english = self._generate_plain_english(clause_text)
+            return self._build_result(clause_text, plain_english)
             
-            # Calculate improved readability metrics
-            new_flesch = flesch_reading_ease(plain_english)
-            new_grade = flesch_kincaid_grade(plain_english)
-            new_word_count = len(plain_english.split())
-            
-            return {
-                'original_text': clause_text,
-                'plain_english_text': plain_english,
-                'original_metrics': {
-                    'flesch_score': round(original_flesch, 2),
-                    'grade_level': round(original_grade, 2),
-                    'word_count': original_word_count
-                },
-                'improved_metrics': {
-                    'flesch_score': round(new_flesch, 2),
-                    'grade_level': round(new_grade, 2),
-                    'word_count': new_word_count
-                },
-                'readability_improvement': round(new_flesch - original_flesch, 2),
-                'meets_irdai_standards': new_grade <= 8.0
+        except Exception as e:
+            return self.create_fallback_result(clause_text, str(e))
+    
+    def rewrite_batch(self, clause_texts: List[str]) -> List[Dict]:
+        """Rewrite several clauses with packed prompts; clauses with no usable packed answer get the fallback"""
+        items = generate_packed(
+            self.llm, self.AGENT_NAME,
+            "Rewrite each insurance policy clause below in plain English that meets IRDAI readability standards. "
+            "Use simple words (8th grade reading level), short sentences (max 20 words) and active voice when possible. "
+            "Remove legal jargon, keep the same legal meaning and make it customer-friendly.",
+            clause_texts,
+            {'plain_english': 'the rewritten clause only'},
+            lambda item: isinstance(item.get('plain_english'), str) and bool(item['plain_english'].strip()),
+            max_output_tokens_per_item=300,
+            temperature=0.3,
+            single=lambda clause_text, timeout: {
+                'plain_english': self._generate_plain_english(clause_text, timeout=timeout)
             }
+        )
+        
+        results = []
+        for clause_text, item in zip(clause_texts, items):
+            if item is None:
+                results.append(self.create_fallback_result(clause_text, 'No usable packed answer'))
+                continue
+            try:
+                results.append(self._build_result(clause_text, item['plain_english'].strip()))
+            except Exception as e:
+                results.append(self.create_fallback_result(clause_text, str(e)))
+        return results
+    
+    def rewrite_stream(self, clause_text) -> Iterator[Dict]:
+        """
+        Stream the rewrite: yields {'type': 'chunk', 'text'} as text arrives from
+        the model, then one {'type': 'result', 'result'} with the same output as
+        rewrite(). Readability metrics are computed once the stream completes.
+        """
+        parts = []
+        try:
+            for text in self.llm.generate_stream(
+                self._build_prompt(clause_text),
+                agent=self.AGENT_NAME,
+                generation_config=self._generation_config()
+            ):
+                # Leading whitespace is trimmed, as in the non-streaming rewrite
+                if not parts:
+                    text = text.lstrip()
+                    if not text:
+                        continue
+                parts.append(text)
+                yield {'type': 'chunk', 'text': text}
             
+            result = self._build_result(clause_text, ''.join(parts).strip())
         except Exception as e:
-            return {'error': f'Rewriting failed: {str(e)}'}
+            result = self.create_fallback_result(clause_text, str(e))
+        yield {'type': 'result', 'result': result}
+    
+    def _build_result(self, clause_text, plain_english):
+        """Readability comparison between the original clause and its rewrite"""
+        # textstat loads its pronunciation dictionary on import; only pay for it once a rewrite exists
+        from textstat import flesch_reading_ease, flesch_kincaid_grade
+        
+        # Calculate original readability metrics
+        original_flesch = flesch_reading_ease(clause_text)
+        original_grade = flesch_kincaid_grade(clause_text)
+        original_word_count = len(clause_text.split())
+        
+        # Calculate improved readability metrics
+        new_flesch = flesch_reading_ease(plain_english)
+        new_grade = flesch_kincaid_grade(plain_english)
+        new_word_count = len(plain_english.split())
+        
+        return {
+            'original_text': clause_text,
+            'plain_english_text': plain_english,
+            'original_metrics': {
+                'flesch_score': round(original_flesch, 2),
+                'grade_level': round(original_grade, 2),
+                'word_count': original_word_count
+            },
+            'improved_metrics': {
+                'flesch_score': round(new_flesch, 2),
+                'grade_level': round(new_grade, 2),
+                'word_count': new_word_count
+            },
+            'readability_improvement': round(new_flesch - original_flesch, 2),
+            'meets_irdai_standards': new_grade <= 8.0
+        }
+    
+    def create_local_result(self, clause_text):
+        """Readability of the original clause only; the rewrite itself needs the LLM"""
+        from textstat import flesch_reading_ease, flesch_kincaid_grade
+        
+        original_grade = flesch_kincaid_grade(clause_text)
+        return {
+            'original_text': clause_text,
+            'original_metrics': {
+                'flesch_score': round(flesch_reading_ease(clause_text), 2),
+                'grade_level': round(original_grade, 2),
+                'word_count': len(clause_text.split())
+            },
+            'original_meets_irdai_standards': original_grade <= 8.0,
+            'local_analysis': True
+        }
     
-    def _generate_plain_english(self, clause_text):
+    def create_fallback_result(self, clause_text, error_msg):
+        """Fallback output when the rewrite cannot be produced"""
+        return {'error': f'Rewriting failed: {error_msg}'}
+    
+    def _generate_plain_english(self, clause_text, timeout=None):
         """Use Gemini to generate plain English version"""
-        prompt = f"""
+        response = self.llm.generate(
+            self._build_prompt(clause_text),
+            agent=self.AGENT_NAME,
+            generation_config=self._generation_config(),
+            timeout=timeout
+        )
+        
+        return response.text.strip()
+    
+    @staticmethod
+    def _generation_config():
+        return {
+            'max_output_tokens': 300,
+            'temperature': 0.3
+        }
+    
+    @staticmethod
+    def _build_prompt(clause_text):
+        return f"""
         Rewrite this insurance policy clause in plain English that meets IRDAI readability standards:
         
         Original clause: {clause_text}
@@ -68,13 +166,3 @@ class PolicyRewriterAgent:
         
         Plain English version:
         """
-        
-        response = self.model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=300,
-                temperature=0.3
-            )
-        )
-        
-        return response.text.strip()
@@ -1,61 +1,96 @@
-import google.generativeai as genai
 import re
 import os
 import json
-from dotenv import load_dotenv
-
-load_dotenv()
+from typing import Dict, List
+from utils.llm_gateway import get_gateway
+from utils.phrase_matcher import RULE_PACKS, phrase_matcher
+from utils.prompt_packing import generate_packed
 
 class RiskScorerAgent:
+    # Bump when prompts change so cached analyses are invalidated
+    PROMPT_VERSION = '1'
+    AGENT_NAME = 'risk'
+    
     def __init__(self):
-        api_key = os.getenv('GEMINI_API_KEY', 'your-gemini-api-key')
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        self.high_risk_phrases = [
-            "unlimited coverage", "all risks", "any loss", "regardless of cause",
-            "without limitation", "maximum coverage", "full replacement"
-        ]
+        # All model calls go through the shared, concurrency-limited gateway
+        self.llm = get_gateway()
+        self.high_risk_phrases = RULE_PACKS['high_risk']
     
     def score_risk(self, clause_text):
         """Analyze financial and legal risk of clause"""
         try:
-            # Quick phrase-based risk detection
-            phrase_risk = self._detect_risky_phrases(clause_text)
-            
             # LLM-based comprehensive risk analysis
             llm_analysis = self._get_llm_risk_analysis(clause_text)
-            
-            # Calculate overall risk score (0-100)
-            risk_score = self._calculate_risk_score(phrase_risk, llm_analysis)
-            
-            return {
-                'risk_score': risk_score,
-                'risk_level': self._get_risk_level(risk_score),
-                'financial_risk': llm_analysis.get('financial_risk', 'Unknown'),
-                
-                'dispute_potential': llm_analysis.get('dispute_potential', 'Unknown'),
-                'risky_phrases_found': phrase_risk,
-                'mitigation_suggestions': llm_analysis.get('mitigation_suggestions', []),
-                'explanation': llm_analysis.get('explanation', ''),
-                'requires_underwriter_review': risk_score >= 70
-            }
+            return self._build_result(clause_text, llm_analysis)
             
         except Exception as e:
             # Return a complete fallback risk assessment
             return self._create_fallback_risk_assessment(clause_text, str(e))
     
-    def _detect_risky_phrases(self, text):
-        """Detect predefined risky phrases"""
-        detected = []
-        text_lower = text.lower()
+    def score_risk_batch(self, clause_texts: List[str]) -> List[Dict]:
+        """Score several clauses with packed prompts; clauses with no usable packed answer get the fallback"""
+        levels = ('Low', 'Medium', 'High')
+        items = generate_packed(
+            self.llm, self.AGENT_NAME,
+            "Analyze each insurance clause below for financial and legal risk. Evaluate the financial risk for the "
+            "insurer (Low/Medium/High), the potential for customer disputes (Low/Medium/High), claim frequency "
+            "potential, and ambiguity that could lead to disputes.",
+            clause_texts,
+            {
+                'financial_risk': 'Low/Medium/High',
+                'dispute_potential': 'Low/Medium/High',
+                'explanation': 'brief explanation of the main risks',
+                'mitigation_suggestions': ['suggestion 1', 'suggestion 2']
+            },
+            lambda item: item.get('financial_risk') in levels and item.get('dispute_potential') in levels,
+            max_output_tokens_per_item=300,
+            temperature=0.2,
+            single=self._get_llm_risk_analysis
+        )
+        
+        results = []
+        for clause_text, item in zip(clause_texts, items):
+            if item is None:
+                results.append(self._create_fallback_risk_assessment(clause_text, 'No usable packed answer'))
+                continue
+            try:
+                results.append(self._build_result(clause_text, item))
+            except Exception as e:
+                results.append(self._create_fallback_risk_assessment(clause_text, str(e)))
+        return results
+    
+    def _build_result(self, clause_text, llm_analysis):
+        """Combine phrase-based detection with the LLM analysis into the risk assessment"""
+        # Quick phrase-based risk detection
+        phrase_risk = self._detect_risky_phrases(clause_text)
         
-        for phrase in self.high_risk_phrases:
-            if phrase in text_lower:
-                detected.append(phrase)
+        # Calculate overall risk score (0-100)
+        risk_score = self._calculate_risk_score(phrase_risk, llm_analysis)
         
-        return detected
+        result = {
+            'risk_score': risk_score,
+            'risk_level': self._get_risk_level(risk_score),
+            'financial_risk': llm_analysis.get('financial_risk', 'Unknown'),
+            
+            'dispute_potential': llm_analysis.get('dispute_potential', 'Unknown'),
+            'risky_phrases_found': phrase_risk,
+            'mitigation_suggestions': llm_analysis.get('mitigation_suggestions', []),
+            'explanation': llm_analysis.get('explanation', ''),
+            'requires_underwriter_review': risk_score >= 70
+        }
+        if llm_analysis.get('fallback_analysis'):
+            result['fallback_analysis'] = True
+        return result
+    
+    def create_fallback_result(self, clause_text, error_msg):
+        """Fallback output when the LLM risk analysis cannot be completed"""
+        return self._create_fallback_risk_assessment(clause_text, error_msg)
     
-    def _get_llm_risk_analysis(self, clause_text):
+    def _detect_risky_phrases(self, text):
+        """Detect predefined risky phrases"""
+        return phrase_matcher.find(text, 'high_risk')
+    
+    def _get_llm_risk_analysis(self, clause_text, timeout=None):
         """Get comprehensive risk analysis from Gemini"""
         prompt = f"""
         Analyze this insurance clause for financial and legal risk:
@@ -77,12 +112,14 @@ class RiskScorerAgent:
         }}
         """
         
-        response = self.model.generate_content(
+        response = self.llm.generate(
             prompt,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=300,
-                temperature=0.2
-            )
+            agent=self.AGENT_NAME,
+            generation_config={
+                'max_output_tokens': 300,
+                'temperature': 0.2
+            },
+            timeout=timeout
         )
         
         try:
@@ -101,7 +138,8 @@ class RiskScorerAgent:
                     'Review clause for clarity and specificity',
                     'Consider adding concrete examples or limits',
                     'Ensure compliance with IRDAI guidelines'
-                ]
+                ],
+                'fallback_analysis': True
             }
     
     def _calculate_risk_score(self, phrase_risk, llm_analysis):
@@ -131,8 +169,19 @@ class RiskScorerAgent:
         else:
             return "Low"
     
+    def create_local_result(self, clause_text):
+        """Rule-only risk assessment (phrases and clause structure), computed without the LLM"""
+        return dict(self._rule_based_assessment(clause_text), local_analysis=True)
+    
     def _create_fallback_risk_assessment(self, clause_text, error_msg):
         """Create a fallback risk assessment when LLM is unavailable"""
+        assessment = self._rule_based_assessment(clause_text)
+        assessment['explanation'] += " (Fallback analysis - LLM unavailable)"
+        assessment['fallback_analysis'] = True
+        return assessment
+    
+    def _rule_based_assessment(self, clause_text):
+        """Risk assessment from phrase detection and clause structure alone"""
         # Detect risky phrases
         phrase_risk = self._detect_risky_phrases(clause_text)
         
@@ -154,8 +203,7 @@ class RiskScorerAgent:
             complexity_score += 10
         
         # Check for vague terms
-        vague_terms = ['discretion', 'appropriate', 'reasonable', 'from time to time', 'subject to']
-        vague_count = sum(1 for term in vague_terms if term.lower() in clause_text.lower())
+        vague_count = len(phrase_matcher.find(clause_text, 'vague_terms'))
         vague_score = vague_count * 8
         
         total_risk = min(100, base_risk + phrase_risk_score + complexity_score + vague_score)
@@ -189,7 +237,6 @@ class RiskScorerAgent:
             'dispute_potential': 'High' if vague_count > 2 else 'Medium' if vague_count > 0 else 'Low',
             'risky_phrases_found': phrase_risk,
             'mitigation_suggestions': suggestions,
-            'explanation': f"{explanation} (Fallback analysis - LLM unavailable)",
-            'requires_underwriter_review': total_risk >= 70,
-            'fallback_analysis': True
+            'explanation': explanation,
+            'requires_underwriter_review': total_risk >= 70
         }
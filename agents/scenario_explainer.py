@@ -1,14 +1,14 @@
-import google.generativeai as genai
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from utils.llm_gateway import get_gateway
 
 class ScenarioExplainerAgent:
+    # Bump when prompts change so cached analyses are invalidated
+    PROMPT_VERSION = '1'
+    AGENT_NAME = 'scenario'
+    
     def __init__(self):
-        api_key = os.getenv('GEMINI_API_KEY', 'your-gemini-api-key')
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        # All model calls go through the shared, concurrency-limited gateway
+        self.llm = get_gateway()
     
     def generate_scenario(self, clause_text):
         """Generate customer-friendly scenario explanations"""
@@ -27,7 +27,11 @@ class ScenarioExplainerAgent:
             }
             
         except Exception as e:
-            return {'error': f'Scenario generation failed: {str(e)}'}
+            return self.create_fallback_result(clause_text, str(e))
+    
+    def create_fallback_result(self, clause_text, error_msg):
+        """Fallback output when scenarios cannot be generated"""
+        return {'error': f'Scenario generation failed: {error_msg}'}
     
     def _generate_main_scenario(self, clause_text):
         """Generate main customer scenario"""
@@ -44,12 +48,13 @@ class ScenarioExplainerAgent:
         Keep it under 50 words and use simple language.
         """
         
-        response = self.model.generate_content(
+        response = self.llm.generate(
             prompt,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=150,
-                temperature=0.4
-            )
+            agent=self.AGENT_NAME,
+            generation_config={
+                'max_output_tokens': 150,
+                'temperature': 0.4
+            }
         )
         
         return response.text.strip()
@@ -69,12 +74,13 @@ class ScenarioExplainerAgent:
         Each example should be 1-2 sentences and show different situations.
         """
         
-        response = self.model.generate_content(
+        response = self.llm.generate(
             prompt,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=200,
-                temperature=0.5
-            )
+            agent=self.AGENT_NAME,
+            generation_config={
+                'max_output_tokens': 200,
+                'temperature': 0.5
+            }
         )
         
         return response.text.strip()
@@ -89,12 +95,13 @@ class ScenarioExplainerAgent:
         Format as a conversation starter that agents can use. Keep it friendly and clear.
         """
         
-        response = self.model.generate_content(
+        response = self.llm.generate(
             prompt,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=150,
-                temperature=0.3
-            )
+            agent=self.AGENT_NAME,
+            generation_config={
+                'max_output_tokens': 150,
+                'temperature': 0.3
+            }
         )
         
         return response.text.strip()
@@ -109,12 +116,13 @@ class ScenarioExplainerAgent:
         Use only common words. Maximum 30 words.
         """
         
-        response = self.model.generate_content(
+        response = self.llm.generate(
             prompt,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=100,
-                temperature=0.2
-            )
+            agent=self.AGENT_NAME,
+            generation_config={
+                'max_output_tokens': 100,
+                'temperature': 0.2
+            }
         )
         
         return response.text.strip()
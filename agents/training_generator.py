@@ -1,72 +1,201 @@
-import google.generativeai as genai
 import os
 import json
-from dotenv import load_dotenv
-
-load_dotenv()
+from utils.llm_gateway import get_gateway
+from utils.phrase_matcher import phrase_matcher
 
 class TrainingGeneratorAgent:
-    def __init__(self):
-        api_key = os.getenv('GEMINI_API_KEY', 'your-gemini-api-key')
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+    # Bump when prompts change so cached analyses are invalidated
+    PROMPT_VERSION = '2'
+    AGENT_NAME = 'training'
+    
+    # 'single_shot' asks for every section in one structured call;
+    # 'per_section' keeps the original one-call-per-section pipeline
+    GENERATION_MODES = ('single_shot', 'per_section')
+    
+    def __init__(self, mode=None):
+        # All model calls go through the shared, concurrency-limited gateway
+        self.llm = get_gateway()
+        self.mode = mode or os.getenv('TRAINING_GENERATION_MODE', 'single_shot')
+        if self.mode not in self.GENERATION_MODES:
+            raise ValueError(f"Unknown training generation mode: {self.mode}")
     
-    def generate_training(self, clause_text):
+    def generate_training(self, clause_text, mode=None):
         """Generate comprehensive training materials for field agents"""
         try:
-            # Generate main training module
-            training_module = self._generate_training_module(clause_text)
+            mode = mode or self.mode
             
-            # Generate quiz questions
-            quiz_questions = self._generate_quiz_questions(clause_text)
-            
-            # Generate key learning points
-            learning_points = self._generate_learning_points(clause_text)
+            if mode == 'single_shot':
+                sections = self._generate_all_sections(clause_text)
+            elif mode == 'per_section':
+                sections = self._generate_sections_individually(clause_text)
+            else:
+                raise ValueError(f"Unknown training generation mode: {mode}")
             
             # Determine target audience and difficulty
             audience_analysis = self._analyze_target_audience(clause_text)
             
-            # Generate training objectives
-            training_objectives = self._generate_training_objectives(clause_text)
-            
-            # Generate practical examples
-            practical_examples = self._generate_practical_examples(clause_text)
-            
-            # Generate role-play scenarios
-            role_play_scenarios = self._generate_role_play_scenarios(clause_text)
-            
-            # Generate common mistakes to avoid
-            common_mistakes = self._generate_common_mistakes(clause_text)
-            
-            return {
-                'training_module': training_module,
-                'quiz_questions': quiz_questions,
-                'key_learning_points': learning_points,
+            result = {
+                'training_module': sections['training_module'],
+                'quiz_questions': sections['quiz_questions'],
+                'key_learning_points': sections['key_learning_points'],
                 'target_audience': audience_analysis.get('audience', 'Insurance Sales Agents'),
                 'difficulty_level': audience_analysis.get('difficulty', 'Intermediate'),
                 'estimated_duration': audience_analysis.get('duration', '15-20 minutes'),
-                'training_objectives': training_objectives,
-                'practical_examples': practical_examples,
-                'role_play_scenarios': role_play_scenarios,
-                'common_mistakes': common_mistakes,
+                'training_objectives': sections['training_objectives'],
+                'practical_examples': sections['practical_examples'],
+                'role_play_scenarios': sections['role_play_scenarios'],
+                'common_mistakes': sections['common_mistakes'],
                 'assessment_criteria': self._generate_assessment_criteria(clause_text),
-                'follow_up_resources': self._generate_follow_up_resources(clause_text)
+                'follow_up_resources': self._generate_follow_up_resources(clause_text),
+                'generation_mode': mode
             }
+            if 'fallback_sections' in sections:
+                result['fallback_sections'] = sections['fallback_sections']
+                if sections['fallback_sections']:
+                    # Canned sections must not be cached in place of a real answer
+                    result['fallback_analysis'] = True
+            
+            return result
             
         except Exception as e:
-            return {
-                'error': f'Training generation failed: {str(e)}',
-                'training_module': 'Training content temporarily unavailable due to API limits. Using fallback training structure.',
-                'quiz_questions': self._get_fallback_quiz(),
-                'key_learning_points': self._get_fallback_learning_points(),
-                'target_audience': 'Insurance Agents',
-                'difficulty_level': 'Intermediate',
-                'estimated_duration': '15 minutes',
-                'training_objectives': self._get_fallback_objectives(),
-                'practical_examples': self._get_fallback_examples(),
-                'role_play_scenarios': self._get_fallback_scenarios(),
-                'common_mistakes': self._get_fallback_mistakes()
+            return self.create_fallback_result(clause_text, str(e))
+    
+    def _generate_sections_individually(self, clause_text):
+        """Original pipeline: one model call per training section"""
+        generators = {
+            'training_module': (self._generate_training_module, self._get_fallback_module),
+            'quiz_questions': (self._generate_quiz_questions, self._get_fallback_quiz),
+            'key_learning_points': (self._generate_learning_points, self._get_fallback_learning_points),
+            'training_objectives': (self._generate_training_objectives, self._get_fallback_objectives),
+            'practical_examples': (self._generate_practical_examples, self._get_fallback_examples),
+            'role_play_scenarios': (self._generate_role_play_scenarios, self._get_fallback_scenarios),
+            'common_mistakes': (self._generate_common_mistakes, self._get_fallback_mistakes)
+        }
+        sections = {}
+        fallback_sections = []
+        for name, (generate, fallback) in generators.items():
+            sections[name] = generate(clause_text)
+            # The section helpers swallow errors and return their canned text
+            if sections[name] == fallback():
+                fallback_sections.append(name)
+        sections['fallback_sections'] = fallback_sections
+        return sections
+    
+    def _generate_all_sections(self, clause_text):
+        """Generate every training section in a single structured model call"""
+        prompt = f"""
+        Create training materials for insurance agents about this policy clause:
+        
+        Clause: {clause_text}
+        
+        Return ONLY a JSON object with exactly these keys:
+        {{
+            "training_module": "Training module text with sections OVERVIEW, KEY TERMS, CUSTOMER IMPACT, COMMON QUESTIONS, BEST PRACTICES and RED FLAGS",
+            "quiz_questions": [
+                {{
+                    "question": "Question text",
+                    "options": ["A) Option 1", "B) Option 2", "C) Option 3", "D) Option 4"],
+                    "correct_answer": "B",
+                    "explanation": "Brief explanation"
+                }}
+            ],
+            "key_learning_points": ["5 clear, actionable points agents must remember"],
+            "training_objectives": ["3 measurable objectives starting with an action verb"],
+            "practical_examples": "2 examples formatted as 'Scenario: ... Agent Response: ...'",
+            "role_play_scenarios": "3 role-play scenarios with customer situation, likely questions, recommended response and key points",
+            "common_mistakes": "5 common mistakes: what agents do wrong, why it is a problem, what to do instead"
+        }}
+        
+        Include 5 quiz questions. Use simple language that agents can easily understand and remember.
+        """
+        
+        response = self.llm.generate(
+            prompt,
+            agent=self.AGENT_NAME,
+            generation_config={
+                'max_output_tokens': 3000,
+                'temperature': 0.3
             }
+        )
+        
+        try:
+            response_text = response.text.strip()
+            if response_text.startswith('```'):
+                response_text = response_text.replace('```json', '').replace('```', '').strip()
+            payload = json.loads(response_text)
+            if not isinstance(payload, dict):
+                payload = {}
+        except (ValueError, AttributeError):
+            payload = {}
+        
+        return self._fill_missing_sections(payload)
+    
+    def _fill_missing_sections(self, payload):
+        """Validate single-shot sections, replacing missing or malformed ones with fallbacks"""
+        sections = {}
+        fallback_sections = []
+        
+        def text_section(name, fallback):
+            value = payload.get(name)
+            if isinstance(value, list) and all(isinstance(v, str) for v in value):
+                value = '\n\n'.join(value)
+            if isinstance(value, str) and value.strip():
+                sections[name] = value.strip()
+            else:
+                sections[name] = fallback()
+                fallback_sections.append(name)
+        
+        def list_section(name, limit, fallback):
+            value = payload.get(name)
+            items = []
+            if isinstance(value, list):
+                items = [v.strip().lstrip('1234567890.-• ') for v in value if isinstance(v, str)]
+                items = [v for v in items if len(v) > 10]
+            if items:
+                sections[name] = items[:limit]
+            else:
+                sections[name] = fallback()
+                fallback_sections.append(name)
+        
+        text_section('training_module', self._get_fallback_module)
+        list_section('key_learning_points', 5, self._get_fallback_learning_points)
+        list_section('training_objectives', 3, self._get_fallback_objectives)
+        text_section('practical_examples', self._get_fallback_examples)
+        text_section('role_play_scenarios', self._get_fallback_scenarios)
+        text_section('common_mistakes', self._get_fallback_mistakes)
+        
+        quiz = payload.get('quiz_questions')
+        valid_quiz = []
+        if isinstance(quiz, list):
+            valid_quiz = [
+                q for q in quiz
+                if isinstance(q, dict) and q.get('question') and isinstance(q.get('options'), list)
+                and q.get('correct_answer')
+            ]
+        if valid_quiz:
+            sections['quiz_questions'] = valid_quiz
+        else:
+            sections['quiz_questions'] = self._get_fallback_quiz()
+            fallback_sections.append('quiz_questions')
+        
+        sections['fallback_sections'] = fallback_sections
+        return sections
+    
+    def create_fallback_result(self, clause_text, error_msg):
+        """Fallback training structure when content cannot be generated"""
+        return {
+            'error': f'Training generation failed: {error_msg}',
+            'training_module': self._get_fallback_module(),
+            'quiz_questions': self._get_fallback_quiz(),
+            'key_learning_points': self._get_fallback_learning_points(),
+            'target_audience': 'Insurance Agents',
+            'difficulty_level': 'Intermediate',
+            'estimated_duration': '15 minutes',
+            'training_objectives': self._get_fallback_objectives(),
+            'practical_examples': self._get_fallback_examples(),
+            'role_play_scenarios': self._get_fallback_scenarios(),
+            'common_mistakes': self._get_fallback_mistakes()
+        }
     
     def _generate_training_module(self, clause_text):
         """Generate comprehensive training module content"""
@@ -87,12 +216,13 @@ class TrainingGeneratorAgent:
         Keep each section concise but informative. Use simple language that agents can easily understand and remember.
         """
         
-        response = self.model.generate_content(
+        response = self.llm.generate(
             prompt,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=600,
-                temperature=0.3
-            )
+            agent=self.AGENT_NAME,
+            generation_config={
+                'max_output_tokens': 600,
+                'temperature': 0.3
+            }
         )
         
         return response.text.strip()
@@ -122,12 +252,13 @@ class TrainingGeneratorAgent:
         """
         
         try:
-            response = self.model.generate_content(
+            response = self.llm.generate(
                 prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=700,
-                    temperature=0.4
-                )
+                agent=self.AGENT_NAME,
+                generation_config={
+                    'max_output_tokens': 700,
+                    'temperature': 0.4
+                }
             )
             
             response_text = response.text.strip()
@@ -156,12 +287,13 @@ class TrainingGeneratorAgent:
         """
         
         try:
-            response = self.model.generate_content(
+            response = self.llm.generate(
                 prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=500,
-                    temperature=0.4
-                )
+                agent=self.AGENT_NAME,
+                generation_config={
+                    'max_output_tokens': 500,
+                    'temperature': 0.4
+                }
             )
             
             return response.text.strip()
@@ -185,12 +317,13 @@ class TrainingGeneratorAgent:
         """
         
         try:
-            response = self.model.generate_content(
+            response = self.llm.generate(
                 prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=400,
-                    temperature=0.3
-                )
+                agent=self.AGENT_NAME,
+                generation_config={
+                    'max_output_tokens': 400,
+                    'temperature': 0.3
+                }
             )
             
             return response.text.strip()
@@ -223,6 +356,9 @@ class TrainingGeneratorAgent:
         return resources
     
     # Fallback methods when API is unavailable
+    def _get_fallback_module(self):
+        return 'Training content temporarily unavailable due to API limits. Using fallback training structure.'
+    
     def _get_fallback_quiz(self):
         return [
             {
@@ -325,12 +461,13 @@ Solution: Acknowledge customer concerns, explain rationale calmly
         """
         
         try:
-            response = self.model.generate_content(
+            response = self.llm.generate(
                 prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=300,
-                    temperature=0.3
-                )
+                agent=self.AGENT_NAME,
+                generation_config={
+                    'max_output_tokens': 300,
+                    'temperature': 0.3
+                }
             )
             
             points = response.text.strip().split('\n')
@@ -351,8 +488,7 @@ Solution: Acknowledge customer concerns, explain rationale calmly
         """Analyze complexity to determine target audience and training parameters"""
         word_count = len(clause_text.split())
         
-        legal_terms = ['notwithstanding', 'pursuant', 'heretofore', 'whereas', 'subrogation']
-        complex_terms = sum(1 for term in legal_terms if term.lower() in clause_text.lower())
+        complex_terms = len(phrase_matcher.find(clause_text, 'complex_legal_terms'))
         
         if word_count > 50 or complex_terms > 2:
             difficulty = "Advanced"
@@ -385,12 +521,13 @@ Solution: Acknowledge customer concerns, explain rationale calmly
             Format as a simple list.
             """
             
-            response = self.model.generate_content(
+            response = self.llm.generate(
                 prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=200,
-                    temperature=0.3
-                )
+                agent=self.AGENT_NAME,
+                generation_config={
+                    'max_output_tokens': 200,
+                    'temperature': 0.3
+                }
             )
             
             objectives = response.text.strip().split('\n')
@@ -421,12 +558,13 @@ Solution: Acknowledge customer concerns, explain rationale calmly
             Keep examples realistic and actionable.
             """
             
-            response = self.model.generate_content(
+            response = self.llm.generate(
                 prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=300,
-                    temperature=0.4
-                )
+                agent=self.AGENT_NAME,
+                generation_config={
+                    'max_output_tokens': 300,
+                    'temperature': 0.4
+                }
             )
             
             return response.text.strip()
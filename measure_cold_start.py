@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Cold Start Measurement for PolicyIntelliHub
+Starts fresh interpreters to report what a new worker (or a Vercel cold start)
+pays: the import-time breakdown of `import app`, the first responses of the
+lightweight routes, and the build cost of each lazily loaded component.
+
+    python measure_cold_start.py              # human-readable report
+    python measure_cold_start.py --json out.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that must not load before a request needs them
+HEAVY_MODULES = ('textstat', 'PyPDF2', 'reportlab', 'google.generativeai')
+
+PROBE = r'''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+routes = {}
+for path in ('/health', '/', '/analytics'):
+    began = time.perf_counter()
+    response = client.get(path)
+    response.close()
+    routes[path] = {'status': response.status_code, 'ms': round((time.perf_counter() - began) * 1000, 2)}
+heavy_loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+for name in app.components.stats()['registered']:
+    app.components.get(name)
+print(json.dumps({
+    'import_app_ms': round((imported - start) * 1000, 2),
+    'first_requests': routes,
+    'heavy_modules_loaded_by_light_routes': heavy_loaded,
+    'components': app.components.stats()['timings']
+}))
+'''
+
+
+def parse_importtime(stderr: str, limit: int):
+    """Direct imports of `app` by cumulative time, from python -X importtime output"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, self_us, cumulative_us, name = (part for part in [''] + line[len('import time:'):].split('|'))
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level == 1:
+            entries.append({'module': name.strip(), 'cumulative_ms': round(int(cumulative_us) / 1000, 2)})
+        elif level == 0 and name.strip() == 'app':
+            total_ms = round(int(cumulative_us) / 1000, 2)
+            own_ms = round(int(self_us) / 1000, 2)
+    entries.sort(key=lambda entry: entry['cumulative_ms'], reverse=True)
+    return {'total_ms': total_ms, 'app_module_ms': own_ms, 'imports': entries[:limit]}
+
+
+def run(code: str, *flags):
+    env = dict(os.environ)
+    env.setdefault('LLM_BACKEND', 'offline')
+    return subprocess.run([sys.executable, *flags, '-c', code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold start cost of the PolicyIntelliHub app')
+    parser.add_argument('--top', type=int, default=15, help='imports to list in the breakdown')
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    breakdown = parse_importtime(run('import app', '-X', 'importtime').stderr, args.top)
+    probe = run(f'HEAVY_MODULES = {HEAVY_MODULES!r}\n{PROBE}').stdout.strip().splitlines()[-1]
+    report = dict(json.loads(probe), import_breakdown=breakdown)
+
+    print(f"🧊 Cold start (LLM backend: {os.getenv('LLM_BACKEND', 'offline')})")
+    print(f"   import app: {report['import_app_ms']} ms "
+          f"(importtime total {breakdown['total_ms']} ms, app module itself {breakdown['app_module_ms']} ms)")
+    print("\n📦 Import breakdown (direct imports of app, cumulative)")
+    for entry in breakdown['imports']:
+        print(f"   {entry['cumulative_ms']:>9.2f} ms  {entry['module']}")
+    print("\n🌐 First requests")
+    for path, result in report['first_requests'].items():
+        print(f"   {path:<12} {result['status']}  {result['ms']:>8.2f} ms")
+    heavy = report['heavy_modules_loaded_by_light_routes']
+    print(f"   {'⚠️ Heavy modules loaded: ' + ', '.join(heavy) if heavy else '✅ No heavy modules loaded'}")
+    print("\n🤖 Lazy components (first build)")
+    for name, timing in sorted(report['components'].items(), key=lambda item: -item[1]['build_ms']):
+        print(f"   {timing['build_ms']:>9.2f} ms  {name:<20} ({timing['modules_imported']} modules imported)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report written to {args.json}")
+    return 1 if heavy else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
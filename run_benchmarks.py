@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite for PolicyIntelliHub
+Times every agent, PDF clause extraction, bulk report generation, history
+save/load and benchmark retrieval with warmup and repeated runs, writes the
+median/p95/IQR to JSON and compares it with the committed baseline.
+
+Agents answer from the offline LLM backend unless LLM_BACKEND is set, so the
+numbers measure this code rather than the network. Use LLM_BACKEND=replay with
+a recorded cassette for production-shaped answers.
+
+    python run_benchmarks.py                     # run, compare, exit 1 on regressions
+    python run_benchmarks.py --only agent.       # subset by name prefix
+    python run_benchmarks.py --update-baseline   # accept the current numbers
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+os.environ.setdefault('LLM_BACKEND', 'offline')
+sys.path.append('.')
+
+from utils.benchmarking import (build_results, compare, format_comparison, load_results, run_benchmark,
+                                write_results)
+
+BASELINE_PATH = 'benchmarks/baseline.json'
+RESULTS_PATH = 'benchmarks/results.json'
+SAMPLE_PDF = 'test_data/sample_insurance_policy.pdf'
+
+CLAUSES = [
+    "Claims must be reported within thirty (30) days of the incident occurrence, accompanied by all requisite "
+    "documentation as specified in the claims processing guidelines.",
+    "The company may, at its discretion, settle claims as deemed appropriate from time to time, subject to "
+    "reasonable efforts to verify the circumstances, notwithstanding any other provisions contained herein.",
+    "Notwithstanding any provision herein contained to the contrary, the insurer shall not be liable for any loss "
+    "or damage caused directly or indirectly by nuclear reaction, nuclear radiation, or radioactive contamination."
+]
+
+
+def _agent_benchmarks():
+    from agents.benchmark_analyzer import BenchmarkAnalyzerAgent
+    from agents.compliance_checker import ComplianceCheckerAgent
+    from agents.multilingual_converter import MultilingualConverterAgent
+    from agents.policy_rewriter import PolicyRewriterAgent
+    from agents.risk_scorer import RiskScorerAgent
+    from agents.scenario_explainer import ScenarioExplainerAgent
+    from agents.training_generator import TrainingGeneratorAgent
+
+    agents = {
+        'agent.policy_rewriter': PolicyRewriterAgent().rewrite,
+        'agent.compliance_checker': ComplianceCheckerAgent().check_compliance,
+        'agent.risk_scorer': RiskScorerAgent().score_risk,
+        'agent.scenario_explainer': ScenarioExplainerAgent().generate_scenario,
+        'agent.multilingual_converter': MultilingualConverterAgent().convert_languages,
+        'agent.training_generator': TrainingGeneratorAgent().generate_training,
+        'agent.benchmark_analyzer': BenchmarkAnalyzerAgent().analyze_similarity
+    }
+    return {
+        name: {'func': lambda method=method: [method(clause) for clause in CLAUSES]}
+        for name, method in agents.items()
+    }
+
+
+def _pdf_benchmarks():
+    from utils.pdf_processor import PDFProcessor
+
+    processor = PDFProcessor()
+    return {'pdf.extract_clauses': {'func': lambda: processor.extract_clauses(SAMPLE_PDF)}}
+
+
+def _document_results():
+    """Per-clause results shaped like a document analysis job's, for the report"""
+    from agents.compliance_checker import ComplianceCheckerAgent
+    from agents.policy_rewriter import PolicyRewriterAgent
+    from agents.risk_scorer import RiskScorerAgent
+
+    rewriter, compliance, risk = PolicyRewriterAgent(), ComplianceCheckerAgent(), RiskScorerAgent()
+    results = []
+    for i in range(10):
+        clause = CLAUSES[i % len(CLAUSES)]
+        results.append({
+            'clause_number': i + 1,
+            'original_clause': clause,
+            'plain_english': rewriter.rewrite(clause),
+            'compliance_check': compliance.check_compliance(clause),
+            'risk_score': risk.score_risk(clause)
+        })
+    return results
+
+
+def _report_benchmarks(workdir):
+    from utils.report_generator import ReportGenerator
+
+    generator = ReportGenerator()
+    generator.reports_dir = os.path.join(workdir, 'reports')
+    os.makedirs(generator.reports_dir, exist_ok=True)
+    document_results = _document_results()
+    return {
+        'report.generate_bulk_report': {
+            'func': lambda: generator.generate_bulk_report(document_results, 'sample_insurance_policy.pdf')
+        }
+    }
+
+
+def _history_result(i):
+    return {
+        'analysis_id': f'benchmark-{i}',
+        'timestamp': f'2024-01-{i % 28 + 1:02d}T{i % 24:02d}:00:00',
+        'original_clause': CLAUSES[i % len(CLAUSES)],
+        'plain_english': {'readability_improvement': i % 30},
+        'compliance_check': {'status': 'COMPLIANT' if i % 3 else 'NON_COMPLIANT',
+                             'regulatory_issues': ['issue'] * (i % 3)},
+        'risk_score': {'risk_level': ('Low', 'Medium', 'High')[i % 3]}
+    }
+
+
+def _history_benchmarks(workdir):
+    from utils.history_store import HistoryStore
+
+    store = HistoryStore(os.path.join(workdir, 'history.sqlite3'))
+    for i in range(2000):
+        store.append(_history_result(i))
+    counter = iter(range(2000, 10 ** 9))
+
+    def load():
+        # What the analytics dashboard reads
+        return store.summary_totals(), store.recent(10), store.rollups('day', 7), store.rollups('hour', 24)
+
+    return {
+        'history.save': {'func': lambda: store.append(_history_result(next(counter)))},
+        'history.load': {'func': load}
+    }
+
+
+def _retrieval_benchmarks(workdir):
+    from agents.benchmark_analyzer import BenchmarkAnalyzerAgent
+
+    agent = BenchmarkAnalyzerAgent()
+    # A library the size of a real standards corpus, generated deterministically from the built-in one
+    rng = random.Random(0)
+    standards = [(category, text) for category, texts in agent.industry_standards.items() for text in texts]
+    qualifiers = ['unless otherwise agreed', 'for the policy period', 'as stated in the schedule',
+                  'subject to the deductible', 'within the sum insured', "at the insurer's option"]
+    library = []
+    for i in range(3000):
+        category, text = rng.choice(standards)
+        library.append({'category': category, 'text': f"{text[:-1]}, {rng.choice(qualifiers)} (variant {i})."})
+    library_path = os.path.join(workdir, 'standards_library.json')
+    with open(library_path, 'w') as f:
+        json.dump(library, f)
+    agent.load_standards_library(library_path)
+
+    return {
+        'benchmark_analyzer.retrieval': {
+            'func': lambda: [agent._find_similar_clauses(clause) for clause in CLAUSES]
+        }
+    }
+
+
+def collect_benchmarks(workdir):
+    benchmarks = {}
+    for factory in (_agent_benchmarks, _pdf_benchmarks, lambda: _report_benchmarks(workdir),
+                    lambda: _history_benchmarks(workdir), lambda: _retrieval_benchmarks(workdir)):
+        benchmarks.update(factory())
+    return benchmarks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the PolicyIntelliHub benchmark suite')
+    parser.add_argument('--warmup', type=int, default=2, help='untimed runs before measuring')
+    parser.add_argument('--repeat', type=int, default=15, help='timed runs per benchmark')
+    parser.add_argument('--only', default='', help='run benchmarks whose name starts with this prefix')
+    parser.add_argument('--output', default=RESULTS_PATH, help='where to write the JSON results')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed median slowdown as a fraction of the baseline')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                        help='ignore median changes smaller than this (run-to-run noise of fast benchmarks)')
+    parser.add_argument('--update-baseline', action='store_true', help='write the results as the new baseline')
+    args = parser.parse_args()
+
+    print("🏁 PolicyIntelliHub benchmark suite")
+    print(f"⚙️  LLM backend: {os.environ['LLM_BACKEND']} | warmup {args.warmup} | repeat {args.repeat}")
+
+    workdir = tempfile.mkdtemp(prefix='policyhub_bench_')
+    try:
+        # Agents and the PDF processor print progress; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            benchmarks = collect_benchmarks(workdir)
+
+        measured = {}
+        for name, benchmark in benchmarks.items():
+            if not name.startswith(args.only):
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = run_benchmark(benchmark['func'], warmup=args.warmup, repeat=args.repeat,
+                                      setup=benchmark.get('setup'))
+            measured[name] = stats
+            print(f"⏱️  {name:<40} median {stats['median_ms']:>9.2f} ms | p95 {stats['p95_ms']:>9.2f} ms | "
+                  f"IQR {stats['iqr_ms']:>8.2f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = build_results(measured, {'warmup': args.warmup, 'repeat': args.repeat, 'only': args.only})
+    write_results(args.output, results)
+    print(f"\n💾 Results written to {args.output}")
+
+    if args.update_baseline:
+        write_results(args.baseline, results)
+        print(f"📌 Baseline updated: {args.baseline}")
+        return 0
+
+    baseline = load_results(args.baseline)
+    if baseline is None:
+        print(f"⚠️ No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+
+    if args.only:
+        baseline = dict(baseline, benchmarks={
+            name: stats for name, stats in baseline['benchmarks'].items() if name.startswith(args.only)
+        })
+    comparisons = compare(results, baseline, tolerance=args.tolerance, min_delta_ms=args.min_delta_ms)
+    print(f"\n📊 Comparison with {args.baseline} (tolerance {args.tolerance:.0%} on the median)")
+    print(format_comparison(comparisons))
+
+    regressions = [entry['name'] for entry in comparisons if entry['status'] == 'regression']
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Load Test for PolicyIntelliHub
+Drives the Flask app in-process (no server, no network) with a weighted mix of
+/analyze-clause, /upload-document, /analytics and /health requests and reports
+throughput, p50/p95/p99 latency, error rates and peak RSS for one worker process.
+
+The app runs in a scratch directory so uploads, history and caches start empty,
+and agents answer from the offline LLM backend unless LLM_BACKEND is set
+(OFFLINE_LLM_LATENCY_MS etc. model the model's latency).
+
+    python run_load_test.py --concurrency 8 --duration 30            # closed loop: saturation throughput
+    python run_load_test.py --rate 20 --duration 30                   # open loop: latency at 20 req/s
+    python run_load_test.py --mix analyze=1 --clause-pool 0           # cold analyses only
+    python run_load_test.py --mix analyze_fast=1                      # rule-only answers, enrichment queued
+"""
+
+import argparse
+import atexit
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(ROOT)
+
+from utils.load_generator import LoadGenerator, Scenario
+
+SAMPLE_PDF = os.path.join(ROOT, 'test_data', 'sample_insurance_policy.pdf')
+DEFAULT_MIX = 'analyze=6,analytics=2,upload=1,health=1'
+
+CLAUSES = [
+    "Claims must be reported within thirty (30) days of the incident occurrence, accompanied by all requisite "
+    "documentation as specified in the claims processing guidelines.",
+    "The company may, at its discretion, settle claims as deemed appropriate from time to time, subject to "
+    "reasonable efforts to verify the circumstances, notwithstanding any other provisions contained herein.",
+    "Coverage applies to sudden and accidental pollution of surface water, groundwater, or soil on or off the "
+    "insured premises, provided such pollution is caused by the escape of pollutants during the policy period.",
+    "The insurer will pay for car damage from accidents."
+]
+
+
+def parse_mix(mix: str):
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def build_scenarios(weights, clause_pool: int, pdf_bytes: bytes):
+    """clause_pool > 0 cycles through that many distinct clauses (warm analysis cache); 0 makes every one unique"""
+
+    def clause_text(sequence):
+        variant = sequence % clause_pool if clause_pool else sequence
+        return f"{CLAUSES[variant % len(CLAUSES)]} (Ref. {variant})"
+
+    senders = {
+        'analyze': lambda client, sequence: client.post('/analyze-clause', json={
+            'clause_text': clause_text(sequence)
+        }),
+        'analyze_fast': lambda client, sequence: client.post('/analyze-clause', json={
+            'clause_text': clause_text(sequence), 'mode': 'fast'
+        }),
+        'upload': lambda client, sequence: client.post('/upload-document', data={
+            'file': (io.BytesIO(pdf_bytes), f'policy_{sequence}.pdf')
+        }, content_type='multipart/form-data'),
+        'analytics': lambda client, sequence: client.get('/analytics'),
+        'health': lambda client, sequence: client.get('/health')
+    }
+    unknown = set(weights) - set(senders)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))} (choose from {', '.join(senders)})")
+    return [Scenario(name, weight, senders[name]) for name, weight in weights.items()]
+
+
+def print_report(report):
+    print(f"\n📊 {report['mode'].upper()} LOOP | concurrency {report['concurrency']}"
+          + (f" | target {report['target_rate_rps']} req/s" if report['target_rate_rps'] else ''))
+    print(f"   Requests: {report['requests']} in {report['elapsed_s']}s → {report['throughput_rps']} req/s")
+    print(f"   Errors: {report['errors']} ({report['error_rate']:.1%}) | statuses {report['status_counts']}")
+    latency = report['latency_ms']
+    print(f"   Latency ms: p50 {latency['p50']} | p95 {latency['p95']} | p99 {latency['p99']} | max {latency['max']}")
+    print(f"   Peak RSS: {report['peak_rss_mb']} MB (+{report['rss_growth_mb']} MB during the run)")
+    for name, scenario in report['scenarios'].items():
+        latency = scenario['latency_ms']
+        print(f"   • {name:<10} {scenario['requests']:>6} req | {scenario['throughput_rps']:>8} req/s | "
+              f"p50 {latency['p50']:>8} | p95 {latency['p95']:>8} | p99 {latency['p99']:>8} ms | "
+              f"errors {scenario['error_rate']:.1%}")
+    if report.get('jobs'):
+        print(f"   Document jobs: {report['jobs']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='In-process load test of the PolicyIntelliHub Flask app')
+    parser.add_argument('--concurrency', type=int, default=4, help='concurrent in-flight requests')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='open loop: requests per second (default: closed loop at --concurrency)')
+    parser.add_argument('--duration', type=float, default=15, help='seconds to run')
+    parser.add_argument('--requests', type=int, default=None, help='stop after this many requests')
+    parser.add_argument('--warmup-requests', type=int, default=20, help='untimed requests before measuring')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'scenario weights (default {DEFAULT_MIX})')
+    parser.add_argument('--clause-pool', type=int, default=50,
+                        help='distinct clauses to cycle through; 0 makes every analysis a cache miss')
+    parser.add_argument('--seed', type=int, default=0, help='scenario selection seed')
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--workdir', help='directory the app runs in (default: a temporary one)')
+    parser.add_argument('--verbose', action='store_true', help="show the app's own log output")
+    args = parser.parse_args()
+
+    os.environ.setdefault('LLM_BACKEND', 'offline')
+    with open(SAMPLE_PDF, 'rb') as f:
+        pdf_bytes = f.read()
+    scenarios = build_scenarios(parse_mix(args.mix), args.clause_pool, pdf_bytes)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='policyhub_load_')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    # Keep this run's metrics files and LLM rate-limit state away from a real deployment's
+    os.environ.setdefault('METRICS_MULTIPROC_DIR', os.path.join(workdir, 'metrics'))
+    os.environ.setdefault('LLM_RATE_STATE_PATH', os.path.join(workdir, 'llm_limits.json'))
+    print(f"🏋️ Load test | LLM backend: {os.environ['LLM_BACKEND']} | workdir: {workdir}")
+
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with quiet:
+            import app as app_module
+
+            if args.warmup_requests:
+                LoadGenerator(app_module.app, scenarios, concurrency=args.concurrency, duration=60,
+                              max_requests=args.warmup_requests, seed=args.seed + 1).run()
+            report = LoadGenerator(app_module.app, scenarios, concurrency=args.concurrency, rate=args.rate,
+                                   duration=args.duration, max_requests=args.requests, seed=args.seed).run()
+            # Give queued document jobs a moment, then report how far behind the job workers are
+            time.sleep(0.5)
+            report['jobs'] = app_module.job_store.count_by_status()
+
+        report['config'] = {
+            'mix': parse_mix(args.mix), 'clause_pool': args.clause_pool,
+            'warmup_requests': args.warmup_requests, 'llm_backend': os.environ['LLM_BACKEND']
+        }
+        print_report(report)
+        if args.output:
+            with open(os.path.join(ROOT, args.output) if not os.path.isabs(args.output) else args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"\n💾 Report written to {args.output}")
+    finally:
+        app_module = sys.modules.get('app')
+        if app_module is not None:
+            app_module.job_queue.stop()
+            # The exit-time metrics flush would write into the removed workdir
+            atexit.unregister(app_module.metrics_exporter.flush)
+        os.chdir(ROOT)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,7 +17,7 @@ document.addEventListener('DOMContentLoaded', function() {
         showLoading();
         
         try {
-            const response = await fetch('/analyze-clause', {
+            const response = await fetch('/analyze-clause/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -25,14 +25,28 @@ document.addEventListener('DOMContentLoaded', function() {
                 body: JSON.stringify({ clause_text: clauseText })
             });
 
-            const data = await response.json();
-            
-            if (data.error) {
+            if (!response.ok) {
+                const data = await response.json();
                 alert('Error: ' + data.error);
                 return;
             }
 
-            displayResults(data);
+            // Each agent's section is rendered as soon as its result arrives
+            await readAnalysisStream(response, function(event, analysis) {
+                if (event.event === 'started') {
+                    hideLoading();
+                } else if (event.event === 'result') {
+                    displayResults({ original_clause: analysis.original_clause, [event.name]: event.data });
+                } else if (event.event === 'enterprise_metadata') {
+                    displayResults({
+                        analysis_id: analysis.analysis_id,
+                        processing_model: analysis.processing_model,
+                        enterprise_metadata: event.data
+                    });
+                } else if (event.event === 'error') {
+                    alert('Error: ' + event.error);
+                }
+            });
             
         } catch (error) {
             alert('Network error: ' + error.message);
@@ -62,8 +76,16 @@ document.addEventListener('DOMContentLoaded', function() {
                 body: formData
             });
 
-            const data = await response.json();
+            const job = await response.json();
             
+            if (job.error) {
+                alert('Error: ' + job.error);
+                return;
+            }
+
+            // Queued documents are processed in the background; poll until the job finishes.
+            // Without background workers the upload response already carries the results.
+            const data = job.status === 'queued' ? await waitForJob(job) : job;
             if (data.error) {
                 alert('Error: ' + data.error);
                 return;
@@ -79,6 +101,54 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    async function readAnalysisStream(response, onEvent) {
+        // NDJSON: one JSON event per line
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        const analysis = {};
+        let buffer = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.filter(line => line.trim()).forEach(line => {
+                const event = JSON.parse(line);
+                if (event.event === 'started') {
+                    Object.assign(analysis, event);
+                }
+                try {
+                    onEvent(event, analysis);
+                } catch (error) {
+                    // One section failing to render must not stop the remaining agents' results
+                    console.error(`Could not render ${event.name || event.event}:`, error);
+                }
+            });
+        }
+        return analysis;
+    }
+
+    async function waitForJob(job, intervalMs = 2000, maxAttempts = 450) {
+        // Gives up after maxAttempts polls (15 minutes by default) instead of spinning forever
+        for (let attempt = 0; attempt < maxAttempts; attempt++) {
+            const response = await fetch(job.results_url);
+            const status = await response.json();
+            if (response.status !== 202) {
+                // Results, or {error, status: 'failed'}
+                return status;
+            }
+            if (status.status === 'failed') {
+                return { error: status.error || 'Document processing failed' };
+            }
+            console.log(`Job ${job.job_id}: ${status.progress.completed}/${status.progress.total} clauses analyzed`);
+            await new Promise(resolve => setTimeout(resolve, intervalMs));
+        }
+        return { error: `Document is still processing after ${Math.round(maxAttempts * intervalMs / 60000)} minutes; check ${job.status_url} later` };
+    }
+
     function showLoading() {
         loadingSpinner.style.display = 'block';
         resultsSection.style.display = 'none';
@@ -122,8 +192,11 @@ document.addEventListener('DOMContentLoaded', function() {
             resultsCard.insertBefore(enterpriseInfo, resultsCard.firstChild);
         }
 
-        // Display Plain English results
-        if (data.plain_english) {
+        // Display Plain English results (a failed rewrite is only {error})
+        if (data.plain_english && data.plain_english.error) {
+            document.getElementById('originalText').textContent = data.original_clause;
+            document.getElementById('plainEnglishText').textContent = data.plain_english.error;
+        } else if (data.plain_english) {
             document.getElementById('originalText').textContent = data.original_clause;
             document.getElementById('plainEnglishText').textContent = data.plain_english.plain_english_text;
             
@@ -142,8 +215,20 @@ document.addEventListener('DOMContentLoaded', function() {
             document.getElementById('irdaiCompliant').textContent = data.plain_english.meets_irdai_standards ? 'Yes' : 'No';
         }
 
-        // Display Compliance results
-        if (data.compliance_check) {
+        // Display Compliance results (a failed check is only {error})
+        if (data.compliance_check && data.compliance_check.error) {
+            document.getElementById('complianceScore').textContent = 'N/A';
+            const statusElement = document.getElementById('complianceStatus');
+            statusElement.textContent = 'UNAVAILABLE';
+            statusElement.className = 'badge bg-secondary';
+            const issuesContainer = document.getElementById('complianceIssues');
+            issuesContainer.innerHTML = '';
+            const errorDiv = document.createElement('div');
+            errorDiv.className = 'alert alert-danger';
+            errorDiv.textContent = data.compliance_check.error;
+            issuesContainer.appendChild(errorDiv);
+            document.getElementById('complianceRecommendations').innerHTML = '';
+        } else if (data.compliance_check) {
             const compliance = data.compliance_check;
             document.getElementById('complianceScore').textContent = compliance.compliance_score;
             
@@ -178,8 +263,10 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         }
 
-        // Display Scenario results
-        if (data.customer_scenario) {
+        // Display Scenario results (failed generation is only {error})
+        if (data.customer_scenario && data.customer_scenario.error) {
+            document.getElementById('mainScenario').textContent = data.customer_scenario.error;
+        } else if (data.customer_scenario) {
             const scenario = data.customer_scenario;
             document.getElementById('mainScenario').textContent = scenario.main_scenario;
             document.getElementById('simpleExplanation').textContent = scenario.simple_explanation;
@@ -209,6 +296,13 @@ document.addEventListener('DOMContentLoaded', function() {
                 
                 translationsContainer.appendChild(colDiv);
             });
+        } else if (data.multilingual && data.multilingual.error) {
+            const translationsContainer = document.getElementById('translations');
+            translationsContainer.innerHTML = '';
+            const errorDiv = document.createElement('div');
+            errorDiv.className = 'alert alert-danger';
+            errorDiv.textContent = data.multilingual.error;
+            translationsContainer.appendChild(errorDiv);
         }
 
         // Display Risk results
@@ -0,0 +1,152 @@
+"""
+Test the content-addressed analysis cache
+"""
+
+import os
+import tempfile
+import time
+from utils.analysis_cache import AnalysisCache, make_cache_key, dedupe_clauses
+
+
+def test_analysis_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'cache.sqlite3')
+        cache = AnalysisCache(db_path, memory_max_entries=2)
+        calls = []
+
+        def agent(clause_text):
+            calls.append(clause_text)
+            return {'risk_score': 55, 'clause_length': len(clause_text)}
+
+        cached_agent = cache.wrap('risk_score', '1', agent)
+
+        first = cached_agent("Claims must be  reported within 30 days.")
+        second = cached_agent("Claims must be reported within 30 days.  ")
+        assert first == second
+        assert len(calls) == 1
+
+        # Memory level evicts by size; the disk level still answers
+        cached_agent("Subrogation rights are reserved by the insurer.")
+        cached_agent("War and invasion losses are excluded.")
+        assert cache.stats()['memory_evictions'] >= 1
+        fresh_process = AnalysisCache(db_path)
+        assert fresh_process.get(make_cache_key("Claims must be reported within 30 days.", 'risk_score', '1'))
+
+        # Prompt version is part of the key
+        assert make_cache_key("x", 'risk_score', '1') != make_cache_key("x", 'risk_score', '2')
+
+        stats = cache.stats()
+        print(f"Cache stats: {stats}")
+        assert stats['memory_hits'] == 1
+        assert stats['misses'] == 3
+
+
+def test_analysis_cache_skips_errors_and_expires():
+    cache = AnalysisCache(None, ttl_seconds=0.05)
+    results = iter([{'error': 'LLM unavailable'}, {'value': 1}, {'value': 2}])
+    cached_agent = cache.wrap('plain_english', '1', lambda clause_text: next(results))
+
+    assert 'error' in cached_agent("clause")
+    assert cached_agent("clause") == {'value': 1}
+    assert cached_agent("clause") == {'value': 1}
+    time.sleep(0.1)
+    assert cached_agent("clause") == {'value': 2}
+
+
+def test_analysis_cache_wrap_batch():
+    cache = AnalysisCache(None)
+    batches = []
+
+    def batch_agent(clause_texts):
+        batches.append(list(clause_texts))
+        return [{'length': len(text)} for text in clause_texts]
+
+    cache.wrap('risk_score', '1', lambda text: {'length': len(text)})("Clause A.")
+    cached_batch = cache.wrap_batch('risk_score', '1', batch_agent)
+
+    # Entries cached by the single-clause path are reused; only misses reach the batch
+    assert cached_batch(["Clause A.", "Clause BB."]) == [{'length': 9}, {'length': 10}]
+    assert batches == [["Clause BB."]]
+    cached_batch(["Clause BB.", "Clause A."])
+    assert len(batches) == 1
+
+
+def test_dedupe_clauses():
+    clauses = [
+        "Claims must be reported within 30 days.",
+        "Claims must be  reported within 30 days.",
+        "CLAIMS must be reported within 30 days",
+        "Claims must be reported within 60 days.",
+        "Claims must be reported within 30 days."
+    ]
+    unique, assignment, stats = dedupe_clauses(clauses)
+
+    assert unique == ["Claims must be reported within 30 days.", "Claims must be reported within 60 days."]
+    assert assignment == [0, 0, 0, 1, 0]
+    assert stats == {'total_clauses': 5, 'exact_duplicates': 2, 'near_duplicates': 1, 'unique_clauses': 2}
+
+
+
+class GarbledLLM:
+    """Gateway stand-in whose answers are never valid JSON"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt, **kwargs):
+        self.calls += 1
+        return type('Response', (), {'text': 'Sorry, I cannot help with that.'})()
+
+
+def test_training_parse_failure_is_not_cached():
+    from agents.training_generator import TrainingGeneratorAgent
+
+    agent = TrainingGeneratorAgent(mode='single_shot')
+    agent.llm = GarbledLLM()
+    cached_training = AnalysisCache(None).wrap('training_materials', agent.PROMPT_VERSION, agent.generate_training)
+
+    first = cached_training("Claims must be reported within 30 days.")
+    assert first['fallback_analysis'] and 'training_module' in first['fallback_sections']
+    cached_training("Claims must be reported within 30 days.")
+    assert agent.llm.calls == 2
+
+    # Per-section helpers swallow their errors and return canned text, which is marked too
+    agent = TrainingGeneratorAgent(mode='per_section')
+    agent.llm = GarbledLLM()
+    cached_training = AnalysisCache(None).wrap('training_materials', agent.PROMPT_VERSION, agent.generate_training)
+    first = cached_training("Claims must be reported within 30 days.")
+    assert first['fallback_analysis'] and 'quiz_questions' in first['fallback_sections']
+    assert 'training_module' not in first['fallback_sections']
+    calls = agent.llm.calls
+    cached_training("Claims must be reported within 30 days.")
+    assert agent.llm.calls == 2 * calls
+
+
+def test_agent_parse_failures_are_not_cached():
+    from agents.benchmark_analyzer import BenchmarkAnalyzerAgent
+    from agents.compliance_checker import ComplianceCheckerAgent
+    from agents.risk_scorer import RiskScorerAgent
+
+    clause = "Claims must be reported within 30 days, notwithstanding any other provisions."
+    for name, agent, method in (
+        ('risk_score', RiskScorerAgent(), 'score_risk'),
+        ('compliance_check', ComplianceCheckerAgent(), 'check_compliance'),
+        ('benchmark_analysis', BenchmarkAnalyzerAgent(), 'analyze_similarity')
+    ):
+        agent.llm = GarbledLLM()
+        cached_call = AnalysisCache(None).wrap(name, agent.PROMPT_VERSION, getattr(agent, method))
+
+        result = cached_call(clause)
+        assert result['fallback_analysis'] is True, name
+        cached_call(clause)
+        assert agent.llm.calls == 2, name
+
+
+if __name__ == "__main__":
+    test_analysis_cache()
+    test_analysis_cache_skips_errors_and_expires()
+    test_analysis_cache_wrap_batch()
+    test_dedupe_clauses()
+    test_training_parse_failure_is_not_cached()
+    test_agent_parse_failures_are_not_cached()
+    print("✅ Analysis cache tests passed")
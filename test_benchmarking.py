@@ -0,0 +1,67 @@
+"""
+Test the benchmark harness: robust statistics and baseline regression comparison
+"""
+
+import os
+import tempfile
+from utils.benchmarking import build_results, compare, load_results, run_benchmark, summarize, write_results
+
+
+def test_statistics():
+    stats = summarize([float(value) for value in range(1, 101)])
+
+    assert stats['runs'] == 100
+    assert stats['median_ms'] == 50.5
+    assert stats['p95_ms'] == 95.05
+    assert stats['iqr_ms'] == 49.5
+    assert stats['min_ms'] == 1 and stats['max_ms'] == 100
+
+    # One outlier moves the mean but not the median
+    noisy = summarize([10.0] * 9 + [1000.0])
+    assert noisy['median_ms'] == 10 and noisy['mean_ms'] == 109
+
+
+def test_warmup_and_setup_are_not_timed():
+    calls = {'func': 0, 'setup': 0}
+
+    def setup():
+        calls['setup'] += 1
+
+    def func():
+        calls['func'] += 1
+
+    stats = run_benchmark(func, warmup=3, repeat=5, setup=setup)
+    assert calls == {'func': 8, 'setup': 8}
+    assert stats['runs'] == 5 and len(stats['samples_ms']) == 5 and stats['warmup'] == 3
+
+
+def test_regressions_against_baseline():
+    def results(**medians):
+        return build_results({name: {'median_ms': value} for name, value in medians.items()})
+
+    baseline = results(slower=100.0, faster=100.0, steady=100.0, tiny=0.2, removed=5.0)
+    baseline['benchmarks']['noisy'] = {'median_ms': 100.0, 'tolerance': 1.0}
+    baseline['benchmarks']['spread'] = {'median_ms': 100.0, 'p95_ms': 160.0}
+    current = results(slower=140.0, faster=50.0, steady=110.0, tiny=0.6, added=1.0, noisy=180.0, spread=150.0)
+
+    statuses = {entry['name']: entry['status'] for entry in compare(current, baseline, tolerance=0.25)}
+    assert statuses == {
+        'slower': 'regression', 'faster': 'improvement', 'steady': 'ok',
+        # Tripled, but within the absolute noise floor
+        'tiny': 'ok',
+        # Slower, but no slower than the baseline's own slow runs
+        'spread': 'ok',
+        'noisy': 'ok', 'added': 'new', 'removed': 'missing'
+    }
+
+    path = os.path.join(tempfile.mkdtemp(), 'nested', 'baseline.json')
+    write_results(path, baseline)
+    assert load_results(path)['benchmarks']['slower']['median_ms'] == 100.0
+    assert load_results(path + '.absent') is None
+
+
+if __name__ == "__main__":
+    test_statistics()
+    test_warmup_and_setup_are_not_timed()
+    test_regressions_against_baseline()
+    print("✅ Benchmarking tests passed")
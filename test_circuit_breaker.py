@@ -0,0 +1,86 @@
+"""
+Test the per-model circuit breaker and its short-circuit to agent fallbacks
+"""
+
+import time
+from agents.compliance_checker import ComplianceCheckerAgent
+from utils.circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError
+from utils.llm_gateway import LLMGateway
+
+
+def test_circuit_breaker_states():
+    breaker = CircuitBreaker('test-model', failure_rate_threshold=0.5, window_size=10,
+                             min_calls=4, open_seconds=0.2, half_open_probes=1)
+
+    for succeeded in (True, False, True, False):
+        breaker.before_call()
+        breaker.record(succeeded, 0.1)
+    assert breaker.state == 'open'
+
+    try:
+        breaker.before_call()
+        assert False, 'expected the circuit to be open'
+    except CircuitOpenError:
+        pass
+
+    # After open_seconds a single probe is allowed; others keep short-circuiting
+    time.sleep(0.25)
+    breaker.before_call()
+    assert breaker.state == 'half_open'
+    try:
+        breaker.before_call()
+        assert False, 'expected only one probe'
+    except CircuitOpenError:
+        pass
+
+    breaker.record(True, 0.1)
+    assert breaker.state == 'closed'
+    assert breaker.stats()['trips'] == 1
+
+
+def test_circuit_breaker_slow_calls():
+    breaker = CircuitBreaker('test-model', slow_call_seconds=1.0, slow_call_rate_threshold=0.8,
+                             min_calls=5, open_seconds=10)
+    for _ in range(5):
+        breaker.before_call()
+        breaker.record(True, 2.5)
+    assert breaker.state == 'open'
+
+
+class FailingBackend:
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, model_name, prompt, generation_config=None):
+        self.calls += 1
+        time.sleep(0.05)
+        raise ConnectionError('endpoint unavailable')
+
+
+def test_open_circuit_short_circuits_agents():
+    backend = FailingBackend()
+    registry = CircuitBreakerRegistry(enabled=True)
+    gateway = LLMGateway(backend=backend, max_concurrency=4, timeout=5, breakers=registry, max_retries=0)
+    agent = ComplianceCheckerAgent()
+    agent.llm = gateway
+
+    for _ in range(5):
+        agent.check_compliance("Claims are settled at our discretion.")
+    assert backend.calls == 5
+    assert gateway.circuit_state() == 'degraded'
+
+    # Open circuit: no model call, structural fallback returned immediately
+    start = time.time()
+    result = agent.check_compliance("Claims are settled at our discretion, notwithstanding the above.")
+    assert time.time() - start < 0.05
+    assert backend.calls == 5
+    assert result['fallback_analysis'] is True
+    assert any('legal jargon' in issue for issue in result['regulatory_issues'])
+    assert gateway.stats()['short_circuited'] == 1
+
+
+if __name__ == "__main__":
+    test_circuit_breaker_states()
+    test_circuit_breaker_slow_calls()
+    test_open_circuit_short_circuits_agents()
+    print("✅ Circuit breaker tests passed")
@@ -0,0 +1,30 @@
+"""
+Test TF-IDF candidate retrieval for the benchmark analyzer
+"""
+
+from utils.clause_index import ClauseIndex
+
+
+def test_clause_index():
+    index = ClauseIndex.from_library({
+        'claims': [
+            "All claims must be reported to the insurer within 30 days of the loss occurrence.",
+            "Claims will be settled within 30 days of receiving all required documents."
+        ],
+        'exclusions': [
+            "Losses arising from nuclear reaction, nuclear radiation, or radioactive contamination are excluded."
+        ]
+    })
+
+    results = index.search("Claims must be reported within 30 days of the loss.", top_k=2)
+    print(f"Candidates: {[(entry['text'][:40], round(score, 3)) for entry, score in results]}")
+
+    assert len(results) == 2
+    assert results[0][0]['category'] == 'claims'
+    assert results[0][1] >= results[1][1]
+    assert index.search("zzz qqq", top_k=5) == []
+
+
+if __name__ == "__main__":
+    test_clause_index()
+    print("✅ Clause index tests passed")
@@ -0,0 +1,75 @@
+"""
+Test lazy component loading: components are imported and built on first use, once
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from utils.component_registry import ComponentRegistry
+
+
+def test_components_are_imported_and_built_on_first_use():
+    package_dir = tempfile.mkdtemp()
+    with open(os.path.join(package_dir, 'lazy_component_example.py'), 'w') as f:
+        f.write("import time\n\nclass Slow:\n    def __init__(self):\n        time.sleep(0.1)\n")
+    sys.path.insert(0, package_dir)
+    try:
+        registry = ComponentRegistry()
+        registry.register('slow', 'lazy_component_example:Slow')
+        assert 'lazy_component_example' not in sys.modules
+        assert not registry.is_loaded('slow')
+
+        # Concurrent first requests share one build
+        instances = []
+        threads = [threading.Thread(target=lambda: instances.append(registry.get('slow'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len({id(instance) for instance in instances}) == 1
+        stats = registry.stats()
+        assert stats['loaded'] == ['slow']
+        assert stats['timings']['slow']['build_ms'] >= 100
+        assert stats['timings']['slow']['modules_imported'] >= 1
+    finally:
+        sys.path.remove(package_dir)
+
+
+def test_factories_and_unknown_components():
+    registry = ComponentRegistry()
+    registry.register('clock', lambda: {'started': time.time()})
+    assert registry.get('clock') is registry.get('clock')
+    assert 'clock' in registry and 'missing' not in registry
+    try:
+        registry.get('missing')
+        assert False, 'expected KeyError'
+    except KeyError:
+        pass
+
+
+def test_light_routes_do_not_load_heavy_libraries():
+    # A fresh interpreter, since other tests may already have imported these
+    probe = (
+        "import sys, app\n"
+        "client = app.app.test_client()\n"
+        "for path in ('/', '/analytics', '/health'):\n"
+        "    assert client.get(path).status_code == 200, path\n"
+        "heavy = [m for m in ('textstat', 'PyPDF2', 'reportlab', 'google.generativeai', 'sklearn')"
+        " if m in sys.modules]\n"
+        "assert not heavy, heavy\n"
+        "assert app.components.stats()['loaded'] == []\n"
+    )
+    env = dict(os.environ, LLM_BACKEND='offline')
+    result = subprocess.run([sys.executable, '-c', probe], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-2000:]
+
+
+if __name__ == "__main__":
+    test_components_are_imported_and_built_on_first_use()
+    test_factories_and_unknown_components()
+    test_light_routes_do_not_load_heavy_libraries()
+    print("✅ Component registry tests passed")
@@ -0,0 +1,117 @@
+"""
+Test fast-mode analysis: rule-only agent results, and the queued LLM enrichment
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from agents.benchmark_analyzer import BenchmarkAnalyzerAgent
+from agents.compliance_checker import ComplianceCheckerAgent
+from agents.risk_scorer import RiskScorerAgent
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CLAUSE = ("The company may, at its discretion, settle claims as deemed appropriate from time to time, "
+          "notwithstanding any other provisions, and covers any loss without limitation.")
+
+
+class NoLLM:
+    """Gateway stand-in that fails the test if a local result calls the model"""
+
+    def generate(self, *args, **kwargs):
+        raise AssertionError('local results must not call the LLM')
+
+    generate_stream = generate
+
+
+def test_local_results_are_rule_based():
+    risk_agent, compliance_agent, benchmark_agent = RiskScorerAgent(), ComplianceCheckerAgent(), BenchmarkAnalyzerAgent()
+    for agent in (risk_agent, compliance_agent, benchmark_agent):
+        agent.llm = NoLLM()
+
+    risk = risk_agent.create_local_result(CLAUSE)
+    assert risk['local_analysis'] and 'fallback_analysis' not in risk
+    assert risk['risky_phrases_found'] and risk['risk_score'] > 40
+    assert 'LLM unavailable' not in risk['explanation']
+    # The fallback shares the rules but is still marked as a degraded answer
+    fallback = risk_agent.create_fallback_result(CLAUSE, 'timeout')
+    assert fallback['risk_score'] == risk['risk_score'] and fallback['fallback_analysis']
+
+    compliance = compliance_agent.create_local_result(CLAUSE)
+    assert compliance['local_analysis']
+    assert {issue['phrase'] for issue in compliance['vague_language_detected']} >= {'from time to time'}
+    assert any('jargon' in issue for issue in compliance['regulatory_issues'])
+    # A clean clause has no issues, so nothing counts against its score
+    clean = compliance_agent.create_local_result("Claims are paid within 30 days.")
+    assert clean['regulatory_issues'] == [] and clean['compliance_score'] == 100
+
+    benchmark = benchmark_agent.create_local_result(
+        "All claims must be reported to the insurer within 30 days of the loss occurrence."
+    )
+    assert benchmark['local_analysis'] and benchmark['similarity_score'] >= 90
+    assert benchmark['similar_clauses'][0]['category'] == 'claims'
+
+
+def test_fast_mode_returns_local_results_and_enrichment_job():
+    probe = (
+        f"import sys; sys.path.insert(0, {ROOT!r})\n"
+        "import app\n"
+        "client = app.app.test_client()\n"
+        f"clause = {CLAUSE!r}\n"
+        "response = client.post('/analyze-clause', json={'clause_text': clause, 'mode': 'fast', 'languages': ['hindi']})\n"
+        "assert response.status_code == 202, response.json\n"
+        "fast = response.json\n"
+        "assert fast['analysis_mode'] == 'fast'\n"
+        "assert fast['risk_score']['local_analysis'] and fast['compliance_check']['local_analysis']\n"
+        "assert 'customer_scenario' not in fast and 'regulatory_assessment' in fast\n"
+        "assert 'customer_scenario' in fast['enrichment']['pending_agents']\n"
+        "assert 'risk_score' not in fast['enrichment']['pending_agents']\n"
+        "assert 'risk_score' in fast['enrichment']['refined_agents']\n"
+        "url = fast['enrichment']['results_url']\n"
+        "import time\n"
+        "deadline = time.monotonic() + 60\n"
+        "while client.get(url).status_code == 202 and time.monotonic() < deadline:\n"
+        "    time.sleep(0.05)\n"
+        "enriched = client.get(url)\n"
+        "assert enriched.status_code == 200, enriched.json\n"
+        "full = enriched.json\n"
+        "assert full['analysis_mode'] == 'enriched' and full['analysis_id'] == fast['analysis_id']\n"
+        "assert list(full['multilingual']['translations']) == ['hindi'], full['multilingual']\n"
+        "assert 'local_analysis' not in full['risk_score'] and 'enterprise_metadata' in full\n"
+        "from utils.telemetry import uses_fallback\n"
+        "agents = full['enterprise_metadata']['agent_status']\n"
+        "expected = sum(not uses_fallback(full[name]) for name in agents) / len(agents)\n"
+        "assert full['enterprise_metadata']['quality_assurance_score'] == round(expected, 3)\n"
+        "assert app.metrics.snapshot()['histograms']['analysis_duration_seconds'][0]['count'] == 1\n"
+        "assert client.post('/analyze-clause', json={'clause_text': clause, 'mode': 'slow'}).status_code == 400\n"
+    )
+    _run_probe(probe, JOB_WORKERS='1')
+
+
+def test_fast_mode_without_job_workers_has_no_enrichment():
+    probe = (
+        f"import sys; sys.path.insert(0, {ROOT!r})\n"
+        "import app\n"
+        "client = app.app.test_client()\n"
+        f"response = client.post('/analyze-clause', json={{'clause_text': {CLAUSE!r}, 'mode': 'fast'}})\n"
+        "assert response.status_code == 200, response.json\n"
+        "assert response.json['enrichment'] is None and response.json['risk_score']['local_analysis']\n"
+        "assert app.job_store.count_by_status() == {}\n"
+    )
+    _run_probe(probe, JOB_WORKERS='0')
+
+
+def _run_probe(probe, **env_vars):
+    env = dict(os.environ, LLM_BACKEND='offline', ANALYSIS_CACHE_DISK='false', **env_vars)
+    workdir = tempfile.mkdtemp()
+    env.update(METRICS_MULTIPROC_DIR=os.path.join(workdir, 'metrics'),
+               LLM_RATE_STATE_PATH=os.path.join(workdir, 'llm_limits.json'))
+    result = subprocess.run([sys.executable, '-c', probe], cwd=workdir, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-2000:]
+
+
+if __name__ == "__main__":
+    test_local_results_are_rule_based()
+    test_fast_mode_returns_local_results_and_enrichment_job()
+    test_fast_mode_without_job_workers_has_no_enrichment()
+    print("✅ Fast analysis tests passed")
@@ -0,0 +1,77 @@
+"""
+Test the append-only analysis history store
+"""
+
+import json
+import os
+import tempfile
+from utils.history_store import HistoryStore
+
+
+def _analysis(i, risk_level, status):
+    return {
+        'analysis_id': f'a{i}',
+        'timestamp': f'2025-06-{10 + i:02d}T10:00:00',
+        'plain_english': {'readability_improvement': 10.0 + i},
+        'compliance_check': {
+            'status': status,
+            'regulatory_issues': ['Complex sentence structure'],
+            'vague_language_detected': [{'phrase': 'subject to'}] if i % 2 else []
+        },
+        'risk_score': {'risk_level': risk_level}
+    }
+
+
+def test_history_store():
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'analysis_history.json')
+        with open(legacy_path, 'w') as f:
+            json.dump([_analysis(0, 'High', 'needs_review')], f)
+
+        db_path = os.path.join(tmp, 'history.sqlite3')
+        store = HistoryStore(db_path, legacy_json_path=legacy_path)
+        for i in range(1, 5):
+            store.append(_analysis(i, 'Medium' if i % 2 else 'High', 'compliant'))
+
+        # The legacy file is imported exactly once
+        store = HistoryStore(db_path, legacy_json_path=legacy_path)
+        assert store.count() == 5
+
+        totals = store.summary_totals()
+        print(f"Totals: {totals}")
+        assert totals['readability_improvement_sum'] == 60.0
+        assert totals['compliance_issues_found'] == 7
+
+        assert [a['analysis_id'] for a in store.recent(2)] == ['a3', 'a4']
+        assert [a['analysis_id'] for a in store.query(risk_level='High')] == ['a4', 'a2', 'a0']
+        assert len(store.query(compliance_status='compliant', since='2025-06-13')) == 2
+
+
+def test_history_store_aggregates():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, 'history.sqlite3'))
+        for i in range(4):
+            store.append(_analysis(i, 'High' if i < 3 else 'Low', 'compliant'))
+        store.append(_analysis(0, 'Low', 'needs_review'))
+
+        totals = store.summary_totals()
+        assert totals['total_analyses'] == 5
+        assert totals['risk_levels'] == {'High': 3, 'Low': 2}
+        assert totals['compliance_statuses'] == {'compliant': 4, 'needs_review': 1}
+
+        daily = store.rollups('day', 7)
+        print(f"Daily rollups: {daily}")
+        assert [r['bucket_start'] for r in daily] == ['2025-06-10', '2025-06-11', '2025-06-12', '2025-06-13']
+        assert daily[0]['analyses'] == 2 and daily[0]['high_risk'] == 1
+        assert len(store.rollups('hour', 2)) == 2
+
+        # Rebuilding from the raw log reproduces the incrementally maintained values
+        rebuilt = store.rebuild_aggregates()
+        assert rebuilt == totals
+        assert store.rollups('day', 7) == daily
+
+
+if __name__ == "__main__":
+    test_history_store()
+    test_history_store_aggregates()
+    print("✅ History store tests passed")
@@ -0,0 +1,139 @@
+"""
+Test the SQLite-backed background job queue, including resume after a restart
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from utils.job_queue import JobStore, JobQueue
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_job_queue_resume():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'jobs.sqlite3')
+        processed = []
+
+        def handler(job):
+            done = job.completed_items()
+            for i, clause in enumerate(job.payload['clauses']):
+                if i in done:
+                    continue
+                if clause == 'crash' and not job.payload.get('restarted'):
+                    # Simulate the worker dying half way through
+                    job.update_payload(dict(job.payload, restarted=True))
+                    raise SystemExit
+                processed.append(clause)
+                job.save_item(i, {'clause': clause, 'length': len(clause)})
+            items = job.completed_items()
+            return {'results': [items[i] for i in range(len(job.payload['clauses']))]}
+
+        queue = JobQueue(JobStore(db_path), lease_seconds=0)
+        queue.register('document_analysis', handler)
+        job_id = queue.submit('document_analysis', {'clauses': ['one', 'crash', 'three']}, total_items=3)
+
+        try:
+            queue.run_pending()
+        except SystemExit:
+            pass
+        status = queue.describe(job_id)
+        print(f"After crash: {status}")
+        assert status['status'] == 'running'
+        assert status['progress']['completed'] == 1
+
+        # A fresh worker picks up the orphaned job once its lease has expired
+        restarted = JobQueue(JobStore(db_path))
+        restarted.register('document_analysis', handler)
+        assert restarted.run_pending() == 1
+
+        status = restarted.describe(job_id)
+        assert status['status'] == 'completed'
+        assert status['progress'] == {'completed': 3, 'total': 3, 'percent': 100.0}
+        assert processed == ['one', 'crash', 'three']
+        result = restarted.store.get(job_id)['result']
+        assert [r['clause'] for r in result['results']] == ['one', 'crash', 'three']
+
+
+
+def test_long_running_job_keeps_its_lease():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JobStore(os.path.join(tmp, 'jobs.sqlite3'))
+        runs = []
+
+        def slow_handler(job):
+            runs.append(job.job_id)
+            # One step that outlasts the lease several times over, with no save_item in between
+            time.sleep(1.0)
+            return {'done': True}
+
+        first = JobQueue(store, lease_seconds=0.3)
+        first.register('clause_enrichment', slow_handler)
+        job_id = first.submit('clause_enrichment', {})
+        worker = threading.Thread(target=first.run_pending, name='first-worker')
+        worker.start()
+        while not runs:
+            time.sleep(0.01)
+
+        # Another worker polling while the handler runs must not reclaim the job
+        second = JobQueue(store, lease_seconds=0.3)
+        second.register('clause_enrichment', slow_handler)
+        deadline = time.monotonic() + 0.9
+        while time.monotonic() < deadline:
+            assert second.run_pending() == 0
+            time.sleep(0.1)
+        worker.join()
+
+        assert runs == [job_id]
+        assert store.get(job_id)['status'] == 'completed'
+        # Only the worker holding the lease may record an outcome
+        assert not store.fail(job_id, 'stale worker', worker='elsewhere:1:job-worker-0')
+        assert store.get(job_id)['status'] == 'completed'
+
+
+def test_run_job_inline_without_workers():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(JobStore(os.path.join(tmp, 'jobs.sqlite3')), max_workers=0)
+        queue.register('clause_enrichment', lambda job: {'clause': job.payload['clause']})
+        older = queue.submit('clause_enrichment', {'clause': 'one'})
+        job_id = queue.submit('clause_enrichment', {'clause': 'two'})
+
+        queue.start()
+        assert not queue.running
+        # Only the requested job runs on the calling thread
+        assert queue.run_job(job_id)['status'] == 'completed'
+        assert queue.store.get(job_id)['result'] == {'clause': 'two'}
+        assert queue.describe(older)['status'] == 'queued'
+
+
+def test_upload_is_processed_inline_without_workers():
+    probe = (
+        f"import io, os, sys; sys.path.insert(0, {ROOT!r})\n"
+        "import app\n"
+        "assert not app.job_queue.running\n"
+        "app.components.get('pdf_processor').extract_clauses = lambda path: ['Claims must be reported within 30 days.']\n"
+        "client = app.app.test_client()\n"
+        "response = client.post('/upload-document', data={'file': (io.BytesIO(b'%PDF-1.4'), 'policy.pdf')},\n"
+        "                       content_type='multipart/form-data')\n"
+        "assert response.status_code == 200, response.json\n"
+        "assert response.json['status'] == 'completed' and response.json['clauses_analyzed'] == 1\n"
+        "# The upload is removed once its job has finished\n"
+        "assert os.listdir(app.app.config['UPLOAD_FOLDER']) == []\n"
+    )
+    env = dict(os.environ, LLM_BACKEND='offline', JOB_WORKERS='0', ANALYSIS_CACHE_DISK='false')
+    workdir = tempfile.mkdtemp()
+    env.update(METRICS_MULTIPROC_DIR=os.path.join(workdir, 'metrics'),
+               LLM_RATE_STATE_PATH=os.path.join(workdir, 'llm_limits.json'))
+    result = subprocess.run([sys.executable, '-c', probe], cwd=workdir, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-2000:]
+
+
+if __name__ == "__main__":
+    test_job_queue_resume()
+    test_long_running_job_keeps_its_lease()
+    test_run_job_inline_without_workers()
+    test_upload_is_processed_inline_without_workers()
+    print("✅ Job queue tests passed")
@@ -0,0 +1,87 @@
+"""
+Test LLM cassettes: agent prompts recorded once and replayed without the recording backend
+"""
+
+import os
+import tempfile
+import time
+from agents.scenario_explainer import ScenarioExplainerAgent
+from agents.training_generator import TrainingGeneratorAgent
+from utils.circuit_breaker import CircuitBreakerRegistry
+from utils.llm_cassette import CassetteBackend, CassetteMiss, load_cassette
+from utils.llm_gateway import LLMGateway
+from utils.offline_llm import OfflineBackend
+
+CLAUSE = "Pre-existing diseases are covered after a waiting period of 48 months of continuous coverage."
+
+
+def _gateway(backend):
+    return LLMGateway(backend=backend, max_concurrency=8, timeout=5, max_retries=0,
+                      breakers=CircuitBreakerRegistry(enabled=False))
+
+
+def _run_agents(backend):
+    scenario, training = ScenarioExplainerAgent(), TrainingGeneratorAgent()
+    scenario.llm = training.llm = _gateway(backend)
+    return scenario.generate_scenario(CLAUSE), training.generate_training(CLAUSE)
+
+
+def test_replay_matches_recording():
+    path = os.path.join(tempfile.mkdtemp(), 'cassette.jsonl')
+    recorder = CassetteBackend(path, mode='record', inner=OfflineBackend(latency_ms=40))
+    recorded = _run_agents(recorder)
+    assert recorder.counters['recorded'] > 0
+
+    # Replaying needs no inner backend and, by default, does not wait
+    player = CassetteBackend(path, mode='replay')
+    start = time.time()
+    replayed = _run_agents(player)
+    assert replayed == recorded
+    assert time.time() - start < 0.2
+    assert player.counters == {'recorded': 0, 'hits': recorder.counters['recorded'], 'misses': 0}
+
+    entry = next(iter(load_cassette(path).values()))[0]
+    assert entry['prompt'] and entry['text'] and entry['latency_ms'] >= 40
+    assert entry['input_tokens'] > 0
+
+
+def test_replay_latency_and_misses():
+    path = os.path.join(tempfile.mkdtemp(), 'cassette.jsonl.gz')
+    recorder = CassetteBackend(path, mode='record', inner=OfflineBackend(latency_ms=50))
+    recorder.generate('model', 'Clause: first')
+    assert ''.join(recorder.generate_stream('model', 'Clause: streamed'))
+
+    player = CassetteBackend(path, mode='replay', replay_latency=True, latency_scale=2)
+    assert player.size == 2
+    start = time.time()
+    player.generate('model', 'Clause: first')
+    assert time.time() - start >= 0.1
+    assert ''.join(player.generate_stream('model', 'Clause: streamed')) == \
+           OfflineBackend().generate('model', 'Clause: streamed').text
+
+    # Model and config are part of the key
+    try:
+        player.generate('other-model', 'Clause: first')
+        assert False, 'expected a cassette miss'
+    except CassetteMiss:
+        pass
+    fallback = CassetteBackend(path, mode='replay', fallback=OfflineBackend())
+    assert fallback.generate('model', 'Clause: unseen').text
+    assert fallback.counters['misses'] == 1
+
+
+def test_repeated_prompts_replay_in_order():
+    path = os.path.join(tempfile.mkdtemp(), 'cassette.jsonl')
+    recorder = CassetteBackend(path, mode='record', inner=OfflineBackend())
+    recorder._record('model', 'prompt', None, 'one', 0.01, False)
+    recorder._record('model', 'prompt', None, 'two', 0.01, False)
+
+    player = CassetteBackend(path, mode='replay')
+    assert [player.generate('model', 'prompt').text for _ in range(3)] == ['one', 'two', 'two']
+
+
+if __name__ == "__main__":
+    test_replay_matches_recording()
+    test_replay_latency_and_misses()
+    test_repeated_prompts_replay_in_order()
+    print("✅ LLM cassette tests passed")
@@ -0,0 +1,209 @@
+"""
+Test the shared LLM gateway: concurrency limit and per-call timeout
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.llm_gateway import LLMGateway, LLMTimeoutError
+
+
+class SleepyBackend:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def generate(self, model_name, prompt, generation_config=None):
+        time.sleep(self.delay)
+        return type('Response', (), {'text': f'echo: {prompt}'})()
+
+
+def test_llm_gateway_concurrency_limit():
+    gateway = LLMGateway(backend=SleepyBackend(0.1), max_concurrency=2, timeout=5)
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        responses = list(pool.map(lambda i: gateway.generate(f'prompt {i}', agent='test'), range(6)))
+
+    stats = gateway.stats()
+    print(f"Gateway stats: {stats}")
+    assert [r.text for r in responses] == [f'echo: prompt {i}' for i in range(6)]
+    assert stats['peak_in_flight'] == 2
+    assert stats['calls'] == 6
+
+
+def test_llm_gateway_timeout():
+    gateway = LLMGateway(backend=SleepyBackend(0.5), max_concurrency=1, timeout=0.1)
+
+    start = time.time()
+    try:
+        gateway.generate('slow prompt', agent='test')
+        assert False, 'expected a timeout'
+    except LLMTimeoutError:
+        pass
+    assert time.time() - start < 0.4
+    assert gateway.stats()['timeouts'] == 1
+
+
+class StreamingBackend:
+    def __init__(self, chunks, delay):
+        self.chunks = chunks
+        self.delay = delay
+
+    def generate_stream(self, model_name, prompt, generation_config=None):
+        for chunk in self.chunks:
+            time.sleep(self.delay)
+            yield chunk
+
+
+def test_llm_gateway_stream():
+    gateway = LLMGateway(backend=StreamingBackend(['Claims ', 'are ', 'paid.'], 0.1), max_concurrency=1, timeout=5)
+
+    start = time.time()
+    stream = gateway.generate_stream('prompt', agent='test')
+    first = next(stream)
+    first_chunk_at = time.time() - start
+    chunks = [first] + list(stream)
+
+    print(f"First chunk after {first_chunk_at:.2f}s")
+    assert chunks == ['Claims ', 'are ', 'paid.']
+    assert first_chunk_at < 0.25
+    assert gateway.stats()['in_flight'] == 0
+
+    # Backends without streaming yield the whole response as one chunk
+    gateway = LLMGateway(backend=SleepyBackend(0.01), max_concurrency=1, timeout=5)
+    assert list(gateway.generate_stream('prompt')) == ['echo: prompt']
+
+
+def test_llm_gateway_stream_timeout():
+    gateway = LLMGateway(backend=StreamingBackend(['a', 'b', 'c'], 0.2), max_concurrency=1, timeout=0.3)
+
+    received = []
+    try:
+        for chunk in gateway.generate_stream('prompt', agent='test'):
+            received.append(chunk)
+        assert False, 'expected a timeout'
+    except LLMTimeoutError:
+        pass
+    assert received == ['a']
+    assert gateway.stats()['timeouts'] == 1
+
+
+class TailBackend:
+    """Every 10th call hangs; the rest answer quickly"""
+
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def generate(self, model_name, prompt, generation_config=None):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(2.0 if call % 10 == 0 else 0.02)
+        return type('Response', (), {'text': f'answer {call}'})()
+
+
+def test_llm_gateway_hedges_slow_calls():
+    gateway = LLMGateway(backend=TailBackend(), max_concurrency=4, timeout=5, hedge_percentile=90)
+    gateway.latencies.min_samples = 5
+    gateway.budgets.hedge_ratio = 0.5
+
+    durations = []
+    for i in range(20):
+        start = time.time()
+        gateway.generate(f'prompt {i}', agent='test')
+        durations.append(time.time() - start)
+
+    counters = gateway.stats()['agents']['test']
+    print(f"Slowest call {max(durations[5:]):.2f}s, counters: {counters}")
+    # Once percentiles exist, a hung call is hedged instead of waited out
+    assert counters['hedges'] >= 1
+    assert counters['hedge_wins'] >= 1
+    assert max(durations[10:]) < 0.5
+
+
+class FlakyBackend:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def generate(self, model_name, prompt, generation_config=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError('connection reset')
+        return type('Response', (), {'text': 'ok'})()
+
+
+def test_llm_gateway_retries_transient_errors():
+    gateway = LLMGateway(backend=FlakyBackend(failures=2), max_concurrency=2, timeout=5, max_retries=2)
+    gateway.retry_base_delay = 0.01
+    # Budgets scale with calls per window; allow two retries for a single call
+    gateway.budgets.minimum = 2
+
+    assert gateway.generate('prompt', agent='test').text == 'ok'
+    assert gateway.stats()['agents']['test']['retries'] == 2
+
+    # Non-transient errors are not retried
+    class BadRequestBackend:
+        calls = 0
+
+        def generate(self, model_name, prompt, generation_config=None):
+            BadRequestBackend.calls += 1
+            raise ValueError('invalid argument')
+
+    gateway = LLMGateway(backend=BadRequestBackend(), max_concurrency=2, timeout=5, max_retries=2)
+    try:
+        gateway.generate('prompt', agent='test')
+        assert False, 'expected the backend error'
+    except ValueError:
+        pass
+    assert BadRequestBackend.calls == 1
+
+
+
+def test_llm_gateway_retry_waits_only_for_remaining_budget():
+    release = threading.Event()
+    blockers = []
+
+    class ContendedBackend:
+        """First call fails after 0.6s while another caller queues up to take the only slot for good"""
+        calls = 0
+
+        def generate(self, model_name, prompt, generation_config=None):
+            if prompt == 'blocker':
+                release.wait(5)
+                return type('Response', (), {'text': 'blocker'})()
+            ContendedBackend.calls += 1
+            if ContendedBackend.calls == 1:
+                blocker = threading.Thread(target=gateway.generate, args=('blocker',), kwargs={'agent': 'other'})
+                blocker.start()
+                blockers.append(blocker)
+                time.sleep(0.6)
+                raise ConnectionError('connection reset')
+            return type('Response', (), {'text': 'ok'})()
+
+    gateway = LLMGateway(backend=ContendedBackend(), max_concurrency=1, timeout=1.0, max_retries=2)
+    gateway.retry_base_delay = gateway.retry_max_delay = 0.01
+    gateway.budgets.minimum = 2
+
+    start = time.time()
+    try:
+        gateway.generate('prompt', agent='test')
+        assert False, 'expected a timeout'
+    except LLMTimeoutError:
+        pass
+    # The retry queued only for what was left of the 1s budget, not another full second
+    assert time.time() - start < 1.3
+    release.set()
+    for blocker in blockers:
+        blocker.join()
+
+
+if __name__ == "__main__":
+    test_llm_gateway_concurrency_limit()
+    test_llm_gateway_timeout()
+    test_llm_gateway_stream()
+    test_llm_gateway_stream_timeout()
+    test_llm_gateway_hedges_slow_calls()
+    test_llm_gateway_retries_transient_errors()
+    test_llm_gateway_retry_waits_only_for_remaining_budget()
+    print("✅ LLM gateway tests passed")
@@ -0,0 +1,68 @@
+"""
+Test the WSGI load generator: request mix, error accounting and open-loop latency
+"""
+
+import time
+from flask import Flask, jsonify
+from utils.load_generator import LoadGenerator, Scenario
+
+
+def _app(delay=0.0):
+    app = Flask(__name__)
+
+    @app.route('/ok')
+    def ok():
+        time.sleep(delay)
+        return jsonify({'ok': True})
+
+    @app.route('/fail')
+    def fail():
+        return jsonify({'error': 'boom'}), 500
+
+    return app
+
+
+def test_closed_loop_mix_and_errors():
+    scenarios = [
+        Scenario('ok', 3, lambda client, sequence: client.get('/ok')),
+        Scenario('fail', 1, lambda client, sequence: client.get('/fail')),
+        Scenario('disabled', 0, lambda client, sequence: client.get('/missing'))
+    ]
+    report = LoadGenerator(_app(), scenarios, concurrency=4, duration=30, max_requests=200).run()
+    print(f"Load report: {report}")
+
+    assert report['mode'] == 'closed'
+    assert report['requests'] == 200
+    assert set(report['scenarios']) == {'ok', 'fail'}
+    assert 120 <= report['scenarios']['ok']['requests'] <= 180
+    assert report['errors'] == report['scenarios']['fail']['requests'] == report['status_counts']['500']
+    assert report['scenarios']['ok']['error_rate'] == 0
+    assert report['latency_ms']['p50'] <= report['latency_ms']['p95'] <= report['latency_ms']['p99']
+    assert report['peak_rss_mb'] > 0
+
+
+def test_open_loop_counts_queueing_delay():
+    # 50 req/s against one worker that needs 40 ms per request: arrivals outpace service
+    scenarios = [Scenario('slow', 1, lambda client, sequence: client.get('/ok'))]
+    report = LoadGenerator(_app(delay=0.04), scenarios, concurrency=1, rate=50, duration=0.6).run()
+
+    assert report['mode'] == 'open' and report['requests'] == 30
+    assert report['service_time_ms']['p50'] < 80
+    # Later requests waited behind earlier ones, which the latency (from scheduled start) includes
+    assert report['latency_ms']['max'] > 300
+
+
+def test_exceptions_count_as_errors():
+    def broken(client, sequence):
+        raise ConnectionError('client failed')
+
+    report = LoadGenerator(_app(), [Scenario('broken', 1, broken)], concurrency=2, max_requests=10).run()
+    assert report['error_rate'] == 1.0
+    assert report['status_counts'] == {'exception:ConnectionError': 10}
+
+
+if __name__ == "__main__":
+    test_closed_loop_mix_and_errors()
+    test_open_loop_counts_queueing_delay()
+    test_exceptions_count_as_errors()
+    print("✅ Load generator tests passed")
@@ -0,0 +1,137 @@
+"""
+Test the Prometheus exporter: text format and aggregation across worker processes
+"""
+
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from utils.metrics_exporter import MultiprocessExporter, deployment_directory, deployment_id
+from utils.telemetry import MetricsRegistry
+
+
+def _worker(directory, requests):
+    registry = MetricsRegistry()
+    exporter = MultiprocessExporter(registry, directory=directory)
+    exporter.register_gauge('llm_calls_in_flight', lambda: [({}, 3)])
+    for _ in range(requests):
+        registry.observe('http_request_duration_seconds', 0.2, route='/analyze-clause', method='POST')
+        registry.increment('http_requests_total', route='/analyze-clause', method='POST', status='200')
+    exporter.flush()
+
+
+def test_metrics_aggregate_across_processes():
+    directory = tempfile.mkdtemp()
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_worker, args=(directory, n)) for n in (2, 3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    registry = MetricsRegistry()
+    registry.increment('http_requests_total', route='/analyze-clause', method='POST', status='200')
+    exporter = MultiprocessExporter(registry, directory=directory)
+    exporter.register_gauge('llm_calls_in_flight', lambda: [({}, 1)])
+    exporter.register_host_gauge('job_queue_depth', lambda: [({'status': 'queued'}, 4)])
+    text = exporter.render()
+    print(text)
+
+    # Counters and histograms of exited workers are kept; their gauges are not
+    assert 'policyhub_http_requests_total{method="POST",route="/analyze-clause",status="200"} 6' in text
+    assert 'policyhub_http_request_duration_seconds_count{method="POST",route="/analyze-clause"} 5' in text
+    assert ('policyhub_http_request_duration_seconds_bucket{method="POST",route="/analyze-clause",le="0.25"} 5'
+            in text)
+    assert 'policyhub_http_request_duration_seconds_sum{method="POST",route="/analyze-clause"} 1' in text
+    assert 'policyhub_llm_calls_in_flight 1' in text
+    assert 'policyhub_job_queue_depth{status="queued"} 4' in text
+    assert '# TYPE policyhub_http_requests_total counter' in text
+
+
+def test_exited_worker_files_are_compacted():
+    directory = tempfile.mkdtemp()
+    context = multiprocessing.get_context('fork')
+
+    def run_workers(*request_counts):
+        workers = [context.Process(target=_worker, args=(directory, n)) for n in request_counts]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    exporter = MultiprocessExporter(MetricsRegistry(), directory=directory)
+    total = 'policyhub_http_requests_total{method="POST",route="/analyze-clause",status="200"} '
+
+    run_workers(2, 3)
+    assert total + '5' in exporter.render()
+    # Exited workers' files are folded into one aggregate; only this process keeps its own file
+    files = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+    assert len(files) == 2 and 'exited_workers.json' in files
+
+    # Totals hold across scrapes, and later restarts add to the aggregate
+    assert total + '5' in exporter.render()
+    run_workers(4)
+    text = exporter.render()
+    assert total + '9' in text
+    assert 'policyhub_http_request_duration_seconds_count{method="POST",route="/analyze-clause"} 9' in text
+    assert len([name for name in os.listdir(directory) if name.endswith('.json')]) == 2
+
+
+def test_reused_pid_does_not_keep_a_worker_live():
+    directory = tempfile.mkdtemp()
+    # A worker that exited, whose pid now belongs to this (different) process
+    with open(os.path.join(directory, 'metrics_1_old.json'), 'w') as f:
+        json.dump({'pid': os.getpid(), 'started': '1', 'written_at': 0, 'histograms': [],
+                   'counters': [{'name': 'http_requests_total', 'labels': {}, 'value': 7}],
+                   'gauges': [{'name': 'llm_calls_in_flight', 'labels': {}, 'value': 5}]}, f)
+
+    text = MultiprocessExporter(MetricsRegistry(), directory=directory).render()
+    assert 'policyhub_http_requests_total 7' in text
+    assert 'policyhub_llm_calls_in_flight' not in text
+    assert 'metrics_1_old.json' not in os.listdir(directory)
+
+
+def test_deployment_directory():
+    base = tempfile.mkdtemp()
+    stale, recent = os.path.join(base, 'old-deploy'), os.path.join(base, 'other-deploy')
+    os.makedirs(stale)
+    os.makedirs(recent)
+    os.utime(stale, (time.time() - 2 * 24 * 3600,) * 2)
+
+    directory = deployment_directory(base)
+    assert directory == os.path.join(base, deployment_id())
+    # Idle deployments are cleaned up; one that may still be running is kept
+    assert not os.path.exists(stale) and os.path.exists(recent)
+
+
+def test_derived_ratios():
+    registry = MetricsRegistry()
+    registry.observe('pdf_extraction_seconds', 2.0)
+    registry.increment('pdf_pages_processed_total', 10)
+    exporter = MultiprocessExporter(registry, directory=tempfile.mkdtemp())
+    exporter.register_counter('analysis_cache_requests_total', lambda: [
+        ({'result': 'memory_hit'}, 3), ({'result': 'disk_hit'}, 1), ({'result': 'miss'}, 4)
+    ])
+    text = exporter.render()
+
+    assert 'policyhub_pdf_pages_per_second 5' in text
+    assert 'policyhub_analysis_cache_hit_ratio 0.5' in text
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.increment('http_requests_total', route='/say "hi"\\', method='GET', status='200')
+    text = MultiprocessExporter(registry, directory=tempfile.mkdtemp()).render()
+
+    assert 'route="/say \\"hi\\"\\\\"' in text
+
+
+if __name__ == "__main__":
+    test_metrics_aggregate_across_processes()
+    test_exited_worker_files_are_compacted()
+    test_reused_pid_does_not_keep_a_worker_live()
+    test_deployment_directory()
+    test_derived_ratios()
+    test_label_values_are_escaped()
+    print("✅ Metrics exporter tests passed")
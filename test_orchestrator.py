@@ -0,0 +1,126 @@
+"""
+Test concurrent agent orchestration and per-agent deadlines
+"""
+
+import time
+from utils.orchestrator import AgentOrchestrator, AgentTask
+
+
+def _slow_agent(delay, value):
+    def run(clause_text):
+        time.sleep(delay)
+        return {'value': value}
+    return run
+
+
+def _fallback(clause_text, error_msg):
+    return {'error': error_msg}
+
+
+def test_orchestrator():
+    orchestrator = AgentOrchestrator(max_workers=8, default_deadline=5)
+    tasks = [
+        AgentTask('fast', _slow_agent(0.2, 'fast'), _fallback),
+        AgentTask('medium', _slow_agent(0.3, 'medium'), _fallback),
+        AgentTask('slow', _slow_agent(2.0, 'slow'), _fallback, deadline=0.5)
+    ]
+
+    start = time.time()
+    outcome = orchestrator.run(tasks, "Claims must be reported within 30 days.")
+    elapsed = time.time() - start
+
+    print(f"Orchestration finished in {elapsed:.2f}s")
+    print(f"Status: {outcome['status']}")
+
+    # Runs in parallel: bounded by the slowest deadline, not the sum
+    assert elapsed < 1.0
+    assert outcome['results']['fast'] == {'value': 'fast'}
+    assert outcome['results']['medium'] == {'value': 'medium'}
+    assert outcome['results']['slow']['timed_out'] is True
+    assert 'error' in outcome['results']['slow']
+    assert outcome['status']['slow']['state'] == 'timed_out'
+    assert list(outcome['results']) == ['fast', 'medium', 'slow']
+
+
+def test_orchestrator_agent_failure():
+    orchestrator = AgentOrchestrator(max_workers=2, default_deadline=5)
+
+    def broken(clause_text):
+        raise RuntimeError('quota exceeded')
+
+    outcome = orchestrator.run([AgentTask('broken', broken, _fallback)], "Any clause.")
+    assert outcome['results']['broken'] == {'error': 'quota exceeded'}
+    assert outcome['status']['broken']['state'] == 'failed'
+
+
+def test_orchestrator_run_iter_completion_order():
+    orchestrator = AgentOrchestrator(max_workers=4, default_deadline=5)
+    tasks = [
+        AgentTask('slow', _slow_agent(2.0, 'slow'), _fallback, deadline=0.6),
+        AgentTask('medium', _slow_agent(0.3, 'medium'), _fallback),
+        AgentTask('fast', _slow_agent(0.05, 'fast'), _fallback)
+    ]
+
+    start = time.time()
+    arrivals = []
+    for name, output, status in orchestrator.run_iter(tasks, "Any clause."):
+        arrivals.append((name, status['state'], time.time() - start))
+
+    print(f"Arrivals: {arrivals}")
+    # Results arrive as soon as each agent is done, not after the slowest one
+    assert [name for name, _, _ in arrivals] == ['fast', 'medium', 'slow']
+    assert arrivals[0][2] < 0.25
+    assert arrivals[2][1] == 'timed_out'
+    assert arrivals[2][2] < 1.0
+
+
+def test_orchestrator_run_batch():
+    import threading
+    orchestrator = AgentOrchestrator(max_workers=16, default_deadline=5)
+    lock = threading.Lock()
+    active = {'now': 0, 'peak': 0}
+
+    def echo(clause_text):
+        with lock:
+            active['now'] += 1
+            active['peak'] = max(active['peak'], active['now'])
+        time.sleep(0.05)
+        with lock:
+            active['now'] -= 1
+        return {'clause': clause_text}
+
+    clauses = [f'clause {i}' for i in range(12)]
+    outcomes = orchestrator.run_batch([AgentTask('echo', echo, _fallback)], clauses, max_concurrency=3)
+
+    # Input order is preserved and the batch stays within its concurrency budget
+    assert [o['results']['echo']['clause'] for o in outcomes] == clauses
+    assert active['peak'] <= 3
+
+
+
+def test_orchestrator_deadline_starts_when_task_runs():
+    # Two threads for four 0.3s tasks: the last two queue for 0.3s but each runs well within 0.5s
+    orchestrator = AgentOrchestrator(max_workers=2, default_deadline=0.5)
+    tasks = [AgentTask(f'agent_{i}', _slow_agent(0.3, i), _fallback) for i in range(4)]
+    outcome = orchestrator.run(tasks, "Any clause.")
+    assert {name: status['state'] for name, status in outcome['status'].items()} == {
+        f'agent_{i}': 'completed' for i in range(4)
+    }
+
+    # A task that never gets a thread within its deadline is cancelled and answered by its fallback
+    blocker = AgentOrchestrator(max_workers=1, default_deadline=5)
+    outcome = blocker.run([
+        AgentTask('hog', _slow_agent(0.6, 'hog'), _fallback),
+        AgentTask('starved', _slow_agent(0.01, 'starved'), _fallback, deadline=0.2)
+    ], "Any clause.")
+    assert outcome['status']['starved']['state'] == 'timed_out'
+    assert 'could not start' in outcome['results']['starved']['error']
+
+
+if __name__ == "__main__":
+    test_orchestrator()
+    test_orchestrator_agent_failure()
+    test_orchestrator_run_iter_completion_order()
+    test_orchestrator_run_batch()
+    test_orchestrator_deadline_starts_when_task_runs()
+    print("✅ Orchestrator tests passed")
@@ -2,6 +2,10 @@
 """
 Performance Benchmark Test for PolicyIntelliHub
 Demonstrates actual processing speeds, accuracy, and system capabilities
+
+Run with LLM_BACKEND=offline (and OFFLINE_LLM_* latency settings) to benchmark
+without network access or an API key. To benchmark real answers offline, run once
+with LLM_BACKEND=record, then with LLM_BACKEND=replay LLM_CASSETTE_REPLAY_LATENCY=true.
 """
 
 import time
@@ -0,0 +1,49 @@
+"""
+Test the shared Aho-Corasick phrase engine
+"""
+
+from utils.phrase_matcher import PhraseMatcher, phrase_matcher
+
+
+def test_phrase_matcher():
+    matcher = PhraseMatcher({
+        'vague': ['subject to', 'from time to time'],
+        'risk': ['any loss', 'loss']
+    })
+    text = "Subject to review, ANY LOSS is paid from time to time."
+    matches = matcher.scan(text)
+
+    found = [(m.phrase, m.category, text[m.start:m.end]) for m in matches]
+    print(f"Matches: {found}")
+    assert ('subject to', 'vague', 'Subject to') in found
+    assert ('any loss', 'risk', 'ANY LOSS') in found
+    assert ('loss', 'risk', 'LOSS') in found  # overlapping matches are all reported
+    assert ('from time to time', 'vague', 'from time to time') in found
+    assert matcher.find(text, 'risk') == ['any loss', 'loss']
+
+
+def test_default_rule_packs():
+    clause = "The company may, at our discretion, settle claims as deemed fit, notwithstanding any loss."
+    grouped = phrase_matcher.group(clause)
+    assert 'at our discretion' in [m.phrase for m in grouped['vague_language']]
+    assert [m.phrase for m in grouped['prohibited_terms']] == ['as deemed fit']
+    assert [m.phrase for m in grouped['high_risk']] == ['any loss']
+
+
+
+def test_regulatory_verdict_unchanged_by_phrase_engine():
+    from utils.ai_enterprise import RegulatoryFramework
+
+    # The verdict depends only on the compliance score, as before the engine swap
+    assessment = RegulatoryFramework().evaluate_regulatory_compliance(
+        "Claims are settled as deemed fit by the insurer.", {'compliance_check': {'compliance_score': 85}}
+    )
+    assert assessment['compliance_status'] == 'COMPLIANT'
+    assert set(assessment) == {'framework_version', 'compliance_status', 'assessment_timestamp', 'risk_level'}
+
+
+if __name__ == "__main__":
+    test_phrase_matcher()
+    test_default_rule_packs()
+    test_regulatory_verdict_unchanged_by_phrase_engine()
+    print("✅ Phrase matcher tests passed")
@@ -0,0 +1,105 @@
+"""
+Test multi-clause prompt packing and single-clause retries of missed slots
+"""
+
+import json
+import re
+from agents.risk_scorer import RiskScorerAgent
+from utils.llm_gateway import LLMGateway
+from utils.prompt_packing import parse_packed_response
+
+
+def _valid(item):
+    return item.get('financial_risk') in ('Low', 'Medium', 'High')
+
+
+def test_parse_packed_response():
+    text = '```json\n[{"slot": 2, "financial_risk": "High"}, {"slot": 1, "financial_risk": "Low"}, ' \
+           '{"slot": 3, "financial_risk": "Unclear"}, {"slot": 2, "financial_risk": "Low"}]\n```'
+    items = parse_packed_response(text, 4, _valid)
+
+    # Slots are matched by number; invalid, repeated and missing slots are None
+    assert items[0]['financial_risk'] == 'Low'
+    assert items[1]['financial_risk'] == 'High'
+    assert items[2] is None
+    assert items[3] is None
+
+    assert parse_packed_response('Here you go: [{"financial_risk": "Medium"}] Thanks!', 1, _valid)[0] is not None
+    assert parse_packed_response('not json', 2, _valid) == [None, None]
+
+
+class PackedRiskBackend:
+    """Answers packed and single-clause prompts, failing the clauses in `dropped` up to `drops` times each"""
+
+    def __init__(self, dropped, drops=1):
+        self.prompts = []
+        self.remaining_drops = {clause: drops for clause in dropped}
+
+    def _drop(self, clause):
+        if self.remaining_drops.get(clause, 0) > 0:
+            self.remaining_drops[clause] -= 1
+            return True
+        return False
+
+    def generate(self, model_name, prompt, generation_config=None):
+        self.prompts.append(prompt)
+        answer = {'financial_risk': 'High', 'dispute_potential': 'Low', 'mitigation_suggestions': []}
+        slots = re.findall(r'^\s*\[(\d+)\] (.+)$', prompt, re.MULTILINE)
+        if not slots:
+            clause = re.search(r'Clause: (.+)$', prompt, re.MULTILINE).group(1)
+            if self._drop(clause):
+                return type('Response', (), {'text': 'not json'})()
+            return type('Response', (), {'text': json.dumps(dict(answer, explanation='single call'))})()
+        items = [
+            dict(answer, slot=int(slot), explanation='packed call')
+            for slot, clause in slots if not self._drop(clause)
+        ]
+        return type('Response', (), {'text': json.dumps(items)})()
+
+
+def test_score_risk_batch_retries_missed_slots_individually():
+    clauses = [f"Clause {i}: claims must be reported within {i} days." for i in range(1, 6)]
+    backend = PackedRiskBackend(dropped=[clauses[1], clauses[3]])
+    agent = RiskScorerAgent()
+    agent.llm = LLMGateway(backend=backend, max_concurrency=2, timeout=5)
+
+    results = agent.score_risk_batch(clauses)
+
+    # One packed call, then one single-clause call per missed slot
+    assert len(backend.prompts) == 3
+    retried = sorted(re.search(r'Clause: (.+)$', p, re.MULTILINE).group(1) for p in backend.prompts[1:])
+    assert retried == [clauses[1], clauses[3]]
+    assert [r['explanation'] for r in results] == [
+        'packed call', 'single call', 'packed call', 'single call', 'packed call'
+    ]
+    assert all('risk_score' in r and 'fallback_analysis' not in r for r in results)
+
+
+def test_score_risk_batch_retries_whole_failed_pack():
+    clauses = [f"Clause {i}: claims must be reported within {i} days." for i in range(1, 4)]
+
+    class TruncatingBackend(PackedRiskBackend):
+        def generate(self, model_name, prompt, generation_config=None):
+            if re.search(r'^\s*\[1\] ', prompt, re.MULTILINE):
+                self.prompts.append(prompt)
+                return type('Response', (), {'text': '[{"slot": 1, "financial_ri'})()
+            return super().generate(model_name, prompt, generation_config)
+
+    backend = TruncatingBackend(dropped=[clauses[0]])
+    agent = RiskScorerAgent()
+    agent.llm = LLMGateway(backend=backend, max_concurrency=2, timeout=5)
+
+    results = agent.score_risk_batch(clauses)
+
+    # A truncated pack isn't sent again as a pack: each clause gets its own call
+    assert len(backend.prompts) == 4
+    # The clause whose single-clause answer was unusable keeps the single path's fallback
+    assert results[0]['fallback_analysis'] is True
+    assert [r['explanation'] for r in results[1:]] == ['single call', 'single call']
+
+
+if __name__ == "__main__":
+    test_parse_packed_response()
+    test_score_risk_batch_retries_missed_slots_individually()
+    test_score_risk_batch_retries_whole_failed_pack()
+    print("✅ Prompt packing tests passed")
@@ -0,0 +1,171 @@
+"""
+Test the adaptive LLM rate limiter: token bucket, AIMD limit and cross-process sharing
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+from utils.llm_gateway import LLMGateway
+from utils.rate_limiter import AdaptiveRateLimiter, is_overload_error
+
+
+def test_token_bucket_rate():
+    # 600/min = 10 per second with a burst of 2
+    limiter = AdaptiveRateLimiter(rate_per_minute=600, burst=2, initial_concurrency=10)
+
+    start = time.time()
+    for _ in range(5):
+        assert limiter.acquire(timeout=2)
+        limiter.release()
+    elapsed = time.time() - start
+
+    print(f"5 admissions took {elapsed:.2f}s")
+    # Two from the burst, then three more at 10/s
+    assert 0.25 < elapsed < 0.6
+
+
+def test_aimd_concurrency_limit():
+    limiter = AdaptiveRateLimiter(initial_concurrency=4, min_concurrency=1, max_concurrency=8, cooldown_seconds=0)
+
+    held = [limiter.acquire(timeout=0.1) for _ in range(4)]
+    assert all(held)
+    assert not limiter.acquire(timeout=0.1)
+    assert limiter.counters['throttled'] == 1
+
+    # A quota error halves the limit; successes grow it back one step per window
+    limiter.release(overloaded=True)
+    assert limiter.stats()['concurrency_limit'] == 2.0
+    for _ in range(3):
+        limiter.release()
+    assert 2.0 < limiter.stats()['concurrency_limit'] < 4.0
+
+    assert is_overload_error(RuntimeError('429 Resource has been exhausted (e.g. check quota).'))
+    assert is_overload_error(TimeoutError())
+    assert not is_overload_error(ValueError('bad JSON'))
+
+
+def _hold_slots(state_path, ready):
+    limiter = AdaptiveRateLimiter(initial_concurrency=2, state_path=state_path)
+    limiter.acquire(timeout=1)
+    limiter.acquire(timeout=1)
+    ready.set()
+    time.sleep(0.5)
+    # Exits without releasing, like a crashed worker
+
+
+def test_limits_shared_across_processes():
+    with tempfile.TemporaryDirectory() as tmp:
+        state_path = os.path.join(tmp, 'limits.json')
+        ready = multiprocessing.Event()
+        worker = multiprocessing.Process(target=_hold_slots, args=(state_path, ready))
+        worker.start()
+        assert ready.wait(5)
+
+        limiter = AdaptiveRateLimiter(initial_concurrency=2, state_path=state_path)
+        # The other process holds the host-wide limit
+        assert not limiter.acquire(timeout=0.1)
+
+        worker.join()
+        # Slots held by a process that has exited are reclaimed
+        assert limiter.acquire(timeout=1)
+        limiter.release()
+
+
+def test_uncontended_calls_stay_in_memory():
+    with tempfile.TemporaryDirectory() as tmp:
+        limiter = AdaptiveRateLimiter(initial_concurrency=4, state_path=os.path.join(tmp, 'limits.json'),
+                                      sync_interval=60)
+        for _ in range(50):
+            assert limiter.acquire(timeout=1)
+            limiter.release()
+        # One sync to reserve the slot; every later call is admitted from the reservation
+        assert limiter.counters['syncs'] == 1
+        # Stats (served on /health) come from memory too
+        assert limiter.stats()['in_flight_all_workers'] == 0
+        assert limiter.stats()['concurrency_limit'] > 4
+        assert limiter.counters['syncs'] == 1
+
+
+def test_gateway_uses_configured_state_path():
+    import utils.llm_gateway as llm_gateway
+    saved = llm_gateway._gateway, llm_gateway._rate_state_path
+    saved_env = {name: os.environ.pop(name, None) for name in ('LLM_RATE_STATE_PATH', 'LLM_BACKEND')}
+    os.environ['LLM_BACKEND'] = 'offline'
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            state_path = os.path.join(tmp, 'llm_limits.json')
+            llm_gateway._gateway = None
+            llm_gateway.configure_gateway(rate_state_path=state_path)
+            assert llm_gateway.get_gateway().limiter.state_path == state_path
+            # Too late once agents may hold the gateway
+            try:
+                llm_gateway.configure_gateway(rate_state_path=None)
+                assert False, 'expected RuntimeError'
+            except RuntimeError:
+                pass
+    finally:
+        llm_gateway._gateway, llm_gateway._rate_state_path = saved
+        for name, value in saved_env.items():
+            os.environ.pop(name, None)
+            if value is not None:
+                os.environ[name] = value
+
+
+def _hold_idle_slots(state_path, ready, done):
+    limiter = AdaptiveRateLimiter(initial_concurrency=2, state_path=state_path, sync_interval=0.1)
+    for _ in range(2):
+        assert limiter.acquire(timeout=1)
+    limiter.release()
+    limiter.release()
+    ready.set()
+    # Alive but idle: the two reserved slots aren't in use
+    done.wait(5)
+
+
+def test_idle_reservation_is_reclaimed_by_waiting_process():
+    with tempfile.TemporaryDirectory() as tmp:
+        state_path = os.path.join(tmp, 'limits.json')
+        ready, done = multiprocessing.Event(), multiprocessing.Event()
+        worker = multiprocessing.Process(target=_hold_idle_slots, args=(state_path, ready, done))
+        worker.start()
+        try:
+            assert ready.wait(5)
+            limiter = AdaptiveRateLimiter(initial_concurrency=2, state_path=state_path, sync_interval=0.1)
+            start = time.time()
+            assert limiter.acquire(timeout=2)
+            assert time.time() - start < 1
+            limiter.release()
+        finally:
+            done.set()
+            worker.join()
+
+
+def test_gateway_reports_overload_to_limiter():
+    class QuotaBackend:
+        def generate(self, model_name, prompt, generation_config=None):
+            raise RuntimeError('429 Quota exceeded')
+
+    limiter = AdaptiveRateLimiter(initial_concurrency=8, cooldown_seconds=0)
+    gateway = LLMGateway(backend=QuotaBackend(), max_concurrency=4, timeout=5, limiter=limiter, max_retries=0)
+    try:
+        gateway.generate('prompt', agent='test')
+        assert False, 'expected the backend error'
+    except RuntimeError:
+        pass
+
+    time.sleep(0.05)
+    stats = gateway.stats()['rate_limiter']
+    assert stats['concurrency_limit'] == 4.0
+    assert stats['in_flight_all_workers'] == 0
+
+
+if __name__ == "__main__":
+    test_token_bucket_rate()
+    test_aimd_concurrency_limit()
+    test_limits_shared_across_processes()
+    test_uncontended_calls_stay_in_memory()
+    test_gateway_uses_configured_state_path()
+    test_idle_reservation_is_reclaimed_by_waiting_process()
+    test_gateway_reports_overload_to_limiter()
+    print("✅ Rate limiter tests passed")
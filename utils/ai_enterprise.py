@@ -3,8 +3,10 @@ Simplified Enterprise AI Components for Cloud Deployment
 """
 import os
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
 import json
+from utils.phrase_matcher import RULE_PACKS, phrase_matcher
+from utils.telemetry import RequestMetrics
 
 class AIModelManager:
     """Simplified AI Model Manager for cloud deployment"""
@@ -90,10 +92,7 @@ class AdvancedAnalytics:
                 'coverage_limits', 'exclusions', 'claim_process',
                 'premium_calculation', 'cancellation_terms'
             ],
-            'prohibited_terms': [
-                'unlimited liability', 'discretionary coverage',
-                'subject to interpretation', 'as deemed fit'
-            ]
+            'prohibited_terms': RULE_PACKS['prohibited_terms']
         }
         
         self.compliance_matrix = {
@@ -111,11 +110,10 @@ class AdvancedAnalytics:
         recommendations = []
         
         # Check for prohibited terms
-        for term in self.irdai_guidelines['prohibited_terms']:
-            if term.lower() in clause_text.lower():
-                compliance_score -= 10
-                issues.append(f"Contains prohibited term: '{term}'")
-                recommendations.append(f"Replace '{term}' with clearer, specific language")
+        for term in phrase_matcher.find(clause_text, 'prohibited_terms'):
+            compliance_score -= 10
+            issues.append(f"Contains prohibited term: '{term}'")
+            recommendations.append(f"Replace '{term}' with clearer, specific language")
         
         # Readability compliance
         readability = analysis_results.get('plain_english', {})
@@ -145,32 +143,55 @@ class AdvancedAnalytics:
             'technical_metrics': ['model_latency', 'error_rate', 'throughput']
         }
     
-    def generate_processing_metrics(self, start_time: datetime, end_time: datetime, 
-                                  analysis_results: Dict) -> Dict:
+    def generate_processing_metrics(self, start_time: datetime, end_time: datetime,
+                                  analysis_results: Dict, request_metrics: Optional[RequestMetrics] = None) -> Dict:
         """
-        Generate comprehensive processing metrics
+        Processing metrics measured while the analysis ran: per-agent wall time,
+        LLM calls, queue wait, tokens, retries, cache hits and fallback use
         """
         processing_time = (end_time - start_time).total_seconds()
+        usage = (request_metrics or RequestMetrics()).summary()
+        regulatory = analysis_results.get('regulatory_assessment', {})
         
         return {
             'performance_metrics': {
                 'processing_time_ms': round(processing_time * 1000, 2),
-                'tokens_processed': len(analysis_results.get('original_clause', '').split()),
-                'models_used': 7,  # Number of AI agents
+                'tokens_processed': usage['input_tokens'] + usage['output_tokens'],
+                'models_used': len(usage['agents']),  # Number of AI agents
                 'confidence_score': 0.94,
-                'quality_score': 0.91
+                'quality_score': 0.91,
+                'llm_models': usage['models_used'],
+                'llm_calls': usage['llm_calls'],
+                'llm_errors': usage['llm_errors'],
+                'llm_time_ms': usage['llm_time_ms'],
+                'queue_wait_ms': usage['queue_wait_ms'],
+                'retries': usage['retries'],
+                'hedged_requests': usage['hedges']
             },
             'efficiency_metrics': {
                 'cost_per_token': 0.0001,  # Simulated cost
                 'energy_efficiency': 'A+',
                 'carbon_footprint': '0.02g CO2',
-                'processing_efficiency': '95.7%'
+                'processing_efficiency': '95.7%',
+                'input_tokens': usage['input_tokens'],
+                'output_tokens': usage['output_tokens'],
+                'tokens_estimated': usage['tokens_estimated'],
+                'estimated_cost_usd': usage['estimated_cost_usd'],
+                'cache_hits': usage['cache_hits'],
+                'cache_misses': usage['cache_misses'],
+                'cache_hit_ratio': usage['cache_hit_ratio'],
+                'fallbacks_used': usage['fallbacks_used']
             },
+            'agent_performance': usage['agents'],
             'compliance_metrics': {
                 'regulatory_checks': 12,
                 'passed_validations': 11,
                 'risk_flags': 1,
-                'audit_trail_complete': True
+                'audit_trail_complete': not usage['fallbacks_used'],
+                'compliance_status': regulatory.get('compliance_status'),
+                'prohibited_terms_detected': len(
+                    phrase_matcher.find(analysis_results.get('original_clause', ''), 'prohibited_terms')
+                )
             }
         }
 
@@ -0,0 +1,280 @@
+"""
+Content-Addressed Analysis Cache
+Two-level cache (in-process LRU backed by an on-disk SQLite store) for agent outputs,
+keyed by the normalized clause text, agent name and prompt version
+"""
+import copy
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.telemetry import record_cache_lookup
+
+
+def normalize_clause(clause_text: str) -> str:
+    """Normalize clause text so trivially different copies share a cache key"""
+    text = unicodedata.normalize('NFKC', clause_text or '')
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def near_duplicate_key(clause_text: str) -> str:
+    """
+    Looser identity for in-batch deduplication: case, punctuation and spacing are
+    ignored, while words and numbers must match exactly
+    """
+    text = normalize_clause(clause_text).casefold()
+    return ' '.join(re.findall(r'\w+', text))
+
+
+def dedupe_clauses(clauses: List[str]) -> Tuple[List[str], List[int], Dict]:
+    """
+    Collapse exact and near-exact repeats. Returns the unique clauses (first
+    occurrence wins), the index into them for every input clause, and counts.
+    """
+    unique = []
+    assignment = []
+    by_exact = {}
+    by_near = {}
+    stats = {'total_clauses': len(clauses), 'exact_duplicates': 0, 'near_duplicates': 0}
+
+    for clause in clauses:
+        exact = normalize_clause(clause)
+        near = near_duplicate_key(clause)
+        if exact in by_exact:
+            stats['exact_duplicates'] += 1
+            assignment.append(by_exact[exact])
+        elif near in by_near:
+            stats['near_duplicates'] += 1
+            by_exact[exact] = by_near[near]
+            assignment.append(by_near[near])
+        else:
+            by_exact[exact] = by_near[near] = len(unique)
+            assignment.append(len(unique))
+            unique.append(exact)
+
+    stats['unique_clauses'] = len(unique)
+    return unique, assignment, stats
+
+
+def make_cache_key(clause_text: str, agent_name: str, prompt_version: str, variant: str = '') -> str:
+    """Content address for one agent's analysis of one clause"""
+    payload = f"{agent_name}\x00{prompt_version}\x00{variant}\x00{normalize_clause(clause_text)}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    """
+    In-process LRU in front of a SQLite store shared by all workers on the host.
+    Entries expire after ttl_seconds; the LRU is bounded by entry count and the
+    disk store by total payload bytes (least recently used entries go first).
+    """
+
+    def __init__(self, db_path: Optional[str], ttl_seconds: float = 7 * 24 * 3600,
+                 memory_max_entries: int = 1024, disk_max_bytes: int = 256 * 1024 * 1024):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._sets_since_eviction = 0
+        self.counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0,
+            'errors': 0
+        }
+
+        if self.db_path:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            with self._connect() as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS cache_entries (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        expires_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                """)
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache_entries(accessed_at)')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def get(self, key: str):
+        """Return a copy of the cached value, or None on miss/expiry"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.counters['memory_hits'] += 1
+                    return copy.deepcopy(value)
+                del self._memory[key]
+
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        'SELECT value, expires_at FROM cache_entries WHERE key = ?', (key,)
+                    ).fetchone()
+                    if row and row[1] > now:
+                        conn.execute('UPDATE cache_entries SET accessed_at = ? WHERE key = ?', (now, key))
+                        value = json.loads(row[0])
+                        self._remember(key, value, row[1])
+                        self._count('disk_hits')
+                        return copy.deepcopy(value)
+            except sqlite3.Error:
+                self._count('errors')
+
+        self._count('misses')
+        return None
+
+    def set(self, key: str, value: Dict):
+        """Store a value in both levels"""
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        self._remember(key, copy.deepcopy(value), expires_at)
+        self._count('sets')
+
+        if not self.db_path:
+            return
+        try:
+            payload = json.dumps(value)
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO cache_entries (key, value, size, expires_at, accessed_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (key, payload, len(payload), expires_at, now)
+                )
+            with self._lock:
+                self._sets_since_eviction += 1
+                run_eviction = self._sets_since_eviction >= 50
+                if run_eviction:
+                    self._sets_since_eviction = 0
+            if run_eviction:
+                self.evict()
+        except (sqlite3.Error, TypeError, ValueError):
+            self._count('errors')
+
+    def _remember(self, key, value, expires_at):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_max_entries:
+                self._memory.popitem(last=False)
+                self.counters['memory_evictions'] += 1
+
+    def evict(self):
+        """Drop expired disk entries, then trim least recently used ones to the byte budget"""
+        if not self.db_path:
+            return
+        try:
+            with self._connect() as conn:
+                removed = conn.execute(
+                    'DELETE FROM cache_entries WHERE expires_at <= ?', (time.time(),)
+                ).rowcount
+                total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM cache_entries').fetchone()[0]
+                if total > self.disk_max_bytes:
+                    for key, size in conn.execute(
+                        'SELECT key, size FROM cache_entries ORDER BY accessed_at'
+                    ).fetchall():
+                        if total <= self.disk_max_bytes:
+                            break
+                        conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+                        total -= size
+                        removed += 1
+            with self._lock:
+                self.counters['disk_evictions'] += removed
+        except sqlite3.Error:
+            self._count('errors')
+
+    def clear(self):
+        """Remove every entry from both levels"""
+        with self._lock:
+            self._memory.clear()
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute('DELETE FROM cache_entries')
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current sizes"""
+        with self._lock:
+            stats = dict(self.counters)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def wrap(self, agent_name: str, prompt_version: str, func: Callable) -> Callable:
+        """
+        Wrap an agent entry point taking clause_text; keyword options become part
+        of the key. Error and fallback outputs are never cached so a degraded
+        LLM doesn't poison the cache.
+        """
+        def cached_call(clause_text, **kwargs):
+            variant = json.dumps(kwargs, sort_keys=True, default=str) if kwargs else ''
+            key = make_cache_key(clause_text, agent_name, prompt_version, variant)
+            cached = self.get(key)
+            record_cache_lookup(agent_name, cached is not None)
+            if cached is not None:
+                return cached
+
+            result = func(clause_text, **kwargs)
+            if self._cacheable(result):
+                self.set(key, result)
+            return result
+
+        return cached_call
+
+    def wrap_batch(self, agent_name: str, prompt_version: str, batch_func: Callable) -> Callable:
+        """
+        Wrap a batch entry point taking a list of clauses and returning one result
+        per clause. Only cache misses are passed on, and each result is cached
+        under the same key as the single-clause entry point.
+        """
+        def cached_batch(clause_texts):
+            keys = [make_cache_key(clause_text, agent_name, prompt_version) for clause_text in clause_texts]
+            results = [self.get(key) for key in keys]
+            missing = [i for i, result in enumerate(results) if result is None]
+            for result in results:
+                record_cache_lookup(agent_name, result is not None)
+
+            if missing:
+                fresh = batch_func([clause_texts[i] for i in missing])
+                for i, result in zip(missing, fresh):
+                    results[i] = result
+                    if self._cacheable(result):
+                        self.set(keys[i], result)
+            return results
+
+        return cached_batch
+
+    @staticmethod
+    def _cacheable(result) -> bool:
+        return isinstance(result, dict) and 'error' not in result and not result.get('fallback_analysis')
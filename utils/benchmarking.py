@@ -0,0 +1,165 @@
+"""
+Benchmark Harness
+Warmed-up, repeated timing of a callable with robust statistics (median, p95,
+IQR), machine-readable JSON results and comparison against a stored baseline.
+"""
+import gc
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+RESULTS_SCHEMA_VERSION = 1
+
+
+def percentile(sorted_samples: List[float], q: float) -> float:
+    """Linear-interpolated percentile (q in 0-100) of already sorted samples"""
+    if not sorted_samples:
+        return 0.0
+    position = (len(sorted_samples) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_samples) - 1)
+    return sorted_samples[lower] + (sorted_samples[upper] - sorted_samples[lower]) * (position - lower)
+
+
+def summarize(samples_ms: List[float]) -> Dict:
+    """Median, p95, IQR and spread of timing samples in milliseconds"""
+    ordered = sorted(samples_ms)
+    return {
+        'runs': len(ordered),
+        'median_ms': round(percentile(ordered, 50), 4),
+        'p95_ms': round(percentile(ordered, 95), 4),
+        'iqr_ms': round(percentile(ordered, 75) - percentile(ordered, 25), 4),
+        'mean_ms': round(statistics.fmean(ordered), 4) if ordered else 0.0,
+        'stdev_ms': round(statistics.stdev(ordered), 4) if len(ordered) > 1 else 0.0,
+        'min_ms': round(ordered[0], 4) if ordered else 0.0,
+        'max_ms': round(ordered[-1], 4) if ordered else 0.0
+    }
+
+
+def run_benchmark(func: Callable[[], object], warmup: int = 2, repeat: int = 10,
+                  setup: Optional[Callable[[], None]] = None) -> Dict:
+    """
+    Call func warmup times untimed, then repeat times timed. setup, if given,
+    runs untimed before every call (e.g. to reset state the call mutates).
+    As with timeit, garbage collection is paused while a call is timed.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    try:
+        for _ in range(repeat):
+            if setup:
+                setup()
+            gc.collect()
+            gc.disable()
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+            if gc_was_enabled:
+                gc.enable()
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return dict(summarize(samples), warmup=warmup, samples_ms=[round(sample, 4) for sample in samples])
+
+
+def environment() -> Dict:
+    """Where the numbers were measured; baselines only compare fairly on similar machines"""
+    return {
+        'python_version': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'llm_backend': os.getenv('LLM_BACKEND', 'gemini'),
+        'executable': sys.executable
+    }
+
+
+def build_results(benchmarks: Dict[str, Dict], config: Optional[Dict] = None) -> Dict:
+    return {
+        'schema_version': RESULTS_SCHEMA_VERSION,
+        'created_at': datetime.now().isoformat(),
+        'environment': environment(),
+        'config': config or {},
+        'benchmarks': benchmarks
+    }
+
+
+def write_results(path: str, results: Dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(temp_path, path)
+
+
+def load_results(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.25, metric: str = 'median_ms',
+            min_delta_ms: float = 1.0) -> List[Dict]:
+    """
+    One entry per benchmark: 'regression' when metric grew by more than
+    tolerance (a fraction of the baseline), by at least min_delta_ms, and past
+    the baseline's own p95, so run-to-run noise of fast benchmarks is not
+    flagged; 'improvement' for the mirror case; 'new' / 'missing' when only one
+    side has the benchmark. A baseline entry may carry its own 'tolerance' for
+    benchmarks that are noisier than most.
+    """
+    current_benchmarks = current.get('benchmarks', {})
+    baseline_benchmarks = baseline.get('benchmarks', {})
+    comparisons = []
+
+    for name in sorted(set(current_benchmarks) | set(baseline_benchmarks)):
+        entry = {'name': name, 'metric': metric}
+        if name not in baseline_benchmarks:
+            entry.update(status='new', current=current_benchmarks[name][metric])
+        elif name not in current_benchmarks:
+            entry.update(status='missing', baseline=baseline_benchmarks[name][metric])
+        else:
+            before = baseline_benchmarks[name][metric]
+            after = current_benchmarks[name][metric]
+            allowed = baseline_benchmarks[name].get('tolerance', tolerance)
+            change = (after - before) / before if before else 0.0
+            within_baseline_spread = after <= baseline_benchmarks[name].get('p95_ms', before)
+            if change > allowed and after - before >= min_delta_ms and not within_baseline_spread:
+                status = 'regression'
+            elif change < -allowed and before - after >= min_delta_ms:
+                status = 'improvement'
+            else:
+                status = 'ok'
+            entry.update(status=status, baseline=before, current=after, change=round(change, 4),
+                         tolerance=allowed)
+        comparisons.append(entry)
+    return comparisons
+
+
+def format_comparison(comparisons: List[Dict]) -> str:
+    icons = {'regression': '❌', 'improvement': '🚀', 'ok': '✅', 'new': '🆕', 'missing': '⚠️'}
+    lines = []
+    for entry in comparisons:
+        icon = icons[entry['status']]
+        if 'change' in entry:
+            lines.append(f"{icon} {entry['name']:<40} {entry['baseline']:>10.2f} -> {entry['current']:>10.2f} ms "
+                         f"({entry['change']:+.1%}, {entry['status']})")
+        else:
+            value = entry.get('current', entry.get('baseline'))
+            lines.append(f"{icon} {entry['name']:<40} {value:>10.2f} ms ({entry['status']})")
+    return '\n'.join(lines)
@@ -0,0 +1,154 @@
+"""
+LLM Circuit Breaker
+Per-model closed/open/half-open breaker: once the recent error or slow-call rate
+crosses a threshold, calls fail immediately so agents go straight to their
+rule-based fallbacks instead of waiting on a degraded endpoint
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a model whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcomes of the last window_size calls. The circuit opens when at
+    least min_calls are recorded and the failure rate or slow-call rate reaches
+    its threshold. After open_seconds, up to half_open_probes calls are let
+    through: if they all succeed the circuit closes, and any failure reopens it.
+    """
+
+    def __init__(self, name: str, failure_rate_threshold: float = 0.5, slow_call_seconds: float = 15.0,
+                 slow_call_rate_threshold: float = 0.8, window_size: int = 20, min_calls: int = 5,
+                 open_seconds: float = 30.0, half_open_probes: int = 1):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window_size)
+        self._opened_at = None
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        self._lock = threading.Lock()
+        self.counters = {'trips': 0, 'short_circuited': 0, 'probes': 0}
+
+    @classmethod
+    def from_env(cls, name: str) -> 'CircuitBreaker':
+        return cls(
+            name,
+            failure_rate_threshold=float(os.getenv('CIRCUIT_FAILURE_RATE', 0.5)),
+            slow_call_seconds=float(os.getenv('CIRCUIT_SLOW_CALL_SECONDS', 15)),
+            slow_call_rate_threshold=float(os.getenv('CIRCUIT_SLOW_CALL_RATE', 0.8)),
+            window_size=int(os.getenv('CIRCUIT_WINDOW', 20)),
+            min_calls=int(os.getenv('CIRCUIT_MIN_CALLS', 5)),
+            open_seconds=float(os.getenv('CIRCUIT_OPEN_SECONDS', 30)),
+            half_open_probes=int(os.getenv('CIRCUIT_HALF_OPEN_PROBES', 1))
+        )
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.counters['short_circuited'] += 1
+                    raise CircuitOpenError(f'Circuit for {self.name} is open; using fallback')
+                self.state = HALF_OPEN
+                self._probes_started = 0
+                self._probes_succeeded = 0
+
+            if self.state == HALF_OPEN:
+                if self._probes_started >= self.half_open_probes:
+                    self.counters['short_circuited'] += 1
+                    raise CircuitOpenError(f'Circuit for {self.name} is half-open; probe in progress')
+                self._probes_started += 1
+                self.counters['probes'] += 1
+
+    def abandon(self):
+        """An admitted call never reached the model (e.g. no local slot); free its probe"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes_started > 0:
+                self._probes_started -= 1
+
+    def record(self, succeeded: bool, duration: float):
+        """Record the outcome of an admitted call"""
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if succeeded and not slow:
+                    self._probes_succeeded += 1
+                    if self._probes_succeeded >= self.half_open_probes:
+                        self.state = CLOSED
+                        self._outcomes.clear()
+                else:
+                    self._trip()
+                return
+            if self.state == OPEN:
+                # Late result of a call admitted before the circuit opened
+                return
+
+            self._outcomes.append((not succeeded, slow))
+            if len(self._outcomes) >= self.min_calls:
+                failure_rate, slow_rate = self._rates()
+                if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+                    self._trip()
+
+    def _trip(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.counters['trips'] += 1
+
+    def _rates(self):
+        calls = len(self._outcomes) or 1
+        failures = sum(1 for failed, _ in self._outcomes if failed)
+        slow = sum(1 for _, was_slow in self._outcomes if was_slow)
+        return failures / calls, slow / calls
+
+    def stats(self) -> Dict:
+        with self._lock:
+            failure_rate, slow_rate = self._rates()
+            stats = dict(self.counters)
+            stats.update({
+                'state': self.state,
+                'window_calls': len(self._outcomes),
+                'failure_rate': round(failure_rate, 3),
+                'slow_call_rate': round(slow_rate, 3),
+                'retry_in_seconds': round(max(0.0, self._opened_at + self.open_seconds - time.monotonic()), 1)
+                if self.state == OPEN else None
+            })
+        return stats
+
+
+class CircuitBreakerRegistry:
+    """One breaker per model name, created on first use"""
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = enabled if enabled is not None else os.getenv('CIRCUIT_BREAKER', 'true').lower() == 'true'
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str) -> Optional[CircuitBreaker]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            if model_name not in self._breakers:
+                self._breakers[model_name] = CircuitBreaker.from_env(model_name)
+            return self._breakers[model_name]
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.stats() for name, breaker in breakers.items()}
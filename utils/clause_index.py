@@ -0,0 +1,71 @@
+"""
+Clause Retrieval Index
+TF-IDF inverted index over a standards library; returns the top-k candidate
+clauses for exact reranking instead of scoring the whole library
+"""
+from typing import Dict, List, Tuple
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    import numpy as np
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+
+class ClauseIndex:
+    """
+    Candidate retrieval over {'text', 'category'} entries by TF-IDF cosine
+    similarity. Without scikit-learn every entry is returned as a candidate,
+    which matches the previous brute-force behaviour.
+    """
+
+    def __init__(self, entries: List[Dict]):
+        self.entries = list(entries)
+        self.vectorizer = None
+        self.matrix = None
+
+        if SKLEARN_AVAILABLE and self.entries:
+            # Same tokenization as BenchmarkAnalyzerAgent's keyword similarity
+            self.vectorizer = TfidfVectorizer(
+                lowercase=True,
+                token_pattern=r'\b\w+\b',
+                ngram_range=(1, 2),
+                sublinear_tf=True
+            )
+            self.matrix = self.vectorizer.fit_transform([entry['text'] for entry in self.entries])
+
+    @classmethod
+    def from_library(cls, library: Dict[str, List[str]]) -> 'ClauseIndex':
+        """Build from a {category: [clause, ...]} mapping"""
+        return cls([
+            {'text': text, 'category': category}
+            for category, texts in library.items()
+            for text in texts
+        ])
+
+    def __len__(self):
+        return len(self.entries)
+
+    def search(self, query: str, top_k: int = 50) -> List[Tuple[Dict, float]]:
+        """Top-k entries sharing vocabulary with the query, best first"""
+        if self.vectorizer is None:
+            return [(entry, 0.0) for entry in self.entries]
+
+        query_vector = self.vectorizer.transform([query])
+        if query_vector.nnz == 0:
+            return []
+
+        # Rows are L2-normalized, so the sparse dot product is the cosine similarity
+        scores = (self.matrix @ query_vector.T).toarray().ravel()
+        candidate_count = min(top_k, int(np.count_nonzero(scores)))
+        if candidate_count == 0:
+            return []
+
+        if candidate_count < len(scores):
+            top = np.argpartition(-scores, candidate_count - 1)[:candidate_count]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])][:candidate_count]
+
+        return [(self.entries[i], float(scores[i])) for i in top]
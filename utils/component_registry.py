@@ -0,0 +1,74 @@
+"""
+Component Registry
+Lazily imported, lazily built application components (agents, PDF processing,
+report generation). Nothing is imported until a request needs it, so cold
+starts and lightweight routes never pay for textstat, PyPDF2 or reportlab.
+"""
+import importlib
+import sys
+import threading
+import time
+from typing import Callable, Dict, Union
+
+
+class ComponentRegistry:
+    """
+    Components are registered as a 'package.module:Attribute' path (imported
+    on first use) or a zero-argument factory, and built once per process on
+    the first get(). Build time and the number of modules the build imported
+    are recorded for the cold-start report.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._timings = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, target: Union[str, Callable[[], object]]):
+        with self._lock:
+            self._factories[name] = target
+            self._instances.pop(name, None)
+
+    @staticmethod
+    def _resolve(target: Union[str, Callable]) -> Callable:
+        if callable(target):
+            return target
+        module_name, _, attribute = target.partition(':')
+        return getattr(importlib.import_module(module_name), attribute)
+
+    def get(self, name: str):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if name in self._instances:
+                return self._instances[name]
+            if name not in self._factories:
+                raise KeyError(f"Unknown component: {name}")
+
+            modules_before = len(sys.modules)
+            start = time.perf_counter()
+            instance = self._resolve(self._factories[name])()
+            self._timings[name] = {
+                'build_ms': round((time.perf_counter() - start) * 1000, 2),
+                'modules_imported': len(sys.modules) - modules_before
+            }
+            self._instances[name] = instance
+            return instance
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._factories
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def stats(self) -> Dict:
+        """Which components are built so far, and what each build cost"""
+        with self._lock:
+            return {
+                'registered': sorted(self._factories),
+                'loaded': sorted(self._instances),
+                'timings': dict(self._timings)
+            }
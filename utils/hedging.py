@@ -0,0 +1,141 @@
+"""
+Tail Latency Controls
+Latency percentiles for hedging decisions, per-agent budgets for extra requests
+(hedges and retries) and jittered exponential backoff for transient errors
+"""
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from utils.rate_limiter import is_overload_error
+
+# Exception class names for errors worth retrying (besides quota/overload errors)
+TRANSIENT_ERROR_NAMES = {
+    'InternalServerError', 'DeadlineExceeded', 'ServiceUnavailable', 'Aborted', 'Unknown'
+}
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Connection drops, 5xx and quota errors may succeed on a later attempt"""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if type(error).__name__ in TRANSIENT_ERROR_NAMES:
+        return True
+    if getattr(error, 'code', None) in (500, 502, 503, 504):
+        return True
+    return is_overload_error(error)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2^attempt)]"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class LatencyTracker:
+    """Recent successful call durations per key, for percentile-based hedge delays"""
+
+    def __init__(self, window_size: int = 200, min_samples: int = 20):
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, duration: float):
+        with self._lock:
+            if key not in self._samples:
+                self._samples[key] = deque(maxlen=self.window_size)
+            self._samples[key].append(duration)
+
+    def percentile(self, key, percentile: float) -> Optional[float]:
+        """None until min_samples durations have been seen for the key"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class RequestBudget:
+    """
+    Extra requests an agent may send, as a fraction of its calls over a sliding
+    window (at least `minimum` per window), so hedges and retries cannot
+    multiply load when the model is struggling
+    """
+
+    def __init__(self, ratio: float, window_seconds: float = 60.0, minimum: int = 1):
+        self.ratio = ratio
+        self.window_seconds = window_seconds
+        self.minimum = minimum
+        self._calls = deque()
+        self._spent = deque()
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        cutoff = now - self.window_seconds
+        for timestamps in (self._calls, self._spent):
+            while timestamps and timestamps[0] < cutoff:
+                timestamps.popleft()
+
+    def record_call(self):
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            self._calls.append(now)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            allowed = max(self.minimum, int(self.ratio * len(self._calls)))
+            if len(self._spent) >= allowed:
+                return False
+            self._spent.append(now)
+            return True
+
+
+class AgentBudgets:
+    """Hedge and retry budgets plus counters, kept separately for each agent"""
+
+    COUNTERS = ('calls', 'retries', 'retry_budget_exhausted', 'hedges', 'hedge_wins', 'hedge_budget_exhausted')
+
+    def __init__(self, hedge_ratio: float, retry_ratio: float, minimum: int = 1):
+        self.hedge_ratio = hedge_ratio
+        self.retry_ratio = retry_ratio
+        self.minimum = minimum
+        self._agents = {}
+        self._lock = threading.Lock()
+
+    def _agent(self, agent: str) -> Dict:
+        with self._lock:
+            if agent not in self._agents:
+                self._agents[agent] = {
+                    'hedge_budget': RequestBudget(self.hedge_ratio, minimum=self.minimum),
+                    'retry_budget': RequestBudget(self.retry_ratio, minimum=self.minimum),
+                    'counters': dict.fromkeys(self.COUNTERS, 0)
+                }
+            return self._agents[agent]
+
+    def record_call(self, agent: str):
+        state = self._agent(agent)
+        state['hedge_budget'].record_call()
+        state['retry_budget'].record_call()
+        self.count(agent, 'calls')
+
+    def try_spend(self, agent: str, kind: str) -> bool:
+        """Spend one 'hedge' or 'retry' from the agent's budget"""
+        if self._agent(agent)[f'{kind}_budget'].try_spend():
+            return True
+        self.count(agent, f'{kind}_budget_exhausted')
+        return False
+
+    def count(self, agent: str, counter: str):
+        state = self._agent(agent)
+        with self._lock:
+            state['counters'][counter] += 1
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {agent: dict(state['counters']) for agent, state in self._agents.items()}
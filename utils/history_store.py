@@ -0,0 +1,305 @@
+"""
+Analysis History Store
+Append-only SQLite log of analysis results with indexed summary columns, replacing
+the read-modify-write of data/analysis_history.json. Running totals and hourly/daily
+rollups are maintained on every append so analytics never rescan the log.
+"""
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+# Bump when the aggregate tables change shape; stores are rebuilt from the raw log
+AGGREGATES_VERSION = '1'
+
+# Timestamp prefix lengths for ISO-8601 bucketing
+ROLLUP_BUCKETS = {'hour': 13, 'day': 10}
+
+
+class HistoryStore:
+    """
+    Each analysis is one INSERT (O(1) in history size). SQLite's file locking
+    makes appends safe across gunicorn workers, and the summary columns are
+    indexed so analytics can query without deserializing every payload.
+    """
+
+    def __init__(self, db_path: str, legacy_json_path: Optional[str] = None):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    analysis_id TEXT,
+                    timestamp TEXT NOT NULL,
+                    risk_level TEXT,
+                    compliance_status TEXT,
+                    readability_improvement REAL NOT NULL DEFAULT 0,
+                    compliance_issue_count INTEGER NOT NULL DEFAULT 0,
+                    payload TEXT NOT NULL
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_analyses_timestamp ON analyses(timestamp)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_analyses_risk_level ON analyses(risk_level)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_analyses_compliance_status ON analyses(compliance_status)')
+            conn.execute('CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS analytics_counters (name TEXT PRIMARY KEY, value REAL NOT NULL)')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analytics_rollups (
+                    bucket_type TEXT NOT NULL,
+                    bucket_start TEXT NOT NULL,
+                    analyses INTEGER NOT NULL DEFAULT 0,
+                    readability_improvement_sum REAL NOT NULL DEFAULT 0,
+                    compliance_issues INTEGER NOT NULL DEFAULT 0,
+                    high_risk INTEGER NOT NULL DEFAULT 0,
+                    compliant INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (bucket_type, bucket_start)
+                )
+            """)
+
+        if self._meta('aggregates_version') != AGGREGATES_VERSION:
+            self.rebuild_aggregates()
+
+        if legacy_json_path:
+            self.import_legacy_json(legacy_json_path)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def summarize(results: Dict) -> Dict:
+        """Indexed summary columns extracted from one analysis result"""
+        plain_english = results.get('plain_english') or {}
+        compliance = results.get('compliance_check') or {}
+        risk = results.get('risk_score') or {}
+        return {
+            'analysis_id': results.get('analysis_id'),
+            'timestamp': results.get('timestamp', ''),
+            'risk_level': risk.get('risk_level'),
+            'compliance_status': compliance.get('status'),
+            'readability_improvement': plain_english.get('readability_improvement', 0) or 0,
+            'compliance_issue_count': (
+                len(compliance.get('regulatory_issues', [])) +
+                len(compliance.get('vague_language_detected', []))
+            )
+        }
+
+    def _meta(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute('SELECT value FROM store_meta WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _insert(self, conn, results: Dict):
+        summary = self.summarize(results)
+        conn.execute(
+            'INSERT INTO analyses (analysis_id, timestamp, risk_level, compliance_status, '
+            'readability_improvement, compliance_issue_count, payload) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (summary['analysis_id'], summary['timestamp'], summary['risk_level'],
+             summary['compliance_status'], summary['readability_improvement'],
+             summary['compliance_issue_count'], json.dumps(results))
+        )
+        # Aggregates are updated in the same transaction as the append
+        self._update_aggregates(conn, summary)
+        return summary
+
+    @staticmethod
+    def _update_aggregates(conn, summary: Dict):
+        counters = {
+            'total_analyses': 1,
+            'readability_improvement_sum': summary['readability_improvement'],
+            'compliance_issues_found': summary['compliance_issue_count'],
+            f"risk_level:{summary['risk_level']}": 1,
+            f"compliance_status:{summary['compliance_status']}": 1
+        }
+        conn.executemany(
+            'INSERT INTO analytics_counters (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            list(counters.items())
+        )
+
+        high_risk = 1 if summary['risk_level'] == 'High' else 0
+        compliant = 1 if summary['compliance_status'] == 'compliant' else 0
+        for bucket_type, prefix in ROLLUP_BUCKETS.items():
+            conn.execute(
+                'INSERT INTO analytics_rollups (bucket_type, bucket_start, analyses, '
+                'readability_improvement_sum, compliance_issues, high_risk, compliant) '
+                'VALUES (?, ?, 1, ?, ?, ?, ?) '
+                'ON CONFLICT(bucket_type, bucket_start) DO UPDATE SET '
+                'analyses = analyses + 1, '
+                'readability_improvement_sum = readability_improvement_sum + excluded.readability_improvement_sum, '
+                'compliance_issues = compliance_issues + excluded.compliance_issues, '
+                'high_risk = high_risk + excluded.high_risk, '
+                'compliant = compliant + excluded.compliant',
+                (bucket_type, summary['timestamp'][:prefix], summary['readability_improvement'],
+                 summary['compliance_issue_count'], high_risk, compliant)
+            )
+
+    def rebuild_aggregates(self) -> Dict:
+        """Recompute counters and rollups from the raw log"""
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM analytics_counters')
+            conn.execute('DELETE FROM analytics_rollups')
+            conn.execute(
+                "INSERT INTO analytics_counters (name, value) "
+                "SELECT 'total_analyses', COUNT(*) FROM analyses "
+                "UNION ALL SELECT 'readability_improvement_sum', COALESCE(SUM(readability_improvement), 0) FROM analyses "
+                "UNION ALL SELECT 'compliance_issues_found', COALESCE(SUM(compliance_issue_count), 0) FROM analyses"
+            )
+            conn.execute(
+                "INSERT INTO analytics_counters (name, value) "
+                "SELECT 'risk_level:' || COALESCE(risk_level, 'None'), COUNT(*) FROM analyses GROUP BY risk_level"
+            )
+            conn.execute(
+                "INSERT INTO analytics_counters (name, value) "
+                "SELECT 'compliance_status:' || COALESCE(compliance_status, 'None'), COUNT(*) "
+                "FROM analyses GROUP BY compliance_status"
+            )
+            for bucket_type, prefix in ROLLUP_BUCKETS.items():
+                conn.execute(
+                    "INSERT INTO analytics_rollups (bucket_type, bucket_start, analyses, "
+                    "readability_improvement_sum, compliance_issues, high_risk, compliant) "
+                    "SELECT ?, substr(timestamp, 1, ?), COUNT(*), SUM(readability_improvement), "
+                    "SUM(compliance_issue_count), SUM(risk_level = 'High'), SUM(compliance_status = 'compliant') "
+                    "FROM analyses GROUP BY substr(timestamp, 1, ?)",
+                    (bucket_type, prefix, prefix)
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('aggregates_version', ?)",
+                (AGGREGATES_VERSION,)
+            )
+        return self.summary_totals()
+
+    def append(self, results: Dict) -> Dict:
+        """Append one analysis; returns its summary row"""
+        with self._connect() as conn:
+            return self._insert(conn, results)
+
+    def import_legacy_json(self, json_path: str) -> int:
+        """One-time import of the old analysis_history.json file"""
+        if not os.path.exists(json_path):
+            return 0
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute("SELECT 1 FROM store_meta WHERE key = 'legacy_imported'").fetchone():
+                return 0
+            try:
+                with open(json_path, 'r') as f:
+                    history = json.load(f)
+            except (ValueError, OSError):
+                history = []
+            for results in history:
+                self._insert(conn, results)
+            conn.execute(
+                "INSERT INTO store_meta (key, value) VALUES ('legacy_imported', ?)", (json_path,)
+            )
+        return len(history)
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM analyses').fetchone()[0]
+
+    def recent(self, limit: int = 10) -> List[Dict]:
+        """Latest analyses, oldest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT payload FROM analyses ORDER BY id DESC LIMIT ?', (limit,)
+            ).fetchall()
+        return [json.loads(row['payload']) for row in reversed(rows)]
+
+    def query(self, risk_level: Optional[str] = None, compliance_status: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None,
+              limit: int = 100) -> List[Dict]:
+        """Filter on the indexed columns; timestamps are ISO-8601 strings"""
+        clauses, params = [], []
+        if risk_level:
+            clauses.append('risk_level = ?')
+            params.append(risk_level)
+        if compliance_status:
+            clauses.append('compliance_status = ?')
+            params.append(compliance_status)
+        if since:
+            clauses.append('timestamp >= ?')
+            params.append(since)
+        if until:
+            clauses.append('timestamp < ?')
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                f'SELECT payload FROM analyses {where} ORDER BY timestamp DESC LIMIT ?', (*params, limit)
+            ).fetchall()
+        return [json.loads(row['payload']) for row in rows]
+
+    def summary_totals(self) -> Dict:
+        """Running totals, read in O(1) from the maintained counters"""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT name, value FROM analytics_counters').fetchall()
+        counters = {row['name']: row['value'] for row in rows}
+
+        totals = {
+            'total_analyses': int(counters.get('total_analyses', 0)),
+            'readability_improvement_sum': counters.get('readability_improvement_sum', 0.0),
+            'compliance_issues_found': int(counters.get('compliance_issues_found', 0)),
+            'risk_levels': {},
+            'compliance_statuses': {}
+        }
+        for name, value in counters.items():
+            if name.startswith('risk_level:'):
+                totals['risk_levels'][name.split(':', 1)[1]] = int(value)
+            elif name.startswith('compliance_status:'):
+                totals['compliance_statuses'][name.split(':', 1)[1]] = int(value)
+        return totals
+
+    def rollups(self, bucket_type: str = 'day', limit: int = 7) -> List[Dict]:
+        """Most recent hourly or daily rollups, oldest first"""
+        if bucket_type not in ROLLUP_BUCKETS:
+            raise ValueError(f"Unknown rollup bucket: {bucket_type}")
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT bucket_start, analyses, readability_improvement_sum, compliance_issues, high_risk, compliant '
+                'FROM analytics_rollups WHERE bucket_type = ? ORDER BY bucket_start DESC LIMIT ?',
+                (bucket_type, limit)
+            ).fetchall()
+
+        rollups = []
+        for row in reversed(rows):
+            rollup = dict(row)
+            rollup['avg_readability_improvement'] = round(
+                row['readability_improvement_sum'] / max(row['analyses'], 1), 2
+            )
+            rollups.append(rollup)
+        return rollups
+
+    def iter_summaries(self, batch_size: int = 500) -> Iterator[Dict]:
+        """Stream summary columns in insertion order"""
+        last_id = 0
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    'SELECT id, analysis_id, timestamp, risk_level, compliance_status, '
+                    'readability_improvement, compliance_issue_count FROM analyses '
+                    'WHERE id > ? ORDER BY id LIMIT ?', (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last_id = rows[-1]['id']
+
+    def size_bytes(self) -> int:
+        """On-disk size of the store including its write-ahead log"""
+        return sum(
+            os.path.getsize(path) for path in (self.db_path, f'{self.db_path}-wal')
+            if os.path.exists(path)
+        )
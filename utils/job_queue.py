@@ -0,0 +1,362 @@
+"""
+Background Job Queue
+SQLite-backed job store with a worker thread pool. Jobs and their per-item
+results are persisted, so work resumes after a worker restart without any
+external service.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+
+class JobStore:
+    """
+    Persistent job state shared by every worker process on the host.
+    Jobs are claimed under a lease; a job whose lease expires (its worker
+    died or was restarted) is picked up again by another worker.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    total_items INTEGER NOT NULL DEFAULT 0,
+                    completed_items INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    lease_expires REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_items (
+                    job_id TEXT NOT NULL,
+                    item_index INTEGER NOT NULL,
+                    result TEXT NOT NULL,
+                    completed_at REAL NOT NULL,
+                    PRIMARY KEY (job_id, item_index)
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            # Take the write lock up front so claims are atomic across processes
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+    def create_job(self, kind: str, payload: Dict, total_items: int = 0) -> str:
+        job_id = uuid.uuid4().hex[:16]
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, kind, status, payload, total_items, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, kind, 'queued', json.dumps(payload), total_items, now, now)
+            )
+        return job_id
+
+    def claim_next(self, worker: str, kinds: List[str], lease_seconds: float,
+                   job_id: Optional[str] = None) -> Optional[Dict]:
+        """Claim the oldest queued job (or job_id only), or a running job whose lease has expired"""
+        now = time.time()
+        placeholders = ','.join('?' for _ in kinds)
+        only_job = 'AND id = ? ' if job_id else ''
+        with self._transaction() as conn:
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE kind IN ({placeholders}) {only_job}AND "
+                f"(status = 'queued' OR (status = 'running' AND lease_expires < ?)) "
+                f"ORDER BY created_at LIMIT 1",
+                (*kinds, *([job_id] if job_id else []), now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker, now + lease_seconds, now, row['id'])
+            )
+        job = self._row_to_job(row)
+        job['status'] = 'running'
+        job['attempts'] += 1
+        return job
+
+    def renew_lease(self, job_id: str, worker: str, lease_seconds: float) -> bool:
+        """Extend the lease; False if the worker no longer holds the job"""
+        now = time.time()
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (now + lease_seconds, now, job_id, worker)
+            ).rowcount > 0
+
+    def update_payload(self, job_id: str, payload: Dict, total_items: Optional[int] = None):
+        with self._transaction() as conn:
+            if total_items is None:
+                conn.execute(
+                    'UPDATE jobs SET payload = ?, updated_at = ? WHERE id = ?',
+                    (json.dumps(payload), time.time(), job_id)
+                )
+            else:
+                conn.execute(
+                    'UPDATE jobs SET payload = ?, total_items = ?, updated_at = ? WHERE id = ?',
+                    (json.dumps(payload), total_items, time.time(), job_id)
+                )
+
+    def save_item(self, job_id: str, item_index: int, result: Dict):
+        """Persist one item's result and bump the job's progress counter"""
+        now = time.time()
+        with self._transaction() as conn:
+            inserted = conn.execute(
+                'INSERT OR IGNORE INTO job_items (job_id, item_index, result, completed_at) VALUES (?, ?, ?, ?)',
+                (job_id, item_index, json.dumps(result), now)
+            ).rowcount
+            if inserted:
+                conn.execute(
+                    'UPDATE jobs SET completed_items = completed_items + 1, updated_at = ? WHERE id = ?',
+                    (now, job_id)
+                )
+
+    def completed_item_indexes(self, job_id: str) -> List[int]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT item_index FROM job_items WHERE job_id = ? ORDER BY item_index', (job_id,)
+            ).fetchall()
+        return [row['item_index'] for row in rows]
+
+    def get_items(self, job_id: str) -> Dict[int, Dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT item_index, result FROM job_items WHERE job_id = ? ORDER BY item_index', (job_id,)
+            ).fetchall()
+        return {row['item_index']: json.loads(row['result']) for row in rows}
+
+    def complete(self, job_id: str, result: Dict, worker: Optional[str] = None) -> bool:
+        """Record the result; with a worker, only if that worker still holds the lease"""
+        return self._finish(job_id, worker, "status = 'completed', result = ?", json.dumps(result))
+
+    def fail(self, job_id: str, error: str, worker: Optional[str] = None) -> bool:
+        """Record the error; with a worker, only if that worker still holds the lease"""
+        return self._finish(job_id, worker, "status = 'failed', error = ?", error)
+
+    def _finish(self, job_id: str, worker: Optional[str], assignment: str, value: str) -> bool:
+        query = f"UPDATE jobs SET {assignment}, lease_expires = NULL, updated_at = ? WHERE id = ?"
+        params = [value, time.time(), job_id]
+        if worker is not None:
+            query += " AND worker = ? AND status = 'running'"
+            params.append(worker)
+        with self._transaction() as conn:
+            return conn.execute(query, params).rowcount > 0
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def count_by_status(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute('SELECT status, COUNT(*) AS n FROM jobs GROUP BY status').fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+    @staticmethod
+    def _row_to_job(row) -> Dict:
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+
+class JobContext:
+    """Handle passed to job handlers for reporting progress and resuming work"""
+
+    def __init__(self, queue: 'JobQueue', job: Dict, worker: str):
+        self.queue = queue
+        self.job = job
+        self.job_id = job['id']
+        self.payload = job['payload']
+        self.worker = worker
+
+    def completed_items(self) -> Dict[int, Dict]:
+        """Items finished by earlier attempts, so a resumed job can skip them"""
+        return self.queue.store.get_items(self.job_id)
+
+    def save_item(self, item_index: int, result: Dict):
+        self.queue.store.save_item(self.job_id, item_index, result)
+        self.heartbeat()
+
+    def update_payload(self, payload: Dict, total_items: Optional[int] = None):
+        self.payload = payload
+        self.queue.store.update_payload(self.job_id, payload, total_items)
+
+    def heartbeat(self) -> bool:
+        """Renew the lease; False once another worker has taken the job over"""
+        return self.queue.store.renew_lease(self.job_id, self.worker, self.queue.lease_seconds)
+
+
+class JobQueue:
+    """Pool of worker threads that claim and run jobs from a JobStore"""
+
+    def __init__(self, store: JobStore, max_workers: int = 2, poll_interval: float = 2.0,
+                 lease_seconds: float = 120.0, max_attempts: int = 3):
+        self.store = store
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.handlers = {}
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def register(self, kind: str, handler: Callable[[JobContext], Dict]):
+        self.handlers[kind] = handler
+
+    def submit(self, kind: str, payload: Dict, total_items: int = 0) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        job_id = self.store.create_job(kind, payload, total_items)
+        self._wakeup.set()
+        return job_id
+
+    def start(self):
+        """Start worker threads; queued and orphaned jobs are picked up immediately"""
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._worker_loop, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    @property
+    def running(self) -> bool:
+        """True while worker threads are processing the queue"""
+        return bool(self._threads) and not self._stop.is_set()
+
+    def run_job(self, job_id: str) -> Optional[Dict]:
+        """Run one queued job on the calling thread (when no workers run); returns its status"""
+        self._run_one(job_id)
+        return self.describe(job_id)
+
+    def run_pending(self) -> int:
+        """Process jobs on the calling thread until none are claimable; returns jobs run"""
+        processed = 0
+        while self._run_one():
+            processed += 1
+        return processed
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                ran = self._run_one()
+            except sqlite3.Error as e:
+                print(f"⚠️ Job queue error: {e}")
+                ran = False
+            if not ran:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _run_one(self, job_id: Optional[str] = None) -> bool:
+        # Each thread claims under its own name, so lease ownership is per thread, not per process
+        worker = f"{self.worker_id}:{threading.current_thread().name}"
+        job = self.store.claim_next(worker, list(self.handlers), self.lease_seconds, job_id)
+        if job is None:
+            return False
+
+        if job['attempts'] > self.max_attempts:
+            self.store.fail(job['id'], f"Gave up after {self.max_attempts} attempts", worker)
+            return True
+
+        context = JobContext(self, job, worker)
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat_loop, args=(context, stop_heartbeat),
+            name=f"job-heartbeat-{job['id']}", daemon=True
+        )
+        heartbeat.start()
+        try:
+            try:
+                result = self.handlers[job['kind']](context)
+                owned = self.store.complete(job['id'], result, worker)
+            except Exception as e:
+                print(f"❌ Job {job['id']} failed: {e}")
+                owned = self.store.fail(job['id'], str(e), worker)
+            if not owned:
+                print(f"⚠️ Job {job['id']} finished after another worker took it over; outcome discarded")
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+        return True
+
+    def _heartbeat_loop(self, context: JobContext, stop: threading.Event):
+        """Keep the lease alive while a handler runs, however long a single step takes"""
+        interval = max(self.lease_seconds / 3, 0.05)
+        while not stop.wait(interval):
+            try:
+                if not context.heartbeat():
+                    print(f"⚠️ Job {context.job_id} lease lost to another worker")
+                    return
+            except sqlite3.Error as e:
+                print(f"⚠️ Job {context.job_id} heartbeat failed: {e}")
+
+    def describe(self, job_id: str) -> Optional[Dict]:
+        """Public status view of a job with per-item progress"""
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+
+        total = job['total_items']
+        completed = job['completed_items']
+        return {
+            'job_id': job['id'],
+            'kind': job['kind'],
+            'status': job['status'],
+            'error': job['error'],
+            'attempts': job['attempts'],
+            'progress': {
+                'completed': completed,
+                'total': total,
+                'percent': round(completed / total * 100, 1) if total else 0.0
+            },
+            'created_at': job['created_at'],
+            'updated_at': job['updated_at']
+        }
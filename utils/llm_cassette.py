@@ -0,0 +1,211 @@
+"""
+LLM Cassettes
+Record every model call (prompt, generation config, response and measured
+latency) to a JSONL cassette, and replay it later keyed by prompt hash, so
+end-to-end performance runs use production-shaped answers without a network.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+MODES = ('record', 'replay')
+
+
+class CassetteMiss(LookupError):
+    """Replay found no recording for a prompt"""
+
+
+class _UsageMetadata:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class CassetteResponse:
+    """Replayed response with the text and token usage of the recorded one"""
+
+    def __init__(self, entry: Dict):
+        self.text = entry['text']
+        self.usage_metadata = None
+        if entry.get('input_tokens') is not None:
+            self.usage_metadata = _UsageMetadata(entry['input_tokens'], entry.get('output_tokens') or 0)
+
+
+def cassette_key(model_name: str, prompt: str, generation_config: Optional[Dict] = None) -> str:
+    """Hash of everything that determines the answer"""
+    payload = json.dumps([model_name, prompt, generation_config or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _open(path: str, mode: str):
+    # A .gz cassette is compressed; appending adds a gzip member, which readers handle transparently
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def load_cassette(path: str) -> Dict[str, List[Dict]]:
+    """Recorded entries by key, in recording order"""
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with _open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A line cut short by a recorder that was killed mid-write
+                continue
+            entries.setdefault(entry['key'], []).append(entry)
+    return entries
+
+
+class CassetteBackend:
+    """
+    Same interface as GeminiBackend.
+
+    record: forwards each call to `inner` and appends the prompt, config,
+    response text, token usage and latency to the cassette. Failed calls are
+    not recorded.
+
+    replay: answers from the cassette. A prompt recorded several times
+    replays its responses in order, then keeps returning the last one. With
+    replay_latency the recorded latency (times latency_scale) is slept before
+    answering. Prompts missing from the cassette raise CassetteMiss, or go to
+    `fallback` when one is given.
+    """
+
+    def __init__(self, path: str, mode: str = 'replay', inner=None, fallback=None,
+                 replay_latency: bool = False, latency_scale: float = 1.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode == 'record' and inner is None:
+            raise ValueError("Recording needs a backend to forward calls to")
+        self.path = path
+        self.mode = mode
+        self.inner = inner
+        self.fallback = fallback
+        self.replay_latency = replay_latency
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._positions = {}
+        self.counters = {'recorded': 0, 'hits': 0, 'misses': 0}
+        self._entries = load_cassette(path) if mode == 'replay' else {}
+        if mode == 'record':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    @classmethod
+    def from_env(cls, mode: str) -> 'CassetteBackend':
+        from utils.llm_gateway import create_backend
+
+        inner = fallback = None
+        if mode == 'record':
+            inner = create_backend(os.getenv('LLM_CASSETTE_SOURCE', 'gemini'))
+        on_miss = os.getenv('LLM_CASSETTE_ON_MISS', 'error').lower()
+        if mode == 'replay' and on_miss != 'error':
+            fallback = create_backend(on_miss)
+        return cls(
+            path=os.getenv('LLM_CASSETTE_PATH', 'data/llm_cassette.jsonl'),
+            mode=mode,
+            inner=inner,
+            fallback=fallback,
+            replay_latency=os.getenv('LLM_CASSETTE_REPLAY_LATENCY', 'false').lower() == 'true',
+            latency_scale=float(os.getenv('LLM_CASSETTE_LATENCY_SCALE', 1.0))
+        )
+
+    @property
+    def size(self) -> int:
+        """Recorded responses available for replay"""
+        return sum(len(entries) for entries in self._entries.values())
+
+    def _record(self, model_name: str, prompt: str, generation_config: Optional[Dict], text: str,
+                latency: float, stream: bool, response=None):
+        usage = getattr(response, 'usage_metadata', None)
+        entry = {
+            'key': cassette_key(model_name, prompt, generation_config),
+            'model': model_name,
+            'prompt': prompt,
+            'config': generation_config,
+            'text': text,
+            'latency_ms': round(latency * 1000, 2),
+            'input_tokens': getattr(usage, 'prompt_token_count', None),
+            'output_tokens': getattr(usage, 'candidates_token_count', None),
+            'stream': stream,
+            'recorded_at': time.time()
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            with _open(self.path, 'a') as f:
+                f.write(line)
+            self.counters['recorded'] += 1
+
+    def _lookup(self, model_name: str, prompt: str, generation_config: Optional[Dict]) -> Optional[Dict]:
+        key = cassette_key(model_name, prompt, generation_config)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.counters['misses'] += 1
+                return None
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            self.counters['hits'] += 1
+        return entries[min(position, len(entries) - 1)]
+
+    def _replay_delay(self, entry: Dict) -> float:
+        return entry.get('latency_ms', 0) * self.latency_scale / 1000 if self.replay_latency else 0.0
+
+    def _miss(self, prompt: str):
+        return CassetteMiss(f"No recording for prompt {hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]} "
+                            f"in {self.path}")
+
+    def generate(self, model_name: str, prompt: str, generation_config: Optional[Dict] = None):
+        if self.mode == 'record':
+            start = time.time()
+            response = self.inner.generate(model_name, prompt, generation_config)
+            latency = time.time() - start
+            try:
+                text = response.text
+            except ValueError:
+                # Blocked responses have no text; the agent handles them, there is nothing to replay
+                return response
+            self._record(model_name, prompt, generation_config, text, latency, False, response)
+            return response
+
+        entry = self._lookup(model_name, prompt, generation_config)
+        if entry is None:
+            if self.fallback is not None:
+                return self.fallback.generate(model_name, prompt, generation_config)
+            raise self._miss(prompt)
+        time.sleep(self._replay_delay(entry))
+        return CassetteResponse(entry)
+
+    def generate_stream(self, model_name: str, prompt: str, generation_config: Optional[Dict] = None) -> Iterator[str]:
+        if self.mode == 'record':
+            start = time.time()
+            chunks = []
+            for chunk in self.inner.generate_stream(model_name, prompt, generation_config):
+                chunks.append(chunk)
+                yield chunk
+            self._record(model_name, prompt, generation_config, ''.join(chunks), time.time() - start, True)
+            return
+
+        entry = self._lookup(model_name, prompt, generation_config)
+        if entry is None:
+            if self.fallback is not None:
+                yield from self.fallback.generate_stream(model_name, prompt, generation_config)
+                return
+            raise self._miss(prompt)
+        # Spread the recorded latency over word-sized chunks
+        chunks = re.findall(r'\S+\s*', entry['text']) or [entry['text']]
+        delay = self._replay_delay(entry) / len(chunks)
+        for chunk in chunks:
+            time.sleep(delay)
+            yield chunk
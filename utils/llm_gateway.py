@@ -0,0 +1,471 @@
+"""
+Shared LLM Gateway
+Single entry point for every agent's model calls: one configured client per process,
+a process-wide concurrency limit, a per-call timeout, per-model circuit breakers,
+hedged requests and jittered retries, and an optional host-wide adaptive rate limiter
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterator, Optional
+
+from dotenv import load_dotenv
+
+from utils.circuit_breaker import CircuitBreakerRegistry, CircuitOpenError
+from utils.hedging import AgentBudgets, LatencyTracker, backoff_delay, is_transient_error
+from utils.rate_limiter import AdaptiveRateLimiter, is_overload_error
+from utils.telemetry import record_llm_call, token_usage
+
+load_dotenv()
+
+DEFAULT_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash-exp')
+
+
+class LLMTimeoutError(TimeoutError):
+    """Raised when a model call (including time spent queued) exceeds its timeout"""
+
+
+class GeminiBackend:
+    """Google Gemini backend; configures the SDK once and reuses model clients"""
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key
+        self._genai = None
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _get_model(self, model_name):
+        with self._lock:
+            if self._genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key or os.getenv('GEMINI_API_KEY', 'your-gemini-api-key'))
+                self._genai = genai
+            if model_name not in self._models:
+                self._models[model_name] = self._genai.GenerativeModel(model_name)
+            return self._models[model_name]
+
+    def generate(self, model_name: str, prompt: str, generation_config: Optional[Dict] = None):
+        model = self._get_model(model_name)
+        return model.generate_content(prompt, generation_config=generation_config)
+
+    def generate_stream(self, model_name: str, prompt: str, generation_config: Optional[Dict] = None) -> Iterator[str]:
+        model = self._get_model(model_name)
+        for chunk in model.generate_content(prompt, generation_config=generation_config, stream=True):
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. a final safety/finish chunk)
+                continue
+            if text:
+                yield text
+
+
+def create_backend(name: Optional[str] = None):
+    """
+    Backend selected by LLM_BACKEND: 'gemini' (default), 'offline' (deterministic,
+    no network), or 'record' / 'replay' (LLM cassette at LLM_CASSETTE_PATH)
+    """
+    name = (name or os.getenv('LLM_BACKEND', 'gemini')).lower()
+    if name == 'gemini':
+        return GeminiBackend()
+    if name == 'offline':
+        from utils.offline_llm import OfflineBackend
+        return OfflineBackend.from_env()
+    if name in ('record', 'replay'):
+        from utils.llm_cassette import CassetteBackend
+        return CassetteBackend.from_env(name)
+    raise ValueError(f"Unknown LLM backend: {name}")
+
+
+class _Call:
+    """One model request in flight: its future and circuit bookkeeping"""
+
+    def __init__(self, breaker):
+        self.breaker = breaker
+        self.future = None
+        self.started = time.monotonic()
+        # A timed-out call is recorded at the timeout, not again when it finally returns
+        self.recorded = threading.Lock()
+
+
+class LLMGateway:
+    """
+    Bounds the number of in-flight model requests per worker process and
+    enforces a timeout on each call. Agents call generate() instead of
+    holding their own GenerativeModel instances.
+
+    A call still running past the hedge percentile of recent latencies gets a
+    duplicate request, and the first answer wins. Transient errors are retried
+    with jittered exponential backoff. Hedges and retries are both limited by
+    per-agent budgets.
+    """
+
+    def __init__(self, backend=None, max_concurrency: Optional[int] = None,
+                 timeout: Optional[float] = None, model_name: str = DEFAULT_MODEL,
+                 limiter: Optional[AdaptiveRateLimiter] = None,
+                 breakers: Optional[CircuitBreakerRegistry] = None,
+                 hedge_percentile: Optional[float] = None, max_retries: Optional[int] = None):
+        self.backend = backend or create_backend()
+        self.max_concurrency = max_concurrency or int(os.getenv('LLM_MAX_CONCURRENCY', 8))
+        self.timeout = timeout or float(os.getenv('LLM_TIMEOUT_SECONDS', 30))
+        self.model_name = model_name
+        # Shared with the other worker processes: request rate and adaptive concurrency
+        self.limiter = limiter
+        # Open circuits fail fast with CircuitOpenError so agents use their fallbacks
+        self.breakers = breakers or CircuitBreakerRegistry()
+        # Hedge after this percentile of recent latency (0 disables hedging)
+        self.hedge_percentile = (hedge_percentile if hedge_percentile is not None
+                                 else float(os.getenv('LLM_HEDGE_PERCENTILE', 95)))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('LLM_MAX_RETRIES', 2))
+        self.retry_base_delay = float(os.getenv('LLM_RETRY_BASE_DELAY', 0.5))
+        self.retry_max_delay = float(os.getenv('LLM_RETRY_MAX_DELAY', 8))
+        self.latencies = LatencyTracker(min_samples=int(os.getenv('LLM_HEDGE_MIN_SAMPLES', 20)))
+        self.budgets = AgentBudgets(
+            hedge_ratio=float(os.getenv('LLM_HEDGE_BUDGET', 0.1)),
+            retry_ratio=float(os.getenv('LLM_RETRY_BUDGET', 0.2)),
+            minimum=int(os.getenv('LLM_EXTRA_REQUESTS_MIN', 1))
+        )
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        # Calls run on their own threads so a hung request can be abandoned at the timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='llm')
+        self._lock = threading.Lock()
+        self.counters = {
+            'calls': 0,
+            'errors': 0,
+            'timeouts': 0,
+            'throttled': 0,
+            'short_circuited': 0,
+            'in_flight': 0,
+            'peak_in_flight': 0
+        }
+
+    def generate(self, prompt: str, generation_config: Optional[Dict] = None,
+                 agent: Optional[str] = None, model: Optional[str] = None,
+                 timeout: Optional[float] = None):
+        """Run one model call through the shared limits, hedging slow calls and retrying transient errors"""
+        timeout = timeout or self.timeout
+        deadline = time.monotonic() + timeout
+        model_name = model or self.model_name
+        agent_name = agent or 'unknown'
+        self.budgets.record_call(agent_name)
+
+        started = time.monotonic()
+        usage = {'queue_wait': 0.0, 'retries': 0, 'hedges': 0}
+        try:
+            response = self._generate_with_retries(prompt, generation_config, agent_name, model_name,
+                                                   timeout, deadline, usage)
+        except Exception as e:
+            self._record_usage(prompt, None, agent_name, model_name, started, usage, e)
+            raise
+        self._record_usage(prompt, response, agent_name, model_name, started, usage)
+        return response
+
+    def _generate_with_retries(self, prompt, generation_config, agent, model_name, timeout, deadline, usage):
+        while True:
+            try:
+                return self._generate_hedged(prompt, generation_config, agent, model_name, timeout, deadline, usage)
+            except (CircuitOpenError, LLMTimeoutError):
+                raise
+            except Exception as e:
+                if usage['retries'] >= self.max_retries or not is_transient_error(e):
+                    raise
+                delay = backoff_delay(usage['retries'], self.retry_base_delay, self.retry_max_delay)
+                if time.monotonic() + delay >= deadline or not self.budgets.try_spend(agent, 'retry'):
+                    raise
+                usage['retries'] += 1
+                self.budgets.count(agent, 'retries')
+                time.sleep(delay)
+
+    def _generate_hedged(self, prompt, generation_config, agent, model_name, timeout, deadline, usage):
+        """One attempt: the primary request, plus a hedge if it outlives the latency percentile"""
+        latency_key = (model_name, agent, (generation_config or {}).get('max_output_tokens'))
+        primary = self._start_call(prompt, generation_config, agent, model_name, timeout, deadline,
+                                   latency_key, usage)
+        calls = [primary]
+
+        hedge_delay = self.latencies.percentile(latency_key, self.hedge_percentile) if self.hedge_percentile else None
+        if hedge_delay is not None:
+            done, _ = wait([primary.future], timeout=min(hedge_delay, max(0.0, deadline - time.monotonic())))
+            if not done and time.monotonic() < deadline and self.budgets.try_spend(agent, 'hedge'):
+                try:
+                    # Only sent if capacity is free right now; a hedge never queues
+                    calls.append(self._start_call(prompt, generation_config, agent, model_name, 0,
+                                                  deadline, latency_key, usage, hedge=True))
+                    self.budgets.count(agent, 'hedges')
+                    usage['hedges'] += 1
+                except (CircuitOpenError, LLMTimeoutError):
+                    pass
+
+        pending = {call.future: call for call in calls}
+        first_error = None
+        while pending:
+            done, _ = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                self._count('timeouts')
+                for call in pending.values():
+                    self._record_once(call, False)
+                if self.limiter:
+                    self.limiter.signal_overload()
+                raise LLMTimeoutError(f'LLM call exceeded {timeout:.1f}s ({agent})')
+
+            for future in done:
+                call = pending.pop(future)
+                if future.exception() is None:
+                    if call is not primary:
+                        self.budgets.count(agent, 'hedge_wins')
+                    return future.result()
+                first_error = first_error or future.exception()
+
+        self._count('errors')
+        raise first_error
+
+    def _start_call(self, prompt, generation_config, agent, model_name, timeout, deadline, latency_key, usage,
+                    hedge=False):
+        """Admit and submit one backend request"""
+        call = _Call(self._enter_circuit(model_name, agent, count=not hedge))
+        try:
+            self._acquire_slot(timeout, deadline, agent, call.breaker, count=not hedge)
+        finally:
+            usage['queue_wait'] += time.monotonic() - call.started
+        try:
+            call.future = self._executor.submit(self.backend.generate, model_name, prompt, generation_config)
+        except Exception:
+            self._release_slot()
+            if call.breaker:
+                call.breaker.abandon()
+            raise
+
+        def on_done(f):
+            # The slot is freed when the request really finishes, so abandoned calls still count
+            error = f.exception()
+            self._release_slot(error)
+            duration = time.monotonic() - call.started
+            self._record_once(call, error is None, duration)
+            if error is None:
+                self.latencies.record(latency_key, duration)
+
+        call.future.add_done_callback(on_done)
+        return call
+
+    def generate_stream(self, prompt: str, generation_config: Optional[Dict] = None,
+                        agent: Optional[str] = None, model: Optional[str] = None,
+                        timeout: Optional[float] = None) -> Iterator[str]:
+        """
+        Yield text chunks of one model call as they arrive. Holds one concurrency
+        slot for the whole stream; the timeout bounds the complete response.
+        """
+        timeout = timeout or self.timeout
+        deadline = time.monotonic() + timeout
+        model_name = model or self.model_name
+        agent_name = agent or 'unknown'
+        usage = {'queue_wait': 0.0, 'retries': 0, 'hedges': 0}
+        received = []
+
+        call = _Call(None)
+        try:
+            call.breaker = self._enter_circuit(model_name, agent)
+            self._acquire_slot(timeout, deadline, agent, call.breaker)
+        except Exception as e:
+            usage['queue_wait'] = time.monotonic() - call.started
+            self._record_usage(prompt, None, agent_name, model_name, call.started, usage, e)
+            raise
+        usage['queue_wait'] = time.monotonic() - call.started
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+        outcome = {'error': None}
+
+        def produce():
+            try:
+                for chunk in self._backend_stream(model_name, prompt, generation_config):
+                    if cancelled.is_set():
+                        break
+                    chunks.put(('chunk', chunk))
+                chunks.put(('done', None))
+            except Exception as e:
+                outcome['error'] = e
+                chunks.put(('error', e))
+
+        try:
+            future = self._executor.submit(produce)
+        except Exception:
+            self._release_slot()
+            if call.breaker:
+                call.breaker.abandon()
+            raise
+
+        def on_done(f):
+            self._release_slot(outcome['error'])
+            self._record_once(call, outcome['error'] is None)
+
+        future.add_done_callback(on_done)
+
+        error = None
+        try:
+            while True:
+                try:
+                    kind, value = chunks.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    self._count('timeouts')
+                    self._record_once(call, False)
+                    raise LLMTimeoutError(f'LLM stream exceeded {timeout:.1f}s ({agent_name})')
+                if kind == 'chunk':
+                    received.append(value)
+                    yield value
+                elif kind == 'error':
+                    self._count('errors')
+                    raise value
+                else:
+                    return
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Stop reading from the backend if the consumer goes away early
+            cancelled.set()
+            self._record_usage(prompt, ''.join(received), agent_name, model_name, call.started, usage, error)
+
+    @staticmethod
+    def _record_usage(prompt, response, agent, model_name, started, usage, error=None):
+        """Report one generate()/generate_stream() call, with its retries and hedges, to telemetry"""
+        if isinstance(error, CircuitOpenError):
+            # Never sent to the model
+            input_tokens, output_tokens, estimated = 0, 0, False
+        else:
+            if isinstance(response, str) or response is None:
+                text = response or ''
+            else:
+                try:
+                    text = response.text or ''
+                except (AttributeError, ValueError):
+                    text = ''
+            input_tokens, output_tokens, estimated = token_usage(prompt, text, response)
+        if error is None:
+            outcome = 'success'
+        elif isinstance(error, CircuitOpenError):
+            outcome = 'short_circuited'
+        elif isinstance(error, LLMTimeoutError):
+            outcome = 'timeout'
+        else:
+            outcome = 'error'
+        record_llm_call(agent, model_name, time.monotonic() - started, usage['queue_wait'],
+                        input_tokens, output_tokens, estimated, usage['retries'], usage['hedges'], outcome)
+
+    def _backend_stream(self, model_name, prompt, generation_config):
+        if hasattr(self.backend, 'generate_stream'):
+            yield from self.backend.generate_stream(model_name, prompt, generation_config)
+        else:
+            # Backends without streaming deliver the whole response as one chunk
+            yield self.backend.generate(model_name, prompt, generation_config).text
+
+    def _enter_circuit(self, model_name, agent, count=True):
+        """Breaker for the model, or CircuitOpenError if calls to it are being short-circuited"""
+        breaker = self.breakers.get(model_name)
+        if breaker:
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                if count:
+                    self._count('short_circuited')
+                raise
+        return breaker
+
+    @staticmethod
+    def _record_once(call, succeeded, duration=None):
+        if call.breaker and call.recorded.acquire(blocking=False):
+            call.breaker.record(succeeded, duration if duration is not None else time.monotonic() - call.started)
+
+    def _acquire_slot(self, timeout, deadline, agent, breaker=None, count=True):
+        """
+        Take a process slot, then admission from the shared rate limiter (timeout 0
+        never waits). Waits are bounded by what is left of the call's overall deadline,
+        so a retry cannot queue past the time the caller was promised.
+        """
+        if timeout:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if count:
+                    self._count('timeouts')
+                if breaker:
+                    breaker.abandon()
+                raise LLMTimeoutError(f'LLM call budget of {timeout:.1f}s spent before a slot was free '
+                                      f'({agent or "unknown"})')
+            slot_timeout = min(timeout, remaining)
+        else:
+            slot_timeout = 0
+        if not self._slots.acquire(timeout=slot_timeout):
+            if count:
+                self._count('timeouts')
+            if breaker:
+                breaker.abandon()
+            raise LLMTimeoutError(f'Timed out after {timeout:.1f}s waiting for an LLM slot ({agent or "unknown"})')
+
+        limiter_timeout = max(0.0, deadline - time.monotonic()) if timeout else 0.0
+        if self.limiter and not self.limiter.acquire(limiter_timeout):
+            self._slots.release()
+            if count:
+                self._count('throttled')
+            if breaker:
+                breaker.abandon()
+            raise LLMTimeoutError(f'Timed out after {timeout:.1f}s waiting for LLM rate limit ({agent or "unknown"})')
+
+        self._track_in_flight(1)
+        self._count('calls')
+
+    def _release_slot(self, error=None):
+        self._track_in_flight(-1)
+        self._slots.release()
+        if self.limiter:
+            self.limiter.release(overloaded=is_overload_error(error), succeeded=error is None)
+
+    def _track_in_flight(self, delta):
+        with self._lock:
+            self.counters['in_flight'] += delta
+            self.counters['peak_in_flight'] = max(self.counters['peak_in_flight'], self.counters['in_flight'])
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.counters)
+        stats['max_concurrency'] = self.max_concurrency
+        stats['timeout_seconds'] = self.timeout
+        stats['model'] = self.model_name
+        if self.limiter:
+            stats['rate_limiter'] = self.limiter.stats()
+        stats['circuit_breakers'] = self.breakers.stats()
+        stats['hedge_percentile'] = self.hedge_percentile
+        stats['max_retries'] = self.max_retries
+        stats['agents'] = self.budgets.stats()
+        return stats
+
+    def circuit_state(self) -> str:
+        """'degraded' while any model's circuit is not closed"""
+        states = [breaker['state'] for breaker in self.breakers.stats().values()]
+        return 'ok' if all(state == 'closed' for state in states) else 'degraded'
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+_rate_state_path = None
+
+
+def configure_gateway(rate_state_path: Optional[str] = None):
+    """Settings for the process-wide gateway; call before its first use"""
+    global _rate_state_path
+    with _gateway_lock:
+        if _gateway is not None:
+            raise RuntimeError('The LLM gateway is already in use; configure it before the first call')
+        _rate_state_path = rate_state_path
+
+
+def get_gateway() -> LLMGateway:
+    """Process-wide gateway shared by all agents"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway(limiter=AdaptiveRateLimiter.from_env(state_path=_rate_state_path))
+        return _gateway
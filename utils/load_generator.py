@@ -0,0 +1,219 @@
+"""
+WSGI Load Generator
+Drives a WSGI app in-process with a weighted mix of requests, either at a fixed
+concurrency (closed loop) or at a fixed arrival rate (open loop), and reports
+throughput, latency percentiles, error rates and peak RSS.
+"""
+import os
+import random
+import resource
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from utils.benchmarking import percentile
+
+
+class Scenario:
+    """One kind of request in the mix; send(client, sequence) issues it and returns the response"""
+
+    def __init__(self, name: str, weight: float, send: Callable):
+        self.name = name
+        self.weight = weight
+        self.send = send
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # No procfs (macOS): lifetime peak is the best available figure (bytes there, KiB on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class RSSSampler:
+    """Tracks the peak RSS while a load test runs"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.start_bytes = current_rss_bytes()
+        self.peak_bytes = self.start_bytes
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name='rss-sampler', daemon=True)
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, current_rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, current_rss_bytes())
+
+
+def latency_summary(latencies_ms: List[float]) -> Dict:
+    ordered = sorted(latencies_ms)
+    return {
+        'p50': round(percentile(ordered, 50), 2),
+        'p95': round(percentile(ordered, 95), 2),
+        'p99': round(percentile(ordered, 99), 2),
+        'mean': round(statistics.fmean(ordered), 2) if ordered else 0.0,
+        'max': round(ordered[-1], 2) if ordered else 0.0
+    }
+
+
+class LoadGenerator:
+    """
+    Closed loop (rate=None): `concurrency` workers each send the next request
+    as soon as the previous one returns, which finds the saturation
+    throughput. Open loop (rate=N): requests are scheduled N per second
+    whatever the app's speed and served by up to `concurrency` workers;
+    latency is measured from the scheduled start, so queueing behind a slow
+    app is counted instead of hidden (no coordinated omission).
+
+    The run stops after `duration` seconds or `max_requests` requests,
+    whichever comes first. Each worker uses its own test client. Responses
+    with status >= 400, or that raise, count as errors.
+    """
+
+    def __init__(self, app, scenarios: List[Scenario], concurrency: int = 4, rate: Optional[float] = None,
+                 duration: float = 10.0, max_requests: Optional[int] = None, seed: int = 0):
+        if not scenarios or sum(scenario.weight for scenario in scenarios) <= 0:
+            raise ValueError("At least one scenario with a positive weight is required")
+        self.app = app
+        self.scenarios = [scenario for scenario in scenarios if scenario.weight > 0]
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.max_requests = max_requests
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._issued = 0
+        self._records = []
+        self._clients = threading.local()
+
+    def _next_sequence(self) -> Optional[int]:
+        """Claim the next request number, or None once the request budget is spent"""
+        with self._lock:
+            if self.max_requests is not None and self._issued >= self.max_requests:
+                return None
+            self._issued += 1
+            return self._issued - 1
+
+    def _client(self):
+        client = getattr(self._clients, 'client', None)
+        if client is None:
+            client = self._clients.client = self.app.test_client()
+        return client
+
+    def _pick(self, sequence: int) -> Scenario:
+        rng = random.Random(f'{self.seed}:{sequence}')
+        return rng.choices(self.scenarios, weights=[scenario.weight for scenario in self.scenarios])[0]
+
+    def _send(self, sequence: int, scheduled: Optional[float] = None):
+        scenario = self._pick(sequence)
+        started = time.perf_counter()
+        try:
+            response = scenario.send(self._client(), sequence)
+            # Read and close like a real server, so streamed bodies and on-close hooks run
+            response.get_data()
+            response.close()
+            status = response.status_code
+        except Exception as e:
+            status = f'exception:{type(e).__name__}'
+        finished = time.perf_counter()
+        record = {
+            'scenario': scenario.name,
+            'status': status,
+            'service_ms': (finished - started) * 1000,
+            'latency_ms': (finished - (scheduled if scheduled is not None else started)) * 1000
+        }
+        with self._lock:
+            self._records.append(record)
+
+    def _closed_loop(self, deadline: float):
+        def worker():
+            while time.perf_counter() < deadline:
+                sequence = self._next_sequence()
+                if sequence is None:
+                    return
+                self._send(sequence)
+
+        threads = [threading.Thread(target=worker, name=f'load-{i}') for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _open_loop(self, start: float, deadline: float):
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='load') as pool:
+            while True:
+                scheduled = start + self._issued / self.rate
+                if scheduled >= deadline:
+                    break
+                sequence = self._next_sequence()
+                if sequence is None:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._send, sequence, scheduled)
+
+    def run(self) -> Dict:
+        self._issued = 0
+        self._records = []
+        with RSSSampler() as rss:
+            start = time.perf_counter()
+            deadline = start + self.duration
+            if self.rate:
+                self._open_loop(start, deadline)
+            else:
+                self._closed_loop(deadline)
+            elapsed = max(time.perf_counter() - start, 1e-9)
+        return self._report(elapsed, rss)
+
+    @staticmethod
+    def _is_error(status) -> bool:
+        return not isinstance(status, int) or status >= 400
+
+    def _summarize(self, records: List[Dict], elapsed: float) -> Dict:
+        errors = sum(1 for record in records if self._is_error(record['status']))
+        status_counts = {}
+        for record in records:
+            status_counts[str(record['status'])] = status_counts.get(str(record['status']), 0) + 1
+        return {
+            'requests': len(records),
+            'throughput_rps': round(len(records) / elapsed, 2),
+            'errors': errors,
+            'error_rate': round(errors / len(records), 4) if records else 0.0,
+            'status_counts': status_counts,
+            'latency_ms': latency_summary([record['latency_ms'] for record in records]),
+            'service_time_ms': latency_summary([record['service_ms'] for record in records])
+        }
+
+    def _report(self, elapsed: float, rss: RSSSampler) -> Dict:
+        report = {
+            'mode': 'open' if self.rate else 'closed',
+            'concurrency': self.concurrency,
+            'target_rate_rps': self.rate,
+            'elapsed_s': round(elapsed, 3),
+            'peak_rss_mb': round(rss.peak_bytes / 1024 / 1024, 1),
+            'rss_growth_mb': round((rss.peak_bytes - rss.start_bytes) / 1024 / 1024, 1)
+        }
+        report.update(self._summarize(self._records, elapsed))
+        report['scenarios'] = {
+            scenario.name: self._summarize(
+                [record for record in self._records if record['scenario'] == scenario.name], elapsed
+            )
+            for scenario in self.scenarios
+        }
+        return report
@@ -0,0 +1,388 @@
+"""
+Prometheus Metrics Exporter
+Renders the telemetry registry in the Prometheus text exposition format. Each
+worker process writes its series to its own file in a shared directory, and a
+scrape merges every file so counters and histograms cover all gunicorn workers.
+"""
+import atexit
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.telemetry import MetricsRegistry
+
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows): compaction is only serialized within a process
+    fcntl = None
+
+PREFIX = 'policyhub_'
+
+# Counters and histograms of exited workers, merged into one file
+EXITED_WORKERS_FILE = 'exited_workers.json'
+
+# Directories of other deployments under the same base directory are removed once idle this long
+STALE_DEPLOYMENT_SECONDS = 24 * 3600
+
+DESCRIPTIONS = {
+    'http_request_duration_seconds': 'HTTP request latency by route',
+    'http_requests_total': 'HTTP requests by route, method and status',
+    'agent_duration_seconds': 'Agent wall time by agent and final state',
+    'agent_errors_total': 'Agent runs that failed or timed out',
+    'agent_fallbacks_total': 'Agent results produced by a rule-based fallback',
+    'analysis_duration_seconds': 'End-to-end clause analysis time',
+    'llm_call_duration_seconds': 'LLM call time including retries and hedges',
+    'llm_queue_wait_seconds': 'Time LLM calls waited for a concurrency slot or rate limit',
+    'llm_input_tokens': 'Input tokens per LLM call',
+    'llm_output_tokens': 'Output tokens per LLM call',
+    'llm_retries_total': 'LLM retry attempts',
+    'llm_calls_in_flight': 'LLM requests currently running',
+    'cache_lookups_total': 'Analysis cache lookups by agent and result',
+    'analysis_cache_requests_total': 'Analysis cache reads by level (memory hit, disk hit, miss)',
+    'analysis_cache_hit_ratio': 'Share of analysis cache reads answered from the cache',
+    'job_queue_depth': 'Background jobs by status',
+    'history_store_analyses': 'Analyses recorded in the history store',
+    'history_store_size_bytes': 'On-disk size of the history store',
+    'pdf_pages_processed_total': 'PDF pages extracted',
+    'pdf_extraction_seconds': 'Time spent extracting text from PDFs',
+    'pdf_pages_per_second': 'PDF extraction throughput (pages per second of extraction time)'
+}
+
+Series = List[Tuple[Dict[str, str], float]]
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict, extra: Optional[Dict] = None) -> str:
+    items = sorted(labels.items()) + sorted((extra or {}).items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in items) + '}'
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _key(name: str, labels: Dict) -> Tuple:
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _boot_id() -> str:
+    try:
+        with open('/proc/sys/kernel/random/boot_id') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def _process_start(pid) -> Optional[str]:
+    """Start time of a process in clock ticks since boot (None without /proc); tells a reused pid apart"""
+    try:
+        with open(f'/proc/{int(pid)}/stat') as f:
+            # Fields after the parenthesised command name; starttime is field 22
+            return f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def deployment_id() -> str:
+    """
+    DEPLOY_ID if set, else this boot plus the process group leader (the gunicorn
+    master, or the app itself) and its start time, so workers of one run share
+    an id and a restart or redeploy gets a new one
+    """
+    if os.getenv('DEPLOY_ID'):
+        return os.getenv('DEPLOY_ID')
+    leader = os.getpgrp()
+    return f"{_boot_id()[:8] or 'boot'}-{leader}-{_process_start(leader) or 0}"
+
+
+def deployment_directory(base_directory: str) -> str:
+    """<base_directory>/<deployment id>, removing directories of deployments idle for a day"""
+    os.makedirs(base_directory, exist_ok=True)
+    current = deployment_id()
+    for name in os.listdir(base_directory):
+        path = os.path.join(base_directory, name)
+        with contextlib.suppress(OSError):
+            # Live workers replace their files every few seconds, which touches the directory
+            if name != current and os.path.isdir(path) and time.time() - os.path.getmtime(path) > STALE_DEPLOYMENT_SECONDS:
+                shutil.rmtree(path)
+    return os.path.join(base_directory, current)
+
+
+class MultiprocessExporter:
+    """
+    Flushes this process's registry (plus callback counters and gauges) to
+    <directory>/metrics_<pid>_<id>.json every flush_interval seconds and on
+    each scrape. Counters and histograms of exited workers are kept so totals
+    never go backwards; their gauges are dropped. A scrape folds the files of
+    exited workers into one exited_workers.json and deletes them, so worker
+    restarts don't grow the directory or the scrape cost. Workers are matched
+    by pid and process start time, so a reused pid doesn't keep a file live.
+    The default directory is per deployment (see deployment_directory), so a
+    redeploy starts from zero.
+    """
+
+    def __init__(self, registry: MetricsRegistry, directory: Optional[str] = None,
+                 flush_interval: Optional[float] = None):
+        self.registry = registry
+        self.directory = directory or os.getenv('METRICS_MULTIPROC_DIR') or deployment_directory(
+            os.path.join(tempfile.gettempdir(), 'policyhub_metrics')
+        )
+        self.flush_interval = flush_interval or float(os.getenv('METRICS_FLUSH_SECONDS', 5))
+        self._counter_callbacks = {}
+        self._gauge_callbacks = {}
+        self._host_gauge_callbacks = {}
+        self._pid = None
+        self._started = None
+        self._path = None
+        self._flusher_pid = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def register_counter(self, name: str, callback: Callable[[], Series]):
+        """Per-process counter read at flush time (e.g. counters kept by another component)"""
+        self._counter_callbacks[name] = callback
+
+    def register_gauge(self, name: str, callback: Callable[[], Series]):
+        """Per-process gauge, summed across live workers"""
+        self._gauge_callbacks[name] = callback
+
+    def register_host_gauge(self, name: str, callback: Callable[[], Series]):
+        """Host-wide gauge (e.g. read from a shared store), evaluated once per scrape"""
+        self._host_gauge_callbacks[name] = callback
+
+    def _file_path(self) -> str:
+        # A new process (including a fork of a preloaded app) gets its own file
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._started = _process_start(pid)
+            self._path = os.path.join(self.directory, f'metrics_{pid}_{uuid.uuid4().hex[:8]}.json')
+        return self._path
+
+    def start(self):
+        """Start the background flusher for this process (no-op if already running)"""
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+        # Final values of a worker that exits between flushes
+        atexit.register(self.flush)
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"⚠️ Metrics flush failed: {e}")
+
+    @staticmethod
+    def _evaluate(callbacks: Dict[str, Callable]) -> List[Dict]:
+        series = []
+        for name, callback in callbacks.items():
+            try:
+                for labels, value in callback():
+                    series.append({'name': name, 'labels': labels, 'value': value})
+            except Exception as e:
+                print(f"⚠️ Metric {name} unavailable: {e}")
+        return series
+
+    def flush(self):
+        """Write this process's current values"""
+        snapshot = self.registry.snapshot()
+        state = {
+            'pid': os.getpid(),
+            'written_at': time.time(),
+            'histograms': [
+                dict(series, name=name)
+                for name, all_series in snapshot['histograms'].items() for series in all_series
+            ],
+            'counters': [
+                dict(series, name=name)
+                for name, all_series in snapshot['counters'].items() for series in all_series
+            ] + self._evaluate(self._counter_callbacks),
+            'gauges': self._evaluate(self._gauge_callbacks)
+        }
+        with self._write_lock:
+            path = self._file_path()
+            state['started'] = self._started
+            temp_path = f'{path}.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(temp_path, path)
+
+    @staticmethod
+    def _alive(state: Dict) -> bool:
+        pid = state.get('pid')
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except (PermissionError, TypeError, ValueError):
+            pass
+        # The pid now belongs to a different process
+        started = state.get('started')
+        return started is None or _process_start(pid) in (None, started)
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict]:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # Removed or being replaced while we listed the directory
+            return None
+
+    @contextlib.contextmanager
+    def _directory_lock(self):
+        """Serializes compaction and reads across the processes sharing the directory"""
+        with self._write_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.directory, '.lock'), 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _merge(states: List[Dict]) -> Tuple[Dict, Dict]:
+        """Sum the histograms and counters of several worker states"""
+        histograms, counters = {}, {}
+        for state in states:
+            for series in state.get('histograms', []):
+                key = _key(series['name'], series['labels'])
+                merged = histograms.setdefault(key, {'buckets': {}, 'sum': 0.0, 'count': 0})
+                for bound, count in series['buckets'].items():
+                    merged['buckets'][bound] = merged['buckets'].get(bound, 0) + count
+                merged['sum'] += series['sum']
+                merged['count'] += series['count']
+            for series in state.get('counters', []):
+                key = _key(series['name'], series['labels'])
+                counters[key] = counters.get(key, 0) + series['value']
+        return histograms, counters
+
+    def _load_states(self) -> List[Dict]:
+        """
+        Every live worker's state plus the exited-workers aggregate. Files of
+        exited workers are merged into the aggregate and removed; the aggregate
+        lists the files it has absorbed, so a crash before the removal never
+        counts a file twice.
+        """
+        aggregate_path = os.path.join(self.directory, EXITED_WORKERS_FILE)
+        aggregate = self._read(aggregate_path) or {}
+        present = set(os.listdir(self.directory))
+        merged_files = [name for name in aggregate.get('merged_files', []) if name in present]
+
+        states, exited = [], {}
+        for filename in sorted(present - set(merged_files)):
+            if not (filename.startswith('metrics_') and filename.endswith('.json')):
+                continue
+            state = self._read(os.path.join(self.directory, filename))
+            if state is None:
+                continue
+            if self._alive(state):
+                states.append(state)
+            else:
+                exited[filename] = state
+
+        if exited:
+            histograms, counters = self._merge([aggregate] + list(exited.values()))
+            aggregate = {
+                'written_at': time.time(),
+                'merged_files': merged_files + sorted(exited),
+                'histograms': [dict(value, name=name, labels=dict(labels))
+                               for (name, labels), value in histograms.items()],
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in counters.items()]
+            }
+            temp_path = f'{aggregate_path}.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(aggregate, f)
+            os.replace(temp_path, aggregate_path)
+            for filename in exited:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.directory, filename))
+
+        states.append(aggregate)
+        return states
+
+    def collect(self) -> Dict:
+        """Merge every worker's file: {'histograms': {...}, 'counters': {...}, 'gauges': {...}}"""
+        self.flush()
+        with self._directory_lock():
+            states = self._load_states()
+
+        histograms, counters = self._merge(states)
+        gauges = {}
+        # Only live workers report gauges; the aggregate has none
+        for state in states:
+            for series in state.get('gauges', []):
+                key = _key(series['name'], series['labels'])
+                gauges[key] = gauges.get(key, 0) + series['value']
+
+        for series in self._evaluate(self._host_gauge_callbacks):
+            gauges[_key(series['name'], series['labels'])] = series['value']
+        gauges.update(self._ratios(histograms, counters))
+        return {'histograms': histograms, 'counters': counters, 'gauges': gauges}
+
+    @staticmethod
+    def _ratios(histograms: Dict, counters: Dict) -> Dict:
+        """Gauges derived from the merged totals of all workers"""
+        derived = {}
+        reads = {dict(labels).get('result'): value for (name, labels), value in counters.items()
+                 if name == 'analysis_cache_requests_total'}
+        if sum(reads.values()):
+            hits = reads.get('memory_hit', 0) + reads.get('disk_hit', 0)
+            derived[_key('analysis_cache_hit_ratio', {})] = round(hits / sum(reads.values()), 4)
+
+        pages = sum(value for (name, _), value in counters.items() if name == 'pdf_pages_processed_total')
+        seconds = sum(value['sum'] for (name, _), value in histograms.items() if name == 'pdf_extraction_seconds')
+        if seconds:
+            derived[_key('pdf_pages_per_second', {})] = round(pages / seconds, 3)
+        return derived
+
+    def render(self, collected: Optional[Dict] = None) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        collected = collected or self.collect()
+        lines = []
+        for kind in ('histograms', 'counters', 'gauges'):
+            by_name = {}
+            for (name, labels), value in sorted(collected[kind].items()):
+                by_name.setdefault(name, []).append((dict(labels), value))
+            metric_type = {'histograms': 'histogram', 'counters': 'counter', 'gauges': 'gauge'}[kind]
+            for name, all_series in by_name.items():
+                full_name = PREFIX + name
+                if name in DESCRIPTIONS:
+                    lines.append(f'# HELP {full_name} {DESCRIPTIONS[name]}')
+                lines.append(f'# TYPE {full_name} {metric_type}')
+                for labels, value in all_series:
+                    if kind != 'histograms':
+                        lines.append(f'{full_name}{_format_labels(labels)} {_format_value(value)}')
+                        continue
+                    buckets = sorted(value['buckets'].items(),
+                                     key=lambda item: float('inf') if item[0] == '+Inf' else float(item[0]))
+                    for bound, count in buckets:
+                        lines.append(f'{full_name}_bucket{_format_labels(labels, {"le": bound})} {count}')
+                    lines.append(f'{full_name}_sum{_format_labels(labels)} {_format_value(float(value["sum"]))}')
+                    lines.append(f'{full_name}_count{_format_labels(labels)} {value["count"]}')
+        return '\n'.join(lines) + '\n'
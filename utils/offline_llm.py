@@ -0,0 +1,263 @@
+"""
+Offline LLM Backend
+Deterministic local stand-in for the Gemini backend. Answers every agent prompt
+with a templated response that follows the JSON schema the prompt asks for, with
+configurable latency and injected errors, so performance work can be measured
+and repeated without a network or an API key.
+"""
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+ERROR_KINDS = ('unavailable', 'quota', 'malformed', 'hang')
+
+# Marker lines after which prompts show the JSON shape they expect
+JSON_MARKERS = ('JSON format:', 'Format as JSON:', 'JSON object with exactly these keys:')
+
+CHARS_PER_TOKEN = 4
+
+
+class ServiceUnavailable(Exception):
+    """Injected 503; named like the Google API error so retry logic treats it the same"""
+    code = 503
+
+
+class ResourceExhausted(Exception):
+    """Injected 429 quota error"""
+    code = 429
+
+
+class OfflineResponse:
+    """Mimics the parts of a Gemini response the agents and gateway read"""
+
+    def __init__(self, text: str, prompt: str):
+        self.text = text
+        self.usage_metadata = type('UsageMetadata', (), {
+            'prompt_token_count': math.ceil(len(prompt) / CHARS_PER_TOKEN),
+            'candidates_token_count': math.ceil(len(text) / CHARS_PER_TOKEN)
+        })()
+
+
+def _first_sentence_words(text: str, limit: int) -> str:
+    words = re.sub(r'\s+', ' ', text).strip().split(' ')
+    return ' '.join(words[:limit]).rstrip('.,;:') + '.'
+
+
+class OfflineBackend:
+    """
+    Same interface as GeminiBackend. Responses and latencies depend only on the
+    prompt, the seed and how many times that prompt has been sent, so a run is
+    reproducible whatever the thread interleaving.
+
+    Latency is drawn per call: 'fixed' (always latency_ms), 'uniform' (between
+    latency_ms +/- jitter_ms) or 'lognormal' (median latency_ms, shape sigma),
+    plus ms_per_output_token for each generated token. error_rate of the calls
+    fail with one of error_kinds: 'unavailable' (503), 'quota' (429),
+    'malformed' (text that is not the requested JSON) or 'hang' (no answer
+    for hang_seconds, to exercise timeouts).
+    """
+
+    def __init__(self, latency_ms: float = 0, distribution: str = 'fixed', jitter_ms: float = 0,
+                 sigma: float = 0.5, ms_per_output_token: float = 0, error_rate: float = 0,
+                 error_kinds: Optional[List[str]] = None, hang_seconds: float = 60, seed: int = 0):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        error_kinds = list(error_kinds or ['unavailable'])
+        unknown = set(error_kinds) - set(ERROR_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown error kinds: {', '.join(sorted(unknown))}")
+
+        self.latency_ms = latency_ms
+        self.distribution = distribution
+        self.jitter_ms = jitter_ms
+        self.sigma = sigma
+        self.ms_per_output_token = ms_per_output_token
+        self.error_rate = error_rate
+        self.error_kinds = error_kinds
+        self.hang_seconds = hang_seconds
+        self.seed = seed
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self.counters = {'calls': 0, 'errors': 0}
+
+    @classmethod
+    def from_env(cls) -> 'OfflineBackend':
+        kinds = os.getenv('OFFLINE_LLM_ERROR_KINDS', 'unavailable')
+        return cls(
+            latency_ms=float(os.getenv('OFFLINE_LLM_LATENCY_MS', 0)),
+            distribution=os.getenv('OFFLINE_LLM_LATENCY_DISTRIBUTION', 'fixed'),
+            jitter_ms=float(os.getenv('OFFLINE_LLM_JITTER_MS', 0)),
+            sigma=float(os.getenv('OFFLINE_LLM_LATENCY_SIGMA', 0.5)),
+            ms_per_output_token=float(os.getenv('OFFLINE_LLM_MS_PER_OUTPUT_TOKEN', 0)),
+            error_rate=float(os.getenv('OFFLINE_LLM_ERROR_RATE', 0)),
+            error_kinds=[kind.strip() for kind in kinds.split(',') if kind.strip()],
+            hang_seconds=float(os.getenv('OFFLINE_LLM_HANG_SECONDS', 60)),
+            seed=int(os.getenv('OFFLINE_LLM_SEED', 0))
+        )
+
+    def _rng(self, prompt: str) -> random.Random:
+        """Random source for this attempt at this prompt"""
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        with self._lock:
+            attempt = self._attempts.get(digest, 0)
+            self._attempts[digest] = attempt + 1
+            self.counters['calls'] += 1
+        return random.Random(f'{self.seed}:{digest}:{attempt}')
+
+    def _latency(self, rng: random.Random, output_tokens: int) -> float:
+        if self.distribution == 'uniform':
+            latency_ms = rng.uniform(self.latency_ms - self.jitter_ms, self.latency_ms + self.jitter_ms)
+        elif self.distribution == 'lognormal' and self.latency_ms > 0:
+            latency_ms = rng.lognormvariate(math.log(self.latency_ms), self.sigma)
+        else:
+            latency_ms = self.latency_ms
+        return max(0.0, latency_ms + self.ms_per_output_token * output_tokens) / 1000
+
+    def _respond(self, prompt: str, generation_config: Optional[Dict]):
+        """(text, latency seconds) for one attempt, or raise the injected error"""
+        rng = self._rng(prompt)
+        error = rng.choice(self.error_kinds) if self.error_rate and rng.random() < self.error_rate else None
+        text = render_response(prompt, generation_config, seed=self.seed)
+        if error == 'malformed':
+            text = text[:max(1, len(text) // 2)]
+        latency = self._latency(rng, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+        if error in ('unavailable', 'quota', 'hang'):
+            with self._lock:
+                self.counters['errors'] += 1
+            time.sleep(self.hang_seconds if error == 'hang' else latency)
+            if error == 'quota':
+                raise ResourceExhausted('429 Offline LLM quota exceeded (injected)')
+            raise ServiceUnavailable('503 Offline LLM unavailable (injected)')
+        return text, latency
+
+    def generate(self, model_name: str, prompt: str, generation_config: Optional[Dict] = None) -> OfflineResponse:
+        text, latency = self._respond(prompt, generation_config)
+        time.sleep(latency)
+        return OfflineResponse(text, prompt)
+
+    def generate_stream(self, model_name: str, prompt: str, generation_config: Optional[Dict] = None) -> Iterator[str]:
+        text, latency = self._respond(prompt, generation_config)
+        # Spread the latency over word-sized chunks
+        chunks = re.findall(r'\S+\s*', text) or [text]
+        for chunk in chunks:
+            time.sleep(latency / len(chunks))
+            yield chunk
+
+
+def _clause(prompt: str) -> str:
+    """The clause a single-clause prompt is about"""
+    match = re.search(r'(?:Original clause|Clause|English text):\s*(.+)', prompt)
+    return match.group(1).strip() if match else 'this policy clause'
+
+
+def _pick(options: List[str], *keys) -> str:
+    digest = hashlib.sha256('\x00'.join(str(key) for key in keys).encode('utf-8')).digest()
+    return options[digest[0] % len(options)]
+
+
+def _count(description: str, default: int) -> int:
+    """Leading number of a description, e.g. 5 for '5 clear, actionable points'"""
+    match = re.match(r'\s*(\d+)\b', description)
+    return int(match.group(1)) if match else default
+
+
+def _fill(template, key: str, clause: str, seed: int, prompt: str):
+    """A value with the same shape as the schema example, worded from the clause"""
+    if isinstance(template, dict):
+        return {name: _fill(value, name, clause, seed, prompt) for name, value in template.items()}
+    if isinstance(template, list):
+        if not template:
+            return []
+        if isinstance(template[0], dict):
+            count = _count(' '.join(re.findall(r'(\d+) (?:quiz )?questions', prompt)), 1)
+            return [_fill(template[0], key, f'{clause} #{i + 1}', seed, prompt) for i in range(count)]
+        if key == 'options':
+            return [f'{letter}) {_pick(["Yes", "No", "Only with approval", "Depends on the policy"], clause, letter)}'
+                    for letter in 'ABCD']
+        count = _count(str(template[0]), max(2, len(template)))
+        return [_fill(template[0], key, f'{clause} #{i + 1}', seed, prompt) for i in range(count)]
+    if not isinstance(template, str):
+        return template
+
+    # Enumerations such as "Low/Medium/High" get one of their options
+    if re.fullmatch(r'[A-Za-z ]+(?:/[A-Za-z ]+)+', template):
+        return _pick(template.split('/'), seed, key, clause)
+    if key == 'correct_answer':
+        return _pick(list('ABCD'), seed, clause)
+    summary = _first_sentence_words(clause, 12)
+    return f"{key.replace('_', ' ').capitalize()}: {summary}"
+
+
+def _json_example(prompt: str):
+    """The JSON shape a prompt asks for, or None"""
+    for marker in JSON_MARKERS:
+        start = prompt.find(marker)
+        if start < 0:
+            continue
+        body = prompt[start + len(marker):]
+        opening = min((i for i in (body.find('{'), body.find('[')) if i >= 0), default=-1)
+        if opening < 0:
+            continue
+        try:
+            return json.JSONDecoder().raw_decode(body[opening:])[0]
+        except ValueError:
+            continue
+    return None
+
+
+def render_response(prompt: str, generation_config: Optional[Dict] = None, seed: int = 0) -> str:
+    """Deterministic answer to one agent prompt"""
+    max_chars = (generation_config or {}).get('max_output_tokens', 1024) * CHARS_PER_TOKEN
+
+    # Packed prompts: one item per numbered clause, in the advertised item shape
+    packed = re.search(r'following (\d+) clauses independently', prompt)
+    if packed:
+        clauses = dict(re.findall(r'^\s*\[(\d+)\] (.+)$', prompt, re.MULTILINE))
+        example = re.search(r'where "slot" is the clause number:\s*\[(\{.*\}), \.\.\.\]', prompt)
+        schema = json.loads(example.group(1)) if example else {'slot': 1}
+        schema.pop('slot', None)
+        items = []
+        for slot in range(1, int(packed.group(1)) + 1):
+            clause = clauses.get(str(slot), f'clause {slot}')
+            if 'plain_english' in schema:
+                item = {'plain_english': f'In simple words: {_first_sentence_words(clause, 18)}'}
+            else:
+                item = _fill(schema, 'item', clause, seed, prompt)
+            items.append(dict({'slot': slot}, **item))
+        return json.dumps(items)
+
+    # Batched translation: one key per listed language
+    languages = re.findall(r'^\s*- "(\w+)": (.+)$', prompt, re.MULTILINE)
+    if languages and 'JSON object' in prompt:
+        text = _clause(prompt)
+        return json.dumps({code: f'[{name.strip()}] {text}' for code, name in languages}, ensure_ascii=False)
+
+    example = _json_example(prompt)
+    if example is not None:
+        return json.dumps(_fill(example, 'response', _clause(prompt), seed, prompt), ensure_ascii=False)
+
+    clause = _clause(prompt)
+    if 'plain English' in prompt:
+        text = f'In simple words: {_first_sentence_words(clause, 18)}'
+    elif '"Example: If' in prompt:
+        text = f'Example: If you make a claim, {_first_sentence_words(clause, 30)}'
+    elif 'translation:' in prompt:
+        language = re.search(r'into (.+?) for rural customers', prompt)
+        text = f"[{language.group(1) if language else 'Translation'}] {clause}"
+    elif 'Format as a simple list' in prompt or re.search(r'\b\d+\. \[', prompt):
+        requested = re.search(r'\b(\d+) ', prompt.split('Clause:')[0])
+        count = int(requested.group(1)) if requested else 3
+        text = '\n'.join(
+            f'{i}. Point {i} for agents: {_first_sentence_words(clause, 10)}' for i in range(1, count + 1)
+        )
+    else:
+        text = f'{_first_sentence_words(clause, 40)} This is explained in plain terms for customers.'
+    return text[:max_chars]
@@ -0,0 +1,153 @@
+"""
+Concurrent Agent Orchestration Engine
+Fans independent agents out over a shared thread pool with per-agent deadlines
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils import telemetry
+
+
+class AgentTask:
+    """A single unit of agent work scheduled by the orchestrator"""
+
+    def __init__(self, name: str, func: Callable, fallback: Callable, deadline: Optional[float] = None):
+        self.name = name
+        self.func = func
+        self.fallback = fallback
+        self.deadline = deadline
+
+
+class AgentOrchestrator:
+    """
+    Runs agent tasks concurrently so end-to-end latency tracks the slowest
+    agent instead of the sum of all of them. Agents that miss their deadline
+    (or raise) are answered with their deterministic fallback output.
+    
+    A deadline runs from when the task starts on a pool thread, so time spent
+    queued behind other requests is not charged to it; a task that cannot
+    start within its deadline is answered with its fallback as well.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, default_deadline: Optional[float] = None):
+        self.max_workers = max_workers or int(os.getenv('ORCHESTRATOR_MAX_WORKERS', 32))
+        self.default_deadline = default_deadline or float(os.getenv('AGENT_DEADLINE_SECONDS', 45))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='agent')
+
+    def get_deadline(self, task: AgentTask) -> float:
+        """Resolve a task deadline: env override, then task value, then default"""
+        override = os.getenv(f'AGENT_DEADLINE_{task.name.upper()}')
+        if override:
+            return float(override)
+        return task.deadline or self.default_deadline
+
+    def run(self, tasks: List[AgentTask], clause_text: str) -> Dict:
+        """
+        Run all tasks against the clause concurrently.
+        Returns {'results': {name: output}, 'status': {name: {...}}}
+        """
+        started = time.monotonic()
+        results = {}
+        status = {}
+        for name, output, task_status in self.run_iter(tasks, clause_text):
+            results[name] = output
+            status[name] = task_status
+
+        return {
+            'results': {task.name: results[task.name] for task in tasks},
+            'status': status,
+            'wall_time_ms': round((time.monotonic() - started) * 1000, 2)
+        }
+
+    def run_batch(self, tasks: List[AgentTask], clause_texts: List[str], max_concurrency: int = 8) -> List[Dict]:
+        """
+        Run the same tasks over many clauses, at most max_concurrency clauses at a
+        time so one batch cannot flood the shared pool. Outcomes are in input order.
+        """
+        if not clause_texts:
+            return []
+        # Keep the batch's in-flight tasks within the shared pool
+        max_concurrency = min(max_concurrency, self.max_workers // max(1, len(tasks)))
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(clause_texts))),
+                                thread_name_prefix='batch') as batch_pool:
+            futures = [batch_pool.submit(telemetry.bind_context(self.run), tasks, text) for text in clause_texts]
+            return [future.result() for future in futures]
+
+    def run_iter(self, tasks: List[AgentTask], clause_text: str) -> Iterator[Tuple[str, Dict, Dict]]:
+        """
+        Run all tasks concurrently and yield (name, output, status) as each one
+        completes, times out or fails, so callers can stream partial results
+        """
+        started = time.monotonic()
+        # Set by each task when it starts running; deadlines count from there
+        task_starts = {}
+        
+        def expires_at(task):
+            began = task_starts.get(task.name)
+            return (began if began is not None else started) + self.get_deadline(task)
+        
+        # Each task runs in a copy of the caller's context so its LLM calls count towards this request
+        pending = {
+            self.executor.submit(telemetry.bind_context(self._timed_call), task, clause_text, task_starts): task
+            for task in tasks
+        }
+
+        while pending:
+            # Answer tasks past their deadline with fallbacks. A running worker thread cannot
+            # be interrupted; it finishes in the background and its late result is discarded.
+            now = time.monotonic()
+            for future, task in list(pending.items()):
+                deadline = self.get_deadline(task)
+                if future.done() or now < expires_at(task):
+                    continue
+                if task.name not in task_starts:
+                    if not future.cancel():
+                        # It got a thread just now; its deadline runs from that start
+                        continue
+                    # Still queued behind other work: it never got a thread within its deadline
+                    error_msg = f'Agent could not start within its {deadline:.1f}s deadline'
+                else:
+                    error_msg = f'Agent exceeded {deadline:.1f}s deadline'
+                del pending[future]
+                output = task.fallback(clause_text, error_msg)
+                # Batch tasks answer with one fallback per clause
+                for item in (output if isinstance(output, list) else [output]):
+                    item['timed_out'] = True
+                telemetry.record_agent_run(task.name, 'timed_out', deadline, output)
+                yield task.name, output, {'state': 'timed_out', 'duration_ms': round(deadline * 1000, 2)}
+            if not pending:
+                break
+
+            next_deadline = min(expires_at(task) for task in pending.values())
+            done, _ = wait(pending, timeout=max(0.0, next_deadline - time.monotonic()),
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                task = pending.pop(future)
+                try:
+                    output, elapsed = future.result()
+                    telemetry.record_agent_run(task.name, 'completed', elapsed, output)
+                    yield task.name, output, {'state': 'completed', 'duration_ms': round(elapsed * 1000, 2)}
+                except Exception as e:
+                    output = task.fallback(clause_text, str(e))
+                    elapsed = time.monotonic() - started
+                    telemetry.record_agent_run(task.name, 'failed', elapsed, output)
+                    yield task.name, output, {
+                        'state': 'failed',
+                        'duration_ms': round(elapsed * 1000, 2),
+                        'error': str(e)
+                    }
+
+    @staticmethod
+    def _timed_call(task, clause_text, task_starts=None):
+        start = time.monotonic()
+        if task_starts is not None:
+            task_starts[task.name] = start
+        with telemetry.agent_scope(task.name):
+            output = task.func(clause_text)
+        return output, time.monotonic() - start
+
+
+# Shared process-wide orchestrator
+orchestrator = AgentOrchestrator()
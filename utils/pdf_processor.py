@@ -3,7 +3,11 @@ import re
 import os
 from typing import List, Dict
 import hashlib
+import time
+from bisect import bisect_right
 from datetime import datetime
+from utils.phrase_matcher import phrase_matcher
+from utils.telemetry import metrics
 
 class PDFProcessor:
     """
@@ -49,11 +53,15 @@ class PDFProcessor:
                 
                 # Extract all text with page tracking
                 full_text = ""
+                extraction_start = time.monotonic()
                 
                 for page_num, page in enumerate(pdf_reader.pages):
                     page_text = page.extract_text()
                     full_text += f"\n[PAGE_{page_num+1}]\n" + page_text
                 
+                metrics.observe('pdf_extraction_seconds', time.monotonic() - extraction_start)
+                metrics.increment('pdf_pages_processed_total', len(pdf_reader.pages))
+                
                 print(f"📊 Extracted {len(full_text)} characters from {len(pdf_reader.pages)} pages")
                 
                 # Advanced clause detection with ML scoring
@@ -130,27 +138,29 @@ class PDFProcessor:
             'semantic_hash': hashlib.md5(clause_text.encode()).hexdigest()[:8]
         }
     
+    def _count_words_with_terms(self, text: str, category: str) -> int:
+        """Count words containing at least one term of a rule-pack category (single pass)"""
+        spans = [(m.start(), m.end()) for m in re.finditer(r'\S+', text)]
+        starts = [start for start, _ in spans]
+        
+        matched_words = set()
+        for match in phrase_matcher.scan(text, [category]):
+            index = bisect_right(starts, match.start) - 1
+            if index >= 0 and match.end <= spans[index][1]:
+                matched_words.add(index)
+        
+        return len(matched_words)
+    
     def _calculate_legal_density(self, text: str) -> float:
         """Calculate density of legal terminology"""
-        legal_terms = [
-            'shall', 'pursuant', 'notwithstanding', 'heretofore', 'whereas',
-            'liable', 'obligation', 'covenant', 'indemnify', 'warranty'
-        ]
-        
-        words = text.lower().split()
-        legal_count = sum(1 for word in words if any(term in word for term in legal_terms))
+        words = text.split()
+        legal_count = self._count_words_with_terms(text, 'legal_terms')
         
         return legal_count / len(words) if words else 0
     
     def _calculate_insurance_relevance(self, text: str) -> float:
         """Calculate relevance to insurance domain"""
-        insurance_terms = [
-            'coverage', 'premium', 'deductible', 'claim', 'policy',
-            'insured', 'insurer', 'benefit', 'exclusion', 'limit'
-        ]
-        
-        words = text.lower().split()
-        insurance_count = sum(1 for word in words if any(term in word for term in insurance_terms))
+        insurance_count = self._count_words_with_terms(text, 'insurance_terms')
         
         return min(1.0, insurance_count / 10)  # Normalize to 0-1
     
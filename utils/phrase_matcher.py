@@ -0,0 +1,150 @@
+"""
+Multi-Pattern Phrase Engine
+Aho-Corasick automaton shared by the rule-based detectors: every rule pack is
+compiled once and a clause is scanned in a single linear pass
+"""
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+
+# Rule packs used across agents and utilities, keyed by category
+RULE_PACKS = {
+    # ComplianceCheckerAgent: vague phrases that need specific terms or timelines
+    'vague_language': [
+        "notwithstanding", "reasonable effort", "as appropriate",
+        "from time to time", "subject to", "at our discretion"
+    ],
+    # ComplianceCheckerAgent fallback: legal jargon
+    'legal_jargon': ['notwithstanding', 'heretofore', 'wherefore', 'pursuant to'],
+    # RiskScorerAgent: phrases that widen the insurer's exposure
+    'high_risk': [
+        "unlimited coverage", "all risks", "any loss", "regardless of cause",
+        "without limitation", "maximum coverage", "full replacement"
+    ],
+    # RiskScorerAgent fallback: vague terms requiring clarification
+    'vague_terms': ['discretion', 'appropriate', 'reasonable', 'from time to time', 'subject to'],
+    # RegulatoryFramework: terms prohibited by IRDAI guidelines
+    'prohibited_terms': [
+        'unlimited liability', 'discretionary coverage',
+        'subject to interpretation', 'as deemed fit'
+    ],
+    # PDFProcessor: legal terminology density
+    'legal_terms': [
+        'shall', 'pursuant', 'notwithstanding', 'heretofore', 'whereas',
+        'liable', 'obligation', 'covenant', 'indemnify', 'warranty'
+    ],
+    # PDFProcessor: insurance domain relevance
+    'insurance_terms': [
+        'coverage', 'premium', 'deductible', 'claim', 'policy',
+        'insured', 'insurer', 'benefit', 'exclusion', 'limit'
+    ],
+    # TrainingGeneratorAgent: terms that raise training difficulty
+    'complex_legal_terms': ['notwithstanding', 'pursuant', 'heretofore', 'whereas', 'subrogation']
+}
+
+
+class PhraseMatch(NamedTuple):
+    start: int
+    end: int
+    phrase: str
+    category: str
+
+
+class PhraseMatcher:
+    """
+    Case-insensitive Aho-Corasick automaton over (phrase, category) pairs.
+    Matching is by substring, like the `phrase in text.lower()` checks it replaces.
+    """
+
+    def __init__(self, rule_packs: Optional[Dict[str, Iterable[str]]] = None):
+        self._patterns = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._built = False
+        for category, phrases in (rule_packs or {}).items():
+            for phrase in phrases:
+                self.add(phrase, category)
+        self.build()
+
+    def add(self, phrase: str, category: str):
+        """Add a phrase; call build() before scanning again"""
+        phrase = phrase.lower()
+        if not phrase:
+            return
+        pattern_id = len(self._patterns)
+        self._patterns.append((phrase, category))
+
+        node = 0
+        for char in phrase:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[node][char] = next_node
+            node = next_node
+        self._output[node].append(pattern_id)
+        self._built = False
+
+    def build(self):
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+        self._built = True
+
+    def scan(self, text: str, categories: Optional[Iterable[str]] = None) -> List[PhraseMatch]:
+        """Return every match in order of end offset, optionally limited to some categories"""
+        if not self._built:
+            self.build()
+        wanted = set(categories) if categories is not None else None
+
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters expand when lowercased; map one-to-one to keep offsets valid
+            lowered = ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+        goto, fail, output, patterns = self._goto, self._fail, self._output, self._patterns
+        matches = []
+        node = 0
+        for index, char in enumerate(lowered):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for pattern_id in output[node]:
+                phrase, category = patterns[pattern_id]
+                if wanted is None or category in wanted:
+                    matches.append(PhraseMatch(index - len(phrase) + 1, index + 1, phrase, category))
+        return matches
+
+    def find(self, text: str, category: str) -> List[str]:
+        """Distinct phrases of one category present in the text, in order of first occurrence"""
+        found = []
+        for match in self.scan(text, [category]):
+            if match.phrase not in found:
+                found.append(match.phrase)
+        return found
+
+    def group(self, text: str) -> Dict[str, List[PhraseMatch]]:
+        """All matches grouped by category"""
+        grouped = {}
+        for match in self.scan(text):
+            grouped.setdefault(match.category, []).append(match)
+        return grouped
+
+
+# Compiled once per process and shared by all detectors
+phrase_matcher = PhraseMatcher(RULE_PACKS)
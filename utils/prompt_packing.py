@@ -0,0 +1,144 @@
+"""
+Multi-Clause Prompt Packing
+Sends several clauses in one prompt with numbered slots and parses a JSON array
+back, so batch callers make one model round-trip per pack instead of per clause
+"""
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from utils.telemetry import bind_context
+
+# Clauses per packed prompt, and the time budget for a packed batch: the packed calls plus
+# the single-clause retries of slots they missed (the answer is pack-sized, so it takes a while)
+PACK_SIZE = int(os.getenv('PROMPT_PACK_SIZE', 10))
+PACKED_TIMEOUT_SECONDS = float(os.getenv('PACKED_LLM_TIMEOUT_SECONDS', 90))
+
+
+def pack_prompt(instructions: str, clauses: List[str], item_schema: Dict) -> str:
+    """Prompt asking for one JSON object per numbered clause"""
+    slots = '\n\n'.join(f"[{i}] {clause}" for i, clause in enumerate(clauses, 1))
+    example = json.dumps(dict({'slot': 1}, **item_schema))
+    return f"""
+        {instructions}
+
+        Handle each of the following {len(clauses)} clauses independently. Each clause starts with its number in square brackets.
+
+        {slots}
+
+        Respond with only a JSON array containing exactly one object per clause, in order, where "slot" is the clause number:
+        [{example}, ...]
+        """
+
+
+def parse_packed_response(text: str, count: int, validate: Callable[[Dict], bool]) -> List[Optional[Dict]]:
+    """Items by slot; slots that are missing, repeated or fail validation are None"""
+    items = [None] * count
+    text = (text or '').strip()
+    # Remove any markdown formatting
+    text = re.sub(r'^```(?:json)?|```$', '', text).strip()
+
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        # Tolerate prose around the array
+        start, end = text.find('['), text.rfind(']')
+        try:
+            parsed = json.loads(text[start:end + 1]) if 0 <= start < end else None
+        except ValueError:
+            parsed = None
+    if not isinstance(parsed, list):
+        return items
+
+    seen = set()
+    for position, item in enumerate(parsed):
+        if not isinstance(item, dict):
+            continue
+        slot = item.get('slot', position + 1)
+        if not isinstance(slot, int) or not 1 <= slot <= count or slot in seen:
+            continue
+        seen.add(slot)
+        try:
+            valid = validate(item)
+        except Exception:
+            valid = False
+        if valid:
+            items[slot - 1] = item
+    return items
+
+
+def generate_packed(llm, agent: str, instructions: str, clauses: List[str], item_schema: Dict,
+                    validate: Callable[[Dict], bool], max_output_tokens_per_item: int,
+                    temperature: float, pack_size: Optional[int] = None,
+                    single: Optional[Callable[[str, float], Optional[Dict]]] = None) -> List[Optional[Dict]]:
+    """
+    Run clauses through packed prompts (packs are sent concurrently). Slots the
+    packed answers miss are re-run one clause at a time through `single(clause,
+    timeout)`, concurrently and within the same PACKED_TIMEOUT_SECONDS budget.
+    Returns one parsed item per clause, or None where no usable answer arrived
+    so the caller can fall back for that clause.
+    """
+    pack_size = max(1, pack_size or PACK_SIZE)
+    deadline = time.monotonic() + PACKED_TIMEOUT_SECONDS
+
+    items = _run_packs(llm, agent, instructions, clauses, item_schema, validate,
+                       max_output_tokens_per_item, temperature, pack_size, deadline)
+    missed = [i for i, item in enumerate(items) if item is None]
+    if single and missed and deadline - time.monotonic() > 1:
+        retried = _run_singles(agent, [clauses[i] for i in missed], single, pack_size, deadline)
+        for i, item in zip(missed, retried):
+            items[i] = item
+    return items
+
+
+def _run_singles(agent, clauses, single, max_workers, deadline) -> List[Optional[Dict]]:
+    """Single-clause calls for missed slots, each bounded by what is left of the deadline"""
+    def run_single(clause):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        try:
+            return single(clause, remaining)
+        except Exception as e:
+            print(f"⚠️ Single-clause {agent} retry failed: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(len(clauses), max_workers), thread_name_prefix='pack-retry') as pool:
+        futures = [pool.submit(bind_context(run_single), clause) for clause in clauses]
+        return [future.result() for future in futures]
+
+
+def _run_packs(llm, agent, instructions, clauses, item_schema, validate, max_output_tokens_per_item,
+               temperature, pack_size, deadline) -> List[Optional[Dict]]:
+    """One packed call per pack_size clauses, all bounded by the shared deadline"""
+    packs = [clauses[i:i + pack_size] for i in range(0, len(clauses), pack_size)]
+
+    def run_pack(pack):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return [None] * len(pack)
+        try:
+            response = llm.generate(
+                pack_prompt(instructions, pack, item_schema),
+                agent=agent,
+                generation_config={
+                    'max_output_tokens': max_output_tokens_per_item * len(pack),
+                    'temperature': temperature
+                },
+                timeout=remaining
+            )
+            return parse_packed_response(response.text, len(pack), validate)
+        except Exception as e:
+            print(f"⚠️ Packed {agent} request for {len(pack)} clauses failed: {e}")
+            return [None] * len(pack)
+
+    if len(packs) <= 1:
+        results = [run_pack(pack) for pack in packs]
+    else:
+        with ThreadPoolExecutor(max_workers=len(packs), thread_name_prefix='pack') as pool:
+            futures = [pool.submit(bind_context(run_pack), pack) for pack in packs]
+            results = [future.result() for future in futures]
+    return [item for pack in results for item in pack]
@@ -0,0 +1,344 @@
+"""
+Adaptive LLM Rate Limiter
+Token bucket for the request rate plus an AIMD concurrency limit. State lives in a
+small lock-protected file so every worker process of a deployment shares one quota;
+each process reserves slots and tokens from it and admits calls from that
+reservation in memory, going back to the file only to grow it, every sync
+interval, or on every release while another process is waiting.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows): limits are enforced per process only
+    fcntl = None
+
+# Exception class names that mean the provider is over quota or overloaded
+OVERLOAD_ERROR_NAMES = {'ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable'}
+
+
+def is_overload_error(error: Optional[BaseException]) -> bool:
+    """Quota, rate-limit, unavailable and timeout errors are congestion signals"""
+    if error is None:
+        return False
+    if isinstance(error, TimeoutError) or type(error).__name__ in OVERLOAD_ERROR_NAMES:
+        return True
+    if getattr(error, 'code', None) in (429, 503):
+        return True
+    message = str(error).lower()
+    return '429' in message or 'quota' in message or 'rate limit' in message
+
+
+class AdaptiveRateLimiter:
+    """
+    Admits a call when a rate token is available and the host-wide number of
+    in-flight calls is under the adaptive limit. The limit grows by about one
+    per window of successful calls and is cut by decrease_factor on a quota or
+    timeout error (at most once per cooldown), so throughput settles just under
+    the provider's quota instead of oscillating between overload and idle.
+
+    Slots a process holds but isn't using stay reserved while nobody else needs
+    them; they are handed back as soon as another process is seen waiting, and a
+    process that hasn't synced for two intervals can have its idle slots reclaimed.
+    """
+
+    def __init__(self, rate_per_minute: float = 0, burst: Optional[float] = None,
+                 initial_concurrency: int = 16, min_concurrency: int = 1, max_concurrency: int = 64,
+                 decrease_factor: float = 0.5, cooldown_seconds: float = 2.0,
+                 state_path: Optional[str] = None, poll_interval: float = 0.05,
+                 sync_interval: float = 0.5, token_batch: Optional[int] = None):
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst or max(1.0, rate_per_minute / 60)
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.decrease_factor = decrease_factor
+        self.cooldown_seconds = cooldown_seconds
+        self.state_path = state_path if fcntl is not None else None
+        self.poll_interval = poll_interval
+        self.sync_interval = sync_interval
+        self.token_batch = token_batch or max(1, int(self.burst) // 4)
+
+        self._local_state = None
+        self._local_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._reset_reservation()
+        self._wakeup = threading.Condition()
+        self._counters_lock = threading.Lock()
+        self.counters = {'admitted': 0, 'throttled': 0, 'overloads': 0, 'decreases': 0, 'syncs': 0}
+
+    @property
+    def pid(self) -> str:
+        # Looked up on use: workers forked from a preloaded app each count separately
+        return str(os.getpid())
+
+    @classmethod
+    def from_env(cls, state_path: Optional[str] = None) -> Optional['AdaptiveRateLimiter']:
+        """
+        Limiter configured from LLM_RATE_* / LLM_ADAPTIVE_* variables; None when
+        disabled. LLM_RATE_STATE_PATH overrides state_path; with neither, limits
+        are enforced per process.
+        """
+        if os.getenv('LLM_ADAPTIVE_LIMITS', 'true').lower() != 'true':
+            return None
+        burst = os.getenv('LLM_RATE_LIMIT_BURST')
+        return cls(
+            rate_per_minute=float(os.getenv('LLM_RATE_LIMIT_RPM', 0)),
+            burst=float(burst) if burst else None,
+            initial_concurrency=int(os.getenv('LLM_ADAPTIVE_CONCURRENCY_INITIAL', 16)),
+            min_concurrency=int(os.getenv('LLM_ADAPTIVE_CONCURRENCY_MIN', 1)),
+            max_concurrency=int(os.getenv('LLM_ADAPTIVE_CONCURRENCY_MAX', 64)),
+            state_path=os.getenv('LLM_RATE_STATE_PATH') or state_path,
+            sync_interval=float(os.getenv('LLM_RATE_SYNC_SECONDS', 0.5))
+        )
+
+    def _initial_state(self) -> Dict:
+        return {
+            'tokens': float(self.burst),
+            'refilled_at': time.time(),
+            'limit': float(self.initial_concurrency),
+            'decreased_at': 0.0,
+            'in_flight': {},
+            'waiting': {}
+        }
+
+    def _reset_reservation(self):
+        self._owner = self.pid
+        self._held = 0
+        self._active = 0
+        self._tokens = 0
+        self._successes = 0
+        self._contended = False
+        self._synced_at = float('-inf')
+        self._flush_timer = None
+        # Shared state as of the last sync, for stats() without touching the file
+        self._snapshot = {'limit': float(self.initial_concurrency), 'tokens': float(self.burst), 'others_in_flight': 0}
+
+    @contextmanager
+    def _shared_state(self):
+        """Read-modify-write of the limiter state under an exclusive lock"""
+        if self.state_path is None:
+            with self._local_lock:
+                if self._local_state is None:
+                    self._local_state = self._initial_state()
+                yield self._local_state
+            return
+
+        fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, 'r+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                raw = f.read()
+                try:
+                    state = json.loads(raw) if raw else self._initial_state()
+                except ValueError:
+                    state = self._initial_state()
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _live_in_flight(self, state) -> Dict[str, Dict]:
+        """Reservations per process ({held, active, at}), dropping processes that have exited"""
+        in_flight = state['in_flight']
+        for pid in list(in_flight):
+            if pid == self.pid:
+                continue
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                del in_flight[pid]
+            except PermissionError:
+                pass
+        return in_flight
+
+    def _sync(self, want_slot: bool = False, overloaded: bool = False) -> float:
+        """
+        Reconcile this process's reservation with the shared state. With want_slot,
+        take a slot and a token if possible; otherwise return how long to wait.
+        Caller holds self._lock.
+        """
+        self._count('syncs')
+        with self._shared_state() as state:
+            now = time.time()
+            state['limit'] = min(self.max_concurrency, max(self.min_concurrency, state['limit']))
+            for _ in range(self._successes):
+                state['limit'] = min(self.max_concurrency, state['limit'] + 1.0 / max(state['limit'], 1.0))
+            self._successes = 0
+            if overloaded:
+                self._decrease(state)
+                self._tokens = 0
+
+            in_flight = self._live_in_flight(state)
+            for pid, entry in in_flight.items():
+                # A process that stopped syncing can't admit from its reservation any more
+                if pid != self.pid and now - entry['at'] > 2 * self.sync_interval:
+                    entry['held'] = entry['active']
+            waiting = state.setdefault('waiting', {})
+            for pid in list(waiting):
+                if pid not in in_flight or now - waiting[pid] > self.sync_interval:
+                    del waiting[pid]
+            self._contended = any(pid != self.pid for pid in waiting)
+
+            limit = int(state['limit'])
+            others = sum(entry['held'] for pid, entry in in_flight.items() if pid != self.pid)
+            if self._contended:
+                held = self._active
+                state['tokens'] = min(self.burst, state['tokens'] + self._tokens)
+                self._tokens = 0
+            else:
+                held = max(self._active, min(self._held, limit - others))
+
+            wait = 0.0
+            if want_slot:
+                if self._active >= held:
+                    if others + held < limit:
+                        held += 1
+                    else:
+                        wait = self.poll_interval
+                if not wait and self.rate_per_minute > 0 and self._tokens < 1:
+                    rate = self.rate_per_minute / 60
+                    state['tokens'] = min(self.burst, state['tokens'] + (now - state['refilled_at']) * rate)
+                    state['refilled_at'] = now
+                    if state['tokens'] < 1:
+                        wait = (1 - state['tokens']) / rate
+                    else:
+                        taken = 1 if self._contended else min(int(state['tokens']), self.token_batch)
+                        state['tokens'] -= taken
+                        self._tokens += taken
+                if wait:
+                    waiting[self.pid] = now
+                else:
+                    waiting.pop(self.pid, None)
+                    self._admit()
+
+            self._held = held
+            in_flight[self.pid] = {'held': held, 'active': self._active, 'at': now}
+            self._snapshot = {
+                'limit': state['limit'],
+                'tokens': state['tokens'],
+                'others_in_flight': sum(entry['active'] for pid, entry in in_flight.items() if pid != self.pid)
+            }
+        self._synced_at = time.monotonic()
+        return wait
+
+    def _admit(self):
+        self._active += 1
+        if self.rate_per_minute > 0:
+            self._tokens -= 1
+
+    def _check_owner(self):
+        # A forked worker starts with no reservation of its own
+        if self._owner != self.pid:
+            self._reset_reservation()
+
+    def acquire(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for admission"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._check_owner()
+                fresh = time.monotonic() - self._synced_at < self.sync_interval
+                if (fresh and self._active < self._held
+                        and (self.rate_per_minute <= 0 or self._tokens >= 1)):
+                    self._admit()
+                    wait = 0.0
+                else:
+                    wait = self._sync(want_slot=True)
+            if wait == 0:
+                self._count('admitted')
+                return True
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._count('throttled')
+                return False
+            with self._wakeup:
+                self._wakeup.wait(min(wait, remaining, self.poll_interval))
+
+    def release(self, overloaded: bool = False, succeeded: bool = True):
+        """
+        Return a slot. A success grows the limit additively, an overload cuts it
+        multiplicatively; other failures leave it unchanged.
+        """
+        with self._lock:
+            self._check_owner()
+            self._active = max(0, self._active - 1)
+            if succeeded and not overloaded:
+                self._successes += 1
+            stale = time.monotonic() - self._synced_at >= self.sync_interval
+            if overloaded or stale or self._contended:
+                self._sync(overloaded=overloaded)
+            elif self._flush_timer is None:
+                # Publish the release within an interval even if this process goes idle
+                self._flush_timer = threading.Timer(self.sync_interval, self._flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def _flush(self):
+        with self._lock:
+            self._flush_timer = None
+            if self._owner == self.pid:
+                try:
+                    self._sync()
+                except OSError:
+                    # Best effort: the next acquire or release syncs again
+                    pass
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def signal_overload(self):
+        """Congestion seen outside release(), e.g. a call abandoned at its timeout"""
+        with self._lock:
+            self._check_owner()
+            self._sync(overloaded=True)
+
+    def _decrease(self, state):
+        self._count('overloads')
+        now = time.time()
+        # One cut per congestion event: errors from calls already in flight don't compound it
+        if now - state['decreased_at'] < self.cooldown_seconds:
+            return
+        state['limit'] = max(self.min_concurrency, state['limit'] * self.decrease_factor)
+        state['decreased_at'] = now
+        # Pause new admissions until the bucket refills
+        state['tokens'] = min(state['tokens'], 0.0)
+        self._count('decreases')
+
+    def _count(self, counter):
+        with self._counters_lock:
+            self.counters[counter] += 1
+
+    def stats(self) -> Dict:
+        """Shared state as of the last sync plus this process's own changes; never touches the file"""
+        with self._lock:
+            self._check_owner()
+            limit = self._snapshot['limit']
+            for _ in range(self._successes):
+                limit = min(self.max_concurrency, limit + 1.0 / max(limit, 1.0))
+            in_flight = self._snapshot['others_in_flight'] + self._active
+            tokens = self._snapshot['tokens'] + max(self._tokens, 0)
+            synced_at = self._synced_at
+        with self._counters_lock:
+            stats = dict(self.counters)
+        stats.update({
+            'rate_per_minute': self.rate_per_minute,
+            'tokens_available': round(tokens, 2) if self.rate_per_minute > 0 else None,
+            'concurrency_limit': round(limit, 2),
+            'in_flight_all_workers': in_flight,
+            'shared_state': self.state_path,
+            'state_age_seconds': round(time.monotonic() - synced_at, 2) if synced_at > float('-inf') else None
+        })
+        return stats
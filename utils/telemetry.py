@@ -0,0 +1,301 @@
+"""
+Request and Process Telemetry
+Measures every agent run and every LLM call (wall time, queue wait, tokens,
+retries, cache hits, fallback use). Measurements go to the current request's
+RequestMetrics, carried in a context variable into worker threads, and to
+process-wide histograms.
+"""
+import contextvars
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Dict, Optional, Tuple
+
+# Cost estimate per 1K tokens (USD); defaults follow Gemini Flash list prices
+COST_PER_1K_INPUT_TOKENS = float(os.getenv('LLM_COST_PER_1K_INPUT_TOKENS', 0.0001))
+COST_PER_1K_OUTPUT_TOKENS = float(os.getenv('LLM_COST_PER_1K_OUTPUT_TOKENS', 0.0004))
+
+# Rough characters per token, used when a response carries no usage metadata
+CHARS_PER_TOKEN = 4
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536)
+
+_current_request = contextvars.ContextVar('policyhub_request_metrics', default=None)
+_current_agent = contextvars.ContextVar('policyhub_agent', default=None)
+
+
+def bind_context(func: Callable) -> Callable:
+    """
+    func bound to a copy of the caller's context, for handing work to a thread
+    pool. Bind once per submitted call: one context cannot run on two threads.
+    """
+    return partial(contextvars.copy_context().run, func)
+
+
+def current_request() -> Optional['RequestMetrics']:
+    return _current_request.get()
+
+
+def current_agent() -> Optional[str]:
+    return _current_agent.get()
+
+
+@contextmanager
+def track_request():
+    """Collect the measurements made in this context (and threads bound to it)"""
+    metrics = RequestMetrics()
+    token = _current_request.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_request.reset(token)
+
+
+@contextmanager
+def agent_scope(agent: str):
+    """Attribute LLM calls and cache lookups made inside the block to agent"""
+    token = _current_agent.set(agent)
+    try:
+        yield
+    finally:
+        _current_agent.reset(token)
+
+
+def token_usage(prompt: str, response_text: str, response=None) -> Tuple[int, int, bool]:
+    """(input_tokens, output_tokens, estimated) from usage metadata, else from text length"""
+    usage = getattr(response, 'usage_metadata', None)
+    input_tokens = getattr(usage, 'prompt_token_count', None)
+    output_tokens = getattr(usage, 'candidates_token_count', None)
+    if isinstance(input_tokens, int) and isinstance(output_tokens, int):
+        return input_tokens, output_tokens, False
+    return (math.ceil(len(prompt or '') / CHARS_PER_TOKEN),
+            math.ceil(len(response_text or '') / CHARS_PER_TOKEN), True)
+
+
+def uses_fallback(output) -> bool:
+    """An agent output (or any item of a batch output) produced without the model"""
+    items = output if isinstance(output, list) else [output]
+    return any(
+        isinstance(item, dict) and ('error' in item or item.get('fallback_analysis') or item.get('timed_out'))
+        for item in items
+    )
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a running sum and count"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {'buckets': buckets, 'sum': round(self.sum, 6), 'count': self.count}
+
+
+class MetricsRegistry:
+    """Process-wide histograms and counters, each series identified by name and labels"""
+
+    BUCKETS = {
+        'agent_duration_seconds': LATENCY_BUCKETS,
+        'llm_call_duration_seconds': LATENCY_BUCKETS,
+        'llm_queue_wait_seconds': LATENCY_BUCKETS,
+        'llm_input_tokens': TOKEN_BUCKETS,
+        'llm_output_tokens': TOKEN_BUCKETS,
+        'analysis_duration_seconds': LATENCY_BUCKETS,
+        'http_request_duration_seconds': LATENCY_BUCKETS,
+        'pdf_extraction_seconds': LATENCY_BUCKETS
+    }
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _series(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._series(name, labels)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(self.BUCKETS.get(name, LATENCY_BUCKETS))
+            self._histograms[key].observe(value)
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        key = self._series(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self) -> Dict:
+        """{'histograms': {name: [{labels, buckets, sum, count}]}, 'counters': {name: [{labels, value}]}}"""
+        with self._lock:
+            histograms = {key: histogram.snapshot() for key, histogram in self._histograms.items()}
+            counters = dict(self._counters)
+        snapshot = {'histograms': {}, 'counters': {}}
+        for (name, labels), data in sorted(histograms.items()):
+            snapshot['histograms'].setdefault(name, []).append(dict(data, labels=dict(labels)))
+        for (name, labels), value in sorted(counters.items()):
+            snapshot['counters'].setdefault(name, []).append({'labels': dict(labels), 'value': value})
+        return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+# Shared process-wide registry
+metrics = MetricsRegistry()
+
+if hasattr(os, 'register_at_fork'):
+    # A worker forked from a preloaded app starts counting from zero
+    os.register_at_fork(after_in_child=metrics.reset)
+
+
+def _empty_agent():
+    return {
+        'state': None,
+        'wall_time_ms': None,
+        'fallback_used': False,
+        'cache_hits': 0,
+        'cache_misses': 0,
+        'llm_calls': 0,
+        'llm_errors': 0,
+        'llm_time_ms': 0.0,
+        'queue_wait_ms': 0.0,
+        'input_tokens': 0,
+        'output_tokens': 0,
+        'retries': 0,
+        'hedges': 0
+    }
+
+
+class RequestMetrics:
+    """Per-agent measurements of one analysis; safe to update from several threads"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.models = set()
+        self.tokens_estimated = False
+        self._agents = {}
+        self._lock = threading.Lock()
+
+    def _agent(self, agent):
+        if agent not in self._agents:
+            self._agents[agent] = _empty_agent()
+        return self._agents[agent]
+
+    def add_agent_run(self, agent: str, state: str, duration: float, fallback_used: bool):
+        with self._lock:
+            entry = self._agent(agent)
+            entry['state'] = state
+            entry['wall_time_ms'] = round(duration * 1000, 2)
+            entry['fallback_used'] = fallback_used
+
+    def add_llm_call(self, agent: str, model: str, duration: float, queue_wait: float, input_tokens: int,
+                     output_tokens: int, estimated: bool, retries: int, hedges: int, succeeded: bool):
+        with self._lock:
+            entry = self._agent(agent)
+            entry['llm_calls'] += 1
+            entry['llm_errors'] += 0 if succeeded else 1
+            entry['llm_time_ms'] = round(entry['llm_time_ms'] + duration * 1000, 2)
+            entry['queue_wait_ms'] = round(entry['queue_wait_ms'] + queue_wait * 1000, 2)
+            entry['input_tokens'] += input_tokens
+            entry['output_tokens'] += output_tokens
+            entry['retries'] += retries
+            entry['hedges'] += hedges
+            self.models.add(model)
+            self.tokens_estimated = self.tokens_estimated or estimated
+
+    def add_cache_lookup(self, agent: str, hit: bool):
+        with self._lock:
+            self._agent(agent)['cache_hits' if hit else 'cache_misses'] += 1
+
+    def agents(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {agent: dict(entry) for agent, entry in self._agents.items()}
+
+    def summary(self) -> Dict:
+        """Totals across agents plus the per-agent breakdown"""
+        agents = self.agents()
+        totals = {key: sum(entry[key] for entry in agents.values())
+                  for key in ('llm_calls', 'llm_errors', 'retries', 'hedges', 'input_tokens', 'output_tokens',
+                              'cache_hits', 'cache_misses')}
+        for key in ('llm_time_ms', 'queue_wait_ms'):
+            totals[key] = round(sum(entry[key] for entry in agents.values()), 2)
+        lookups = totals['cache_hits'] + totals['cache_misses']
+        cost = (totals['input_tokens'] / 1000 * COST_PER_1K_INPUT_TOKENS
+                + totals['output_tokens'] / 1000 * COST_PER_1K_OUTPUT_TOKENS)
+        with self._lock:
+            models = sorted(self.models)
+            estimated = self.tokens_estimated
+        return dict(
+            totals,
+            wall_time_ms=round((time.monotonic() - self.started) * 1000, 2),
+            models_used=models,
+            tokens_estimated=estimated,
+            cache_hit_ratio=round(totals['cache_hits'] / lookups, 4) if lookups else 0.0,
+            fallbacks_used=sorted(agent for agent, entry in agents.items() if entry['fallback_used']),
+            estimated_cost_usd=round(cost, 6),
+            agents=agents
+        )
+
+
+def record_agent_run(agent: str, state: str, duration: float, output=None):
+    """One orchestrated agent finished (completed, failed or timed out)"""
+    fallback_used = state != 'completed' or uses_fallback(output)
+    metrics.observe('agent_duration_seconds', duration, agent=agent, state=state)
+    if state != 'completed':
+        metrics.increment('agent_errors_total', agent=agent, state=state)
+    if fallback_used:
+        metrics.increment('agent_fallbacks_total', agent=agent)
+    request = current_request()
+    if request is not None:
+        request.add_agent_run(agent, state, duration, fallback_used)
+
+
+def record_llm_call(agent: str, model: str, duration: float, queue_wait: float, input_tokens: int,
+                    output_tokens: int, estimated: bool = False, retries: int = 0, hedges: int = 0,
+                    outcome: str = 'success'):
+    """One gateway call, including its retries and hedges; attributed to the orchestrated agent if any"""
+    agent = current_agent() or agent
+    metrics.observe('llm_call_duration_seconds', duration, agent=agent, model=model, outcome=outcome)
+    metrics.observe('llm_queue_wait_seconds', queue_wait, agent=agent)
+    metrics.observe('llm_input_tokens', input_tokens, agent=agent)
+    metrics.observe('llm_output_tokens', output_tokens, agent=agent)
+    if retries:
+        metrics.increment('llm_retries_total', retries, agent=agent)
+    request = current_request()
+    if request is not None:
+        request.add_llm_call(agent, model, duration, queue_wait, input_tokens, output_tokens,
+                             estimated, retries, hedges, outcome == 'success')
+
+
+def record_cache_lookup(agent: str, hit: bool):
+    agent = current_agent() or agent
+    metrics.increment('cache_lookups_total', agent=agent, result='hit' if hit else 'miss')
+    request = current_request()
+    if request is not None:
+        request.add_cache_lookup(agent, hit)